@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class PodomarketConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'podomarket'
+
+    def ready(self):
+        from . import signals
@@ -0,0 +1,204 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .autocomplete import get_index
+from .models import (
+    Post, Comment, Like, SearchToken,
+    ArchivedPost, ArchivedComment, ArchivedLike,
+)
+from .regions import change_region_count
+from .search import build_tokens
+from .similar import mark_dirty
+from .storage import add_references
+from .timeline import fan_out_post
+
+IMAGE_FIELDS = ('image1', 'image2', 'image3')
+
+
+def copy_fields(model, source):
+    return {
+        field.attname: getattr(source, field.attname)
+        for field in model._meta.concrete_fields
+        if hasattr(source, field.attname)
+    }
+
+
+def archivable_posts(now=None):
+    # 거래완료 후 ARCHIVE_SOLD_AFTER_DAYS일이 지난 글. 판매 중인 글은 오래되어도 목록과 검색에 남아야 하므로 옮기지 않는다.
+    now = now or timezone.now()
+    sold_cutoff = now - timedelta(days=getattr(settings, 'ARCHIVE_SOLD_AFTER_DAYS', 7))
+    return Post.objects.filter(is_sold=True, dt_updated__lt=sold_cutoff)
+
+
+def archive_batch(post_ids, now=None):
+    now = now or timezone.now()
+    post_type, comment_type = (
+        ContentType.objects.get_for_model(model).id for model in (Post, Comment)
+    )
+    with transaction.atomic():
+        posts = list(Post.objects.filter(id__in=post_ids))
+        if not posts:
+            return 0
+        ids = [post.id for post in posts]
+        comments = list(Comment.objects.filter(post_id__in=ids))
+        comment_ids = [comment.id for comment in comments]
+        likes = Like.objects.filter(
+            Q(content_type_id=post_type, object_id__in=ids)
+            | Q(content_type_id=comment_type, object_id__in=comment_ids)
+        )
+
+        ArchivedPost.objects.bulk_create(
+            [ArchivedPost(dt_archived=now, **copy_fields(ArchivedPost, post)) for post in posts]
+        )
+        ArchivedComment.objects.bulk_create(
+            [ArchivedComment(**copy_fields(ArchivedComment, comment)) for comment in comments]
+        )
+        ArchivedLike.objects.bulk_create(
+            [ArchivedLike(**copy_fields(ArchivedLike, like)) for like in likes]
+        )
+        # 원래 글이 지워지면서 이미지 참조를 내려놓으므로, 보관본의 참조를 먼저 올려 둔다.
+        add_references(
+            getattr(post, field).name for post in posts for field in IMAGE_FIELDS
+        )
+        # 댓글, 좋아요, 검색 토큰, 타임라인 항목은 CASCADE로 함께 지워진다.
+        Post.objects.filter(id__in=ids).delete()
+    return len(posts)
+
+
+def archive_posts(batch_size=500, limit=None, now=None, log=None):
+    log = log or (lambda message: None)
+    now = now or timezone.now()
+    archived = 0
+    while limit is None or archived < limit:
+        size = batch_size if limit is None else min(batch_size, limit - archived)
+        ids = list(archivable_posts(now).order_by('id').values_list('id', flat=True)[:size])
+        if not ids:
+            break
+        archived += archive_batch(ids, now)
+        log(f'{archived}개 보관')
+    return archived
+
+
+def restore_batch(post_ids):
+    # archive_batch의 반대. 보관된 글을 댓글, 좋아요와 함께 원래 id로 되돌린다.
+    post_type, comment_type = (
+        ContentType.objects.get_for_model(model).id for model in (Post, Comment)
+    )
+    with transaction.atomic():
+        archived = list(ArchivedPost.objects.filter(id__in=post_ids).select_related('author'))
+        if not archived:
+            return 0
+        ids = [post.id for post in archived]
+        comments = list(ArchivedComment.objects.filter(post_id__in=ids))
+        comment_ids = [comment.id for comment in comments]
+        likes = ArchivedLike.objects.filter(
+            Q(content_type_id=post_type, object_id__in=ids)
+            | Q(content_type_id=comment_type, object_id__in=comment_ids)
+        )
+
+        # 인기 점수는 되돌린 시각부터 다시 쌓는다.
+        now = time.time()
+        posts = [
+            Post(region=post.author.region, hot_score=0, hot_ts=now, **copy_fields(Post, post))
+            for post in archived
+        ]
+        Post.objects.bulk_create(posts)
+        Comment.objects.bulk_create([Comment(**copy_fields(Comment, comment)) for comment in comments])
+        Like.objects.bulk_create([Like(**copy_fields(Like, like)) for like in likes])
+        # bulk_create가 auto_now 필드를 지금 시각으로 채우므로 원래 시각을 다시 쓴다.
+        Post.objects.bulk_update(
+            [Post(id=post.id, dt_created=post.dt_created, dt_updated=post.dt_updated) for post in archived],
+            ['dt_created', 'dt_updated'],
+        )
+        Comment.objects.bulk_update(
+            [Comment(id=comment.id, dt_created=comment.dt_created, dt_updated=comment.dt_updated) for comment in comments],
+            ['dt_created', 'dt_updated'],
+        )
+        Like.objects.bulk_update(
+            [Like(id=like.id, dt_created=like.dt_created) for like in likes],
+            ['dt_created'],
+        )
+
+        # bulk_create는 시그널을 보내지 않으므로 글 저장 때 하던 일을 여기서 한다.
+        add_references(getattr(post, field).name for post in posts for field in IMAGE_FIELDS)
+        SearchToken.objects.bulk_create([token for post in posts for token in build_tokens(post)])
+        unsold = [post for post in posts if not post.is_sold]
+        for post in unsold:
+            change_region_count(post.region, 1)
+        mark_dirty([post.id for post in unsold])
+
+        def publish():
+            index = get_index()
+            for post in unsold:
+                fan_out_post(post)
+                index.add(post.id, post.title)
+        transaction.on_commit(publish)
+
+        # 보관본의 이미지 참조는 post_delete 시그널이 내려놓는다. 보관된 댓글은 CASCADE로 지워진다.
+        likes.delete()
+        ArchivedPost.objects.filter(id__in=ids).delete()
+    return len(posts)
+
+
+def archived_post_context(post, user):
+    # 보관된 글 상세 화면에 필요한 값. PostDetailView의 컨텍스트와 같은 이름을 쓴다.
+    context = {'comments': list(post.comments.select_related('author'))}
+    if user.is_authenticated:
+        post_type, comment_type = (
+            ContentType.objects.get_for_model(model).id for model in (Post, Comment)
+        )
+        likes = ArchivedLike.objects.filter(user=user)
+        context['likes_post'] = likes.filter(content_type_id=post_type, object_id=post.id).exists()
+        context['liked_comment_ids'] = set(
+            likes.filter(
+                content_type_id=comment_type,
+                object_id__in=[comment.id for comment in context['comments']],
+            ).values_list('object_id', flat=True)
+        )
+    return context
+
+
+class MergedPosts:
+    # 활성 글과 보관된 글 queryset을 하나의 목록처럼 다룬다. CursorPaginator(filter, order_by)에 그대로 넘길 수 있다.
+    # [:n]은 양쪽에서 n개씩만 읽어 합친다. 다음 페이지는 커서의 (dt_created, id) 조건을 양쪽 테이블에
+    # 걸어서 읽으므로, 깊은 페이지에서도 읽는 행 수가 페이지 크기를 넘지 않는다.
+
+    def __init__(self, *querysets, ordering=('-dt_created', '-id')):
+        self.querysets = querysets
+        self.ordering = ordering
+
+    def filter(self, *args, **kwargs):
+        return MergedPosts(*(qs.filter(*args, **kwargs) for qs in self.querysets), ordering=self.ordering)
+
+    def order_by(self, *fields):
+        return MergedPosts(*(qs.order_by(*fields) for qs in self.querysets), ordering=fields)
+
+    def count(self):
+        return sum(qs.count() for qs in self.querysets)
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice) or key.step is not None or key.start or key.stop is None:
+            # OFFSET은 앞의 행을 양쪽에서 모두 읽어야 하므로 지원하지 않는다.
+            raise TypeError('MergedPosts는 [:n] 슬라이스만 지원합니다. 다음 페이지는 커서로 읽습니다.')
+        rows = []
+        for qs in self.querysets:
+            rows.extend(qs.order_by(*self.ordering)[:key.stop])
+        names = [field.lstrip('-') for field in self.ordering]
+        rows.sort(
+            key=lambda obj: tuple(getattr(obj, name) for name in names),
+            reverse=self.ordering[0].startswith('-'),
+        )
+        return rows[key]
+
+
+def posts_by_author(author_id):
+    return MergedPosts(
+        Post.objects.filter(author_id=author_id).select_related('author'),
+        ArchivedPost.objects.filter(author_id=author_id).select_related('author'),
+    )
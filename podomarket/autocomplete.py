@@ -0,0 +1,225 @@
+import heapq
+import threading
+import time
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.db import connections
+
+from .models import Post
+from .search import normalize
+
+MAX_CHAR = chr(0x10FFFF)
+
+
+def title_text(title):
+    return ' '.join(normalize(title).split())
+
+
+def title_keys(text):
+    # '급처 아이폰 케이스' -> ['급처 아이폰 케이스', '아이폰 케이스', '케이스']
+    # 제목 중간 단어로 시작하는 입력도 찾을 수 있도록 단어마다 그 뒤 전체를 키로 넣는다.
+    words = text.split()
+    return [' '.join(words[i:]) for i in range(len(words))]
+
+
+class PrefixIndex:
+    # 정렬된 키 배열에서 bisect로 접두어 범위를 찾는다.
+    # 같은 제목의 글은 하나로 묶고 글 수만 센다. 키 -> 제목 번호는 array로 들고 있어 메모리가 작다.
+    # 글 id -> 제목 번호도 들고 있어서 같은 글을 두 번 넣거나 빼도 한 번만 센다.
+    #
+    # 새 키는 큰 배열에 바로 끼워 넣지 않고(매번 O(n)) 작은 정렬된 버퍼에 모았다가,
+    # merge_size개가 넘으면 한 번에 합친다. 글이 모두 빠진 제목의 키는 합칠 때 버린다.
+    # 키를 버린 제목 번호는 새 제목에 다시 쓰므로, titles와 counts는 살아 있는 제목 수만큼만 커진다.
+
+    def __init__(self, scan_limit=2000, merge_size=1000):
+        self.scan_limit = scan_limit
+        self.merge_size = merge_size
+        self.keys = []
+        self.key_titles = array('l')
+        self.new_keys = []
+        self.new_key_titles = array('l')
+        self.titles = []
+        self.counts = array('l')
+        self.title_ids = {}
+        self.post_titles = {}
+        # 글 수가 0이 되었지만 아직 키가 남은 제목 번호와, 키까지 버려서 다시 쓸 수 있는 번호
+        self.dead_titles = []
+        self.free_titles = []
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.title_ids)
+
+    def add(self, post_id, title):
+        with self.lock:
+            if self.put(post_id, title) and len(self.new_keys) > self.merge_size:
+                self.merge()
+
+    def extend(self, posts):
+        # 처음 만들 때는 (글 id, 제목)을 모두 넣은 뒤 한 번에 정렬한다.
+        with self.lock:
+            for post_id, title in posts:
+                self.put(post_id, title)
+            self.merge()
+
+    def remove(self, post_id):
+        with self.lock:
+            self.release(post_id)
+            if len(self.dead_titles) > self.merge_size:
+                self.merge()
+
+    def put(self, post_id, title):
+        # 새 제목이 생겨 버퍼에 키를 넣었으면 True를 돌려준다.
+        text = title_text(title)
+        title_id = self.title_ids.get(text)
+        if title_id is not None and self.post_titles.get(post_id) == title_id:
+            return False
+        self.release(post_id)
+        if not text:
+            return False
+        added = title_id is None
+        if added:
+            if self.free_titles:
+                title_id = self.free_titles.pop()
+                self.titles[title_id] = title
+            else:
+                title_id = len(self.titles)
+                self.titles.append(title)
+                self.counts.append(0)
+            self.title_ids[text] = title_id
+            for key in title_keys(text):
+                position = bisect_left(self.new_keys, key)
+                self.new_keys.insert(position, key)
+                self.new_key_titles.insert(position, title_id)
+        self.counts[title_id] += 1
+        self.post_titles[post_id] = title_id
+        return added
+
+    def release(self, post_id):
+        title_id = self.post_titles.pop(post_id, None)
+        if title_id is None:
+            return
+        self.counts[title_id] -= 1
+        if self.counts[title_id] == 0:
+            # 키는 다음 merge 때 버린다. 그때까지 suggest는 글 수가 0인 제목을 건너뛴다.
+            del self.title_ids[title_text(self.titles[title_id])]
+            self.titles[title_id] = None
+            self.dead_titles.append(title_id)
+
+    def merge(self):
+        live = self.counts
+        entries = heapq.merge(zip(self.keys, self.key_titles), zip(self.new_keys, self.new_key_titles))
+        entries = [(key, title_id) for key, title_id in entries if live[title_id] > 0]
+        self.keys = [key for key, title_id in entries]
+        self.key_titles = array('l', (title_id for key, title_id in entries))
+        self.new_keys = []
+        self.new_key_titles = array('l')
+        self.free_titles.extend(self.dead_titles)
+        self.dead_titles = []
+
+    def suggest(self, prefix, limit=10):
+        # 접두어 범위에서 최대 scan_limit개의 키만 보고, 글이 많은 제목부터 돌려준다.
+        prefix = title_text(prefix)
+        if not prefix:
+            return []
+        with self.lock:
+            title_ids = set()
+            for keys, key_titles in ((self.keys, self.key_titles), (self.new_keys, self.new_key_titles)):
+                start = bisect_left(keys, prefix)
+                end = min(bisect_left(keys, prefix + MAX_CHAR, start), start + self.scan_limit)
+                title_ids.update(key_titles[start:end])
+            title_ids = [title_id for title_id in title_ids if self.counts[title_id] > 0]
+            best = heapq.nlargest(limit, title_ids, key=lambda title_id: (self.counts[title_id], -title_id))
+            return [self.titles[title_id] for title_id in best]
+
+
+def build_index():
+    index = PrefixIndex(scan_limit=getattr(settings, 'AUTOCOMPLETE_SCAN_LIMIT', 2000))
+    posts = Post.objects.filter(is_sold=False).values_list('id', 'title')
+    index.extend(posts.iterator(chunk_size=2000))
+    return index
+
+
+class AutocompleteIndex:
+    # 프로세스마다 하나씩 둔다. 이 프로세스에서 일어난 변경은 시그널로 바로 반영하고,
+    # 다른 프로세스의 변경은 AUTOCOMPLETE_RELOAD_SECONDS마다 백그라운드에서 다시 읽어 반영한다.
+    # 다시 읽는 동안에는 이전 인덱스로 응답하고, 그 사이의 변경은 모아 뒀다가 새 인덱스에 다시 적용한다.
+    # 새로 읽은 목록에 이미 들어간 변경이어도 글 id로 묶으므로 두 번 세지 않는다.
+
+    def __init__(self, reload_seconds=600):
+        self.reload_seconds = reload_seconds
+        self.index = None
+        self.loaded_at = 0.0
+        self.pending = None
+        self.lock = threading.Lock()
+        self.load_lock = threading.Lock()
+
+    def suggest(self, prefix, limit=10):
+        if self.index is None:
+            # 첫 요청은 인덱스가 만들어질 때까지 기다린다.
+            with self.load_lock:
+                if self.index is None and self.start_reload():
+                    self.finish_reload()
+        elif time.monotonic() - self.loaded_at > self.reload_seconds and self.start_reload():
+            threading.Thread(target=self.reload_in_thread, name='autocomplete-reload', daemon=True).start()
+        return self.index.suggest(prefix, limit)
+
+    def start_reload(self):
+        with self.lock:
+            if self.pending is not None:
+                return False
+            self.pending = []
+            return True
+
+    def finish_reload(self):
+        try:
+            index = build_index()
+        except Exception:
+            with self.lock:
+                self.pending = None
+                self.loaded_at = time.monotonic()
+            raise
+        with self.lock:
+            for method, args in self.pending:
+                getattr(index, method)(*args)
+            self.pending = None
+            self.index = index
+            self.loaded_at = time.monotonic()
+
+    def reload_in_thread(self):
+        try:
+            self.finish_reload()
+        finally:
+            # 이 스레드가 연 DB 연결은 다른 요청이 재사용하지 않으므로 닫는다.
+            connections.close_all()
+
+    def apply(self, method, *args):
+        with self.lock:
+            if self.pending is not None:
+                self.pending.append((method, args))
+            index = self.index
+        if index is not None:
+            getattr(index, method)(*args)
+
+    def add(self, post_id, title):
+        self.apply('add', post_id, title)
+
+    def remove(self, post_id):
+        self.apply('remove', post_id)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = AutocompleteIndex(
+                    reload_seconds=getattr(settings, 'AUTOCOMPLETE_RELOAD_SECONDS', 600),
+                )
+    return _index
@@ -0,0 +1,446 @@
+import asyncio
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib import parse
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.asgi import ASGIHandler
+from django.core.wsgi import WSGIHandler
+from django.db import OperationalError, connection, connections, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, reverse
+from django.utils import timezone
+
+from . import urls
+from .models import User, Post, Comment
+from .perflog import percentile
+
+# url name: (method, 로그인 필요 여부, kwargs를 만드는 함수, GET/POST 데이터를 만드는 함수)
+# urls.py에 새 라우트를 추가하면 여기에도 추가해야 벤치마크에 포함된다.
+ROUTES = {
+    'index': ('get', False, None, None),
+    'popular': ('get', False, None, None),
+    'wishlist': ('get', True, None, None),
+    'search': ('get', False, None, lambda ctx: {'query': ctx.search_query}),
+    'following-post-list': ('get', True, None, None),
+    'post-detail': ('get', False, lambda ctx: {'post_id': ctx.popular_post.id}, None),
+    'post-create': ('get', True, None, None),
+    'post-update': ('get', True, lambda ctx: {'post_id': ctx.own_post.id}, None),
+    'post-delete': ('get', True, lambda ctx: {'post_id': ctx.own_post.id}, None),
+    'profile': ('get', False, lambda ctx: {'user_id': ctx.popular_user.id}, None),
+    'user-post-list': ('get', False, lambda ctx: {'user_id': ctx.popular_user.id}, None),
+    'profile-set': ('get', True, None, None),
+    'profile-update': ('get', True, None, None),
+    'comment-create': ('post', True, lambda ctx: {'post_id': ctx.popular_post.id}, lambda ctx: {'content': '벤치마크 댓글'}),
+    'comment-update': ('get', True, lambda ctx: {'comment_id': ctx.own_comment.id}, None),
+    'comment-delete': ('get', True, lambda ctx: {'comment_id': ctx.own_comment.id}, None),
+    'process-like': (
+        'post', True,
+        lambda ctx: {'content_type_id': ctx.post_ctype_id, 'object_id': ctx.popular_post.id},
+        None,
+    ),
+    'process-follow': ('post', True, lambda ctx: {'user_id': ctx.popular_user.id}, None),
+    'api-like': (
+        'post', True,
+        lambda ctx: {'content_type_id': ctx.post_ctype_id, 'object_id': ctx.popular_post.id},
+        None,
+    ),
+    'api-follow': ('post', True, lambda ctx: {'user_id': ctx.popular_user.id}, None),
+    'api-autocomplete': ('get', False, None, lambda ctx: {'q': ctx.search_query[:2]}),
+}
+
+
+class BenchmarkData:
+    # 시드된 DB에서 벤치마크에 쓸 유저와 객체를 고른다.
+
+    def __init__(self):
+        viewer_id = (
+            Comment.objects.filter(author__posts__isnull=False)
+            .values_list('author_id', flat=True)
+            .first()
+        )
+        if viewer_id is None:
+            raise ValueError('글과 댓글을 모두 가진 유저가 없습니다. seed_market을 먼저 실행하세요.')
+        self.viewer = User.objects.get(id=viewer_id)
+        self.own_post = Post.objects.filter(author=self.viewer).first()
+        self.own_comment = Comment.objects.filter(author=self.viewer).first()
+        self.popular_post = Post.objects.order_by('-comment_count', '-id').first()
+        self.popular_user = User.objects.exclude(id=self.viewer.id).order_by('-follower_count', 'id').first() or self.viewer
+        self.post_ctype_id = ContentType.objects.get_for_model(Post).id
+        self.search_query = self.popular_post.title.split()[-1]
+
+
+def discover_route_names():
+    return [
+        pattern.name for pattern in urls.urlpatterns
+        if isinstance(pattern, URLPattern) and pattern.name
+    ]
+
+
+def summarize(latencies, query_counts, statuses):
+    latencies = sorted(latencies)
+    return {
+        'iterations': len(latencies),
+        'p50_ms': percentile(latencies, 0.5),
+        'p95_ms': percentile(latencies, 0.95),
+        'p99_ms': percentile(latencies, 0.99),
+        'mean_ms': sum(latencies) / len(latencies),
+        'queries_max': max(query_counts),
+        'queries_mean': sum(query_counts) / len(query_counts),
+        'statuses': sorted(set(statuses)),
+    }
+
+
+def run_route(name, data, iterations, anonymous_client, viewer_client):
+    method, login_required, make_kwargs, make_params = ROUTES[name]
+    url = reverse(name, kwargs=make_kwargs(data) if make_kwargs else None)
+    params = make_params(data) if make_params else {}
+    client = viewer_client if login_required else anonymous_client
+    latencies, query_counts, statuses = [], [], []
+    for _ in range(iterations):
+        with CaptureQueriesContext(connection) as context:
+            start = time.perf_counter()
+            if method == 'get':
+                response = client.get(url, params)
+            else:
+                # 쓰기 라우트는 매번 롤백해서 데이터가 변하지 않게 한다.
+                with transaction.atomic():
+                    response = client.post(url, params, HTTP_REFERER=url)
+                    transaction.set_rollback(True)
+            latencies.append((time.perf_counter() - start) * 1000)
+        query_counts.append(len(context.captured_queries))
+        statuses.append(response.status_code)
+    return url, summarize(latencies, query_counts, statuses)
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(iterations=20, warmup=2, only=None, log=None):
+    log = log or (lambda message: None)
+    data = BenchmarkData()
+    anonymous_client = Client()
+    viewer_client = Client()
+    viewer_client.force_login(data.viewer)
+
+    results = {}
+    skipped = []
+    for name in discover_route_names():
+        if only and name not in only:
+            continue
+        if name not in ROUTES:
+            skipped.append(name)
+            continue
+        run_route(name, data, warmup, anonymous_client, viewer_client)
+        url, summary = run_route(name, data, iterations, anonymous_client, viewer_client)
+        summary['url'] = url
+        results[name] = summary
+        log(f"{name}: p50 {summary['p50_ms']:.2f}ms, p95 {summary['p95_ms']:.2f}ms, queries {summary['queries_max']}")
+
+    return {
+        'commit': current_commit(),
+        'ts': timezone.now().isoformat(),
+        'iterations': iterations,
+        'counts': {
+            'users': User.objects.count(),
+            'posts': Post.objects.count(),
+            'comments': Comment.objects.count(),
+        },
+        'routes': results,
+        'skipped': skipped,
+    }
+
+
+def compare(previous, current):
+    rows = []
+    for name, summary in current['routes'].items():
+        before = previous.get('routes', {}).get(name)
+        if before is None:
+            continue
+        rows.append({
+            'route': name,
+            'p95_before': before['p95_ms'],
+            'p95_after': summary['p95_ms'],
+            'p95_change': (summary['p95_ms'] - before['p95_ms']) / before['p95_ms'] * 100 if before['p95_ms'] else None,
+            'queries_before': before['queries_max'],
+            'queries_after': summary['queries_max'],
+        })
+    return rows
+
+
+def load_results(path):
+    with open(path, encoding='utf-8') as result_file:
+        return json.load(result_file)
+
+
+def save_results(path, results):
+    with open(path, 'w', encoding='utf-8') as result_file:
+        json.dump(results, result_file, ensure_ascii=False, indent=2)
+
+
+# 동시 부하 벤치마크에서 돌릴 읽기 전용 라우트
+LOAD_ROUTES = {
+    'index': lambda ctx: (reverse('index'), ''),
+    'search': lambda ctx: (reverse('search'), f'query={ctx.search_query}'),
+    'post-detail': lambda ctx: (reverse('post-detail', kwargs={'post_id': ctx.popular_post.id}), ''),
+    'profile': lambda ctx: (reverse('profile', kwargs={'user_id': ctx.popular_user.id}), ''),
+}
+
+
+def load_targets(data, only=None):
+    return [
+        (name, *make_target(data))
+        for name, make_target in LOAD_ROUTES.items()
+        if not only or name in only
+    ]
+
+
+def wsgi_environ(path, query_string):
+    return {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'QUERY_STRING': parse.quote(query_string, safe='=&'),
+        'SCRIPT_NAME': '',
+        'SERVER_NAME': 'testserver',
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': 'testserver',
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': io.BytesIO(b''),
+        'wsgi.errors': sys.stderr,
+    }
+
+
+def asgi_scope(path, query_string):
+    return {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': parse.quote(query_string, safe='=&').encode(),
+        'root_path': '',
+        'headers': [(b'host', b'testserver')],
+        'client': ('127.0.0.1', 0),
+        'server': ('testserver', 80),
+    }
+
+
+def run_wsgi_load(targets, requests, concurrency):
+    # 스레드 기반 WSGI 서버처럼 워커 스레드 concurrency개가 요청을 나눠 처리한다.
+    handler = WSGIHandler()
+
+    def send(target):
+        name, path, query_string = target
+        status = []
+        start = time.perf_counter()
+        response = handler(wsgi_environ(path, query_string), lambda code, headers: status.append(code))
+        try:
+            for _ in response:
+                pass
+        finally:
+            response.close()
+        return name, (time.perf_counter() - start) * 1000, int(status[0].split()[0])
+
+    jobs = [targets[i % len(targets)] for i in range(requests)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(send, jobs))
+    return results, time.perf_counter() - started
+
+
+def run_asgi_load(targets, requests, concurrency):
+    # 이벤트 루프 하나에서 최대 concurrency개의 요청을 동시에 처리한다.
+    handler = ASGIHandler()
+
+    async def send(target, semaphore):
+        name, path, query_string = target
+        status = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def respond(message):
+            if message['type'] == 'http.response.start':
+                status.append(message['status'])
+
+        async with semaphore:
+            start = time.perf_counter()
+            await handler(asgi_scope(path, query_string), receive, respond)
+            return name, (time.perf_counter() - start) * 1000, status[0]
+
+    async def run_all():
+        semaphore = asyncio.Semaphore(concurrency)
+        jobs = [targets[i % len(targets)] for i in range(requests)]
+        return await asyncio.gather(*(send(target, semaphore) for target in jobs))
+
+    started = time.perf_counter()
+    results = asyncio.run(run_all())
+    return results, time.perf_counter() - started
+
+
+def summarize_load(results, elapsed):
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    for name, latency, status in results:
+        latencies[name].append(latency)
+        if status >= 400:
+            errors[name] += 1
+    routes = {}
+    for name, values in latencies.items():
+        values = sorted(values)
+        routes[name] = {
+            'requests': len(values),
+            'errors': errors[name],
+            'p50_ms': percentile(values, 0.5),
+            'p95_ms': percentile(values, 0.95),
+            'p99_ms': percentile(values, 0.99),
+        }
+    return {
+        'requests': len(results),
+        'elapsed_s': elapsed,
+        'throughput_rps': len(results) / elapsed if elapsed else None,
+        'errors': sum(errors.values()),
+        'routes': routes,
+    }
+
+
+def run_load(mode, requests=1000, concurrency=64, warmup=20, only=None):
+    data = BenchmarkData()
+    targets = load_targets(data, only)
+    run = run_asgi_load if mode == 'asgi' else run_wsgi_load
+    run(targets, warmup, concurrency)
+    results, elapsed = run(targets, requests, concurrency)
+    summary = summarize_load(results, elapsed)
+    summary.update({'mode': mode, 'concurrency': concurrency})
+    return summary
+
+
+# SQLite 동시 쓰기/읽기 벤치마크에서 비교할 커넥션 설정
+SQLITE_MODES = {
+    'default': lambda: {'ENGINE': 'django.db.backends.sqlite3', 'OPTIONS': {}},
+    'tuned': lambda: {
+        'ENGINE': 'podomarket.db.sqlite3',
+        'OPTIONS': dict(settings.DATABASES['default'].get('OPTIONS', {})),
+    },
+}
+
+
+def contention_schema(cursor):
+    cursor.execute('CREATE TABLE bench_counter (id INTEGER PRIMARY KEY, n INTEGER NOT NULL)')
+    cursor.execute('CREATE TABLE bench_event (id INTEGER PRIMARY KEY, counter_id INTEGER, dt REAL)')
+    cursor.execute('CREATE INDEX bench_event_counter ON bench_event (counter_id, dt)')
+    cursor.executemany('INSERT INTO bench_counter (id, n) VALUES (%s, 0)', [(i,) for i in range(100)])
+
+
+def run_contention(mode, writers=8, readers=8, transactions=100, seed=0):
+    # 좋아요/댓글처럼 읽고 나서 쓰는 짧은 트랜잭션과, 목록을 읽는 요청을 동시에 돌린다.
+    directory = tempfile.mkdtemp()
+    alias = f'bench_{mode}'
+    connections.databases[alias] = {**SQLITE_MODES[mode](), 'NAME': os.path.join(directory, 'bench.sqlite3')}
+    with connections[alias].cursor() as cursor:
+        contention_schema(cursor)
+    connections[alias].close()
+
+    lock = threading.Lock()
+    write_latencies, read_latencies = [], []
+    errors = defaultdict(int)
+    done = threading.Event()
+
+    def writer(index):
+        rng = random.Random(seed + index)
+        for _ in range(transactions):
+            counter_id = rng.randrange(100)
+            start = time.perf_counter()
+            try:
+                with transaction.atomic(using=alias):
+                    with connections[alias].cursor() as cursor:
+                        cursor.execute('SELECT n FROM bench_counter WHERE id = %s', [counter_id])
+                        cursor.fetchone()
+                        cursor.execute('UPDATE bench_counter SET n = n + 1 WHERE id = %s', [counter_id])
+                        cursor.execute(
+                            'INSERT INTO bench_event (counter_id, dt) VALUES (%s, %s)',
+                            [counter_id, time.time()],
+                        )
+            except OperationalError:
+                with lock:
+                    errors['write'] += 1
+                continue
+            with lock:
+                write_latencies.append((time.perf_counter() - start) * 1000)
+        connections[alias].close()
+
+    def reader(index):
+        rng = random.Random(seed + 1000 + index)
+        while not done.is_set():
+            start = time.perf_counter()
+            try:
+                with connections[alias].cursor() as cursor:
+                    cursor.execute(
+                        'SELECT id, dt FROM bench_event WHERE counter_id = %s ORDER BY dt DESC LIMIT 20',
+                        [rng.randrange(100)],
+                    )
+                    cursor.fetchall()
+                    cursor.execute('SELECT SUM(n) FROM bench_counter')
+                    cursor.fetchone()
+            except OperationalError:
+                with lock:
+                    errors['read'] += 1
+                continue
+            with lock:
+                read_latencies.append((time.perf_counter() - start) * 1000)
+        connections[alias].close()
+
+    reader_threads = [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    writer_threads = [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+    started = time.perf_counter()
+    for thread in reader_threads + writer_threads:
+        thread.start()
+    for thread in writer_threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    done.set()
+    for thread in reader_threads:
+        thread.join()
+
+    del connections.databases[alias]
+    for name in os.listdir(directory):
+        os.remove(os.path.join(directory, name))
+    os.rmdir(directory)
+
+    write_latencies.sort()
+    read_latencies.sort()
+    return {
+        'mode': mode,
+        'elapsed_s': elapsed,
+        'writes': len(write_latencies),
+        'write_errors': errors['write'],
+        'writes_per_s': len(write_latencies) / elapsed if elapsed else None,
+        'write_p50_ms': percentile(write_latencies, 0.5),
+        'write_p95_ms': percentile(write_latencies, 0.95),
+        'reads': len(read_latencies),
+        'read_errors': errors['read'],
+        'reads_per_s': len(read_latencies) / elapsed if elapsed else None,
+        'read_p50_ms': percentile(read_latencies, 0.5),
+        'read_p95_ms': percentile(read_latencies, 0.95),
+    }
@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+
+def card_key(post):
+    # 카드에는 작성자 주소도 그려지므로 작성자 행의 수정 시각도 키에 넣는다.
+    # 글이나 작성자가 저장되면 키가 바뀌고, 옛 카드는 지우지 않아도 다시 읽히지 않는다.
+    return (
+        f'post-card:{post.id}:{int(post.dt_updated.timestamp() * 1000000)}'
+        f':{int(post.author.dt_updated.timestamp() * 1000000)}'
+    )
+
+
+def render_cards(posts):
+    # 한 페이지의 카드를 get_many 한 번으로 가져오고, 없는 것만 렌더링한다.
+    posts = list(posts)
+    keys = [card_key(post) for post in posts]
+    cached = cache.get_many(keys)
+    missing = {}
+    cards = []
+    for key, post in zip(keys, posts):
+        html = cached.get(key)
+        if html is None:
+            html = render_to_string('components/post_card.html', {'post': post})
+            # 썸네일이 아직 없을 때 캐시된 카드는 썸네일을 다 만든 뒤 invalidate_post로 지운다.
+            missing[key] = html
+        cards.append(mark_safe(html))
+    if missing:
+        cache.set_many(missing, getattr(settings, 'POST_CARD_CACHE_TIMEOUT', 60 * 60))
+    return cards
+
+
+def invalidate_post(post):
+    cache.delete(card_key(post))
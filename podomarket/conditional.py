@@ -0,0 +1,162 @@
+import hashlib
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Count, Max, OuterRef, Q, Subquery, Sum
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+from .models import User, Post, Comment, Like, ArchivedPost, RegionCount, SimilarPost
+
+# 화면에 보이는 값이 바뀌었는지를 템플릿을 그리지 않고 작은 조회 한두 번으로 알아낸다.
+# 버전은 (ETag, Last-Modified 시각)이다. ETag에는 로그인한 유저와 CSRF 쿠키도 넣는다.
+# 같은 주소라도 유저마다 본문(좋아요 상태, 메뉴, 폼의 CSRF 토큰)이 다르기 때문이다.
+#
+# 304는 If-None-Match로만 판단한다. 댓글이나 글이 지워져도 가장 최근 수정 시각은 그대로일 수 있으므로
+# Last-Modified는 알려 주기만 하고, If-Modified-Since만 보낸 요청은 다시 렌더링한다.
+
+
+def make_version(parts, last_modified=None):
+    digest = hashlib.md5(repr(parts).encode()).hexdigest()
+    # CSRF 토큰처럼 렌더링마다 바뀌지만 의미는 같은 값이 있으므로 약한 ETag를 쓴다.
+    return f'W/"{digest}"', last_modified
+
+
+def user_state(request):
+    user = request.user
+    return (
+        user.id if user.is_authenticated else None,
+        request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+    )
+
+
+def latest(*values):
+    values = [value for value in values if value is not None]
+    return max(values) if values else None
+
+
+def post_likes(user, post_id):
+    # 유저가 글과 그 글의 댓글에 누른 좋아요를 한 번에 읽는다. (글 좋아요 여부, 좋아요한 댓글 id 집합)
+    post_type, comment_type = (
+        ContentType.objects.get_for_model(model).id for model in (Post, Comment)
+    )
+    likes = Like.objects.filter(user=user).filter(
+        Q(content_type_id=post_type, object_id=post_id)
+        | Q(content_type_id=comment_type, comment__post_id=post_id)
+    ).values_list('content_type_id', 'object_id')
+    likes_post = False
+    liked_comment_ids = set()
+    for content_type_id, object_id in likes:
+        if content_type_id == post_type:
+            likes_post = True
+        else:
+            liked_comment_ids.add(object_id)
+    return likes_post, liked_comment_ids
+
+
+def post_version(request, post_id, likes=None):
+    comments = Comment.objects.filter(post=OuterRef('pk')).order_by().values('post')
+    neighbours = SimilarPost.objects.filter(post=OuterRef('pk'), neighbour__is_sold=False).order_by().values('post')
+    row = Post.objects.filter(id=post_id).annotate(
+        comments_updated=Subquery(comments.annotate(value=Max('dt_updated')).values('value')),
+        # 댓글 좋아요는 dt_updated를 바꾸지 않으므로 합계로 알아챈다.
+        comment_likes=Subquery(comments.annotate(value=Sum('like_count')).values('value')),
+        # 댓글 옆에 보이는 작성자 닉네임과 프로필 사진
+        commenters_updated=Subquery(comments.annotate(value=Max('author__dt_updated')).values('value')),
+        similar_updated=Subquery(neighbours.annotate(value=Max('neighbour__dt_updated')).values('value')),
+        similar_ids=Subquery(neighbours.annotate(value=Sum('neighbour_id')).values('value')),
+    ).order_by().values_list(
+        'dt_updated', 'like_count', 'comment_count', 'is_sold',
+        'author__nickname', 'author__kakao_id', 'author__address', 'author__profile_pic',
+        'comments_updated', 'comment_likes', 'commenters_updated', 'similar_updated', 'similar_ids',
+    ).first()
+    if row is None:
+        # 보관된 글은 드물게 열리므로 조건부 응답 없이 그대로 보여준다.
+        return None
+
+    if likes is None and request.user.is_authenticated:
+        likes = post_likes(request.user, post_id)
+    if likes is not None:
+        likes = (likes[0], sorted(likes[1]))
+    return make_version((post_id, row, likes, user_state(request)), latest(row[0], row[8], row[10]))
+
+
+def profile_version(request, user_id):
+    posts = Post.objects.filter(author=OuterRef('pk')).order_by().values('author')
+    row = User.objects.filter(id=user_id).annotate(
+        post_count=Subquery(posts.annotate(value=Count('id')).values('value')),
+        posts_updated=Subquery(posts.annotate(value=Max('dt_updated')).values('value')),
+        archived_count=Subquery(
+            ArchivedPost.objects.filter(author=OuterRef('pk')).order_by().values('author')
+            .annotate(value=Count('id')).values('value')
+        ),
+    ).values_list(
+        'nickname', 'kakao_id', 'address', 'profile_pic', 'follower_count',
+        'post_count', 'posts_updated', 'archived_count',
+    ).first()
+    if row is None:
+        return None
+
+    following = None
+    user = request.user
+    if user.is_authenticated:
+        following = user.following.filter(id=user_id).exists()
+    return make_version((user_id, row, following, user_state(request)), row[6])
+
+
+def list_version(request, queryset, region=None, extra=(), **aggregates):
+    # 목록의 개수와 가장 최근 수정 시각으로 새 글, 수정, 거래완료, 삭제를 알아챈다.
+    # 좋아요/댓글 수는 F() UPDATE로만 바뀌고, 카드의 작성자 주소는 User에 있으므로 따로 본다.
+    row = queryset.order_by().aggregate(
+        count=Count('id'),
+        updated=Max('dt_updated'),
+        like_count=Sum('like_count'),
+        comment_count=Sum('comment_count'),
+        authors_updated=Max('author__dt_updated'),
+        **aggregates,
+    )
+    regions = ()
+    if region is not None:
+        # 지역 선택기에 보이는 하위 지역 개수
+        regions = list(RegionCount.objects.filter(parent=region).values_list('code', 'post_count'))
+    return make_version(
+        (sorted(row.items()), regions, extra, user_state(request)),
+        latest(row['updated'], row['authors_updated']),
+    )
+
+
+def page_version(request, page):
+    # 전체 목록을 집계하기엔 비싼 화면은 이미 읽은 한 페이지의 글만으로 버전을 만든다.
+    rows = [
+        (post.id, post.dt_updated, post.like_count, post.comment_count, post.is_sold, post.author.dt_updated)
+        for post in page
+    ]
+    return make_version(
+        (rows, page.has_next(), page.has_previous(), user_state(request)),
+        latest(*(row[1] for row in rows), *(row[5] for row in rows)),
+    )
+
+
+def not_modified(request, version):
+    if version is None:
+        return None
+    etag, last_modified = version
+    return get_conditional_response(request, etag=etag)
+
+
+def finish_response(request, response, version):
+    if version is None:
+        return response
+    etag, last_modified = version
+    if response.status_code in (200, 304):
+        response.headers.setdefault('ETag', etag)
+        if last_modified is not None:
+            response.headers.setdefault('Last-Modified', http_date(last_modified.timestamp()))
+    # 본문이 로그인 상태에 따라 다르므로 공유 캐시가 쿠키별로 나눠 저장하게 하고,
+    # 로그인한 유저의 페이지는 공유 캐시에 두지 않는다. 쓸 때마다 ETag로 다시 확인하게 한다.
+    patch_vary_headers(response, ('Cookie',))
+    if request.user.is_authenticated:
+        patch_cache_control(response, private=True, no_cache=True)
+    else:
+        patch_cache_control(response, no_cache=True)
+    return response
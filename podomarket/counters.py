@@ -0,0 +1,98 @@
+from django.contrib.contenttypes.models import ContentType
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .hot import hot_increment
+from .models import Post, Comment, Like
+
+COUNTED_MODELS = (Post, Comment)
+
+
+def change_like_count(content_type_id, object_id, delta, dt=None):
+    # 글 좋아요는 같은 UPDATE에서 hot_score도 바꾼다. 취소할 때는 좋아요를 누른 시각(dt)을 넘긴다.
+    model = ContentType.objects.get_for_id(content_type_id).model_class()
+    if model in COUNTED_MODELS:
+        changes = {'like_count': F('like_count') + delta}
+        if model is Post:
+            changes['hot_score'] = F('hot_score') + hot_increment('like', delta, dt)
+        model.objects.filter(id=object_id).update(**changes)
+
+
+def toggle_like(user, content_type_id, object_id):
+    # 삭제를 먼저 시도하고 지워진 행이 없을 때만 추가한다.
+    # 확인 후 쓰는 사이에 다른 요청이 끼어들 틈이 없고, 중복은 unique_like가 막는다.
+    # 대상이 없으면 model.DoesNotExist를 던지고 전체를 롤백한다.
+    model = ContentType.objects.get_for_id(content_type_id).model_class()
+    with transaction.atomic():
+        likes = Like.objects.filter(user=user, content_type_id=content_type_id, object_id=object_id)
+        dt_liked = likes.values_list('dt_created', flat=True).first()
+        deleted, _ = likes.delete()
+        liked = not deleted
+        if deleted:
+            change_like_count(content_type_id, object_id, -1, dt_liked)
+        else:
+            try:
+                with transaction.atomic():
+                    Like.objects.create(user=user, content_type_id=content_type_id, object_id=object_id)
+                    change_like_count(content_type_id, object_id, 1)
+            except IntegrityError:
+                # 동시에 들어온 다른 요청이 먼저 좋아요를 눌렀다. 개수는 그쪽에서 올린다.
+                pass
+        like_count = model.objects.values_list('like_count', flat=True).get(id=object_id)
+    return liked, like_count
+
+
+def change_comment_count(post_id, delta, dt=None):
+    Post.objects.filter(id=post_id).update(
+        comment_count=F('comment_count') + delta,
+        hot_score=F('hot_score') + hot_increment('comment', delta, dt),
+    )
+
+
+def count_subquery(queryset, field):
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(count=Count('id'))
+            .values('count')
+        ),
+        0,
+    )
+
+
+def reconcile_counters():
+    # 실제 개수와 다른 행만 골라서 고친다. 고친 행 수를 모델별로 돌려준다.
+    post_likes = count_subquery(
+        Like.objects.filter(content_type=ContentType.objects.get_for_model(Post)),
+        'object_id',
+    )
+    comment_likes = count_subquery(
+        Like.objects.filter(content_type=ContentType.objects.get_for_model(Comment)),
+        'object_id',
+    )
+    post_comments = count_subquery(Comment.objects.all(), 'post')
+
+    drifted_posts = Post.objects.annotate(
+        actual_likes=post_likes,
+        actual_comments=post_comments,
+    ).exclude(
+        like_count=F('actual_likes'),
+        comment_count=F('actual_comments'),
+    ).values_list('id', flat=True)
+    drifted_comments = Comment.objects.annotate(
+        actual_likes=comment_likes,
+    ).exclude(
+        like_count=F('actual_likes'),
+    ).values_list('id', flat=True)
+
+    fixed_posts = Post.objects.filter(id__in=drifted_posts).update(
+        like_count=post_likes,
+        comment_count=post_comments,
+    )
+    fixed_comments = Comment.objects.filter(id__in=drifted_comments).update(
+        like_count=comment_likes,
+    )
+    return {'post': fixed_posts, 'comment': fixed_comments}
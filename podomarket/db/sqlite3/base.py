@@ -0,0 +1,84 @@
+import random
+import time
+
+from django.db.backends.sqlite3 import base
+
+# 커넥션을 새로 만들 때 한 번만 적용한다. CONN_MAX_AGE로 커넥션을 재사용하면 비용이 없다.
+DEFAULT_PRAGMAS = {
+    # 쓰기 중에도 읽기가 막히지 않는다.
+    'journal_mode': 'wal',
+    # WAL에서는 NORMAL이어도 DB가 깨지지 않는다. 전원이 꺼지면 마지막 커밋만 잃을 수 있다.
+    'synchronous': 'normal',
+    'busy_timeout': 5000,
+    # 음수는 KiB 단위
+    'cache_size': -20000,
+    'mmap_size': 128 * 1024 * 1024,
+    'temp_store': 'memory',
+}
+
+LOCKED_MESSAGES = ('database is locked', 'database table is locked')
+
+
+class RetryingCursorWrapper(base.SQLiteCursorWrapper):
+    # busy_timeout이 지나도 잠금을 못 얻으면 지수 백오프로 다시 시도한다.
+    # 트랜잭션 안의 문장은 앞 문장들과 묶여 있어 혼자 다시 실행할 수 없으므로
+    # 트랜잭션 밖(BEGIN 포함)에서만 재시도한다.
+    lock_retries = 0
+    lock_retry_delay = 0.05
+
+    def execute(self, query, params=None):
+        return self.retry(super().execute, query, params)
+
+    def executemany(self, query, param_list):
+        return self.retry(super().executemany, query, param_list)
+
+    def retry(self, method, *args):
+        attempt = 0
+        while True:
+            try:
+                return method(*args)
+            except base.Database.OperationalError as error:
+                if (
+                    attempt >= self.lock_retries
+                    or self.connection.in_transaction
+                    or str(error) not in LOCKED_MESSAGES
+                ):
+                    raise
+                time.sleep(self.lock_retry_delay * (2 ** attempt) * (0.5 + random.random()))
+                attempt += 1
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    # OPTIONS에 아래 키를 더 받는다. 나머지는 sqlite3.connect로 그대로 넘긴다.
+    #   pragmas: DEFAULT_PRAGMAS를 덮어쓸 값 (None이면 해당 PRAGMA를 끈다)
+    #   transaction_mode: atomic()이 여는 트랜잭션 종류 (DEFERRED, IMMEDIATE, EXCLUSIVE)
+    #   lock_retries, lock_retry_delay: database is locked 재시도 횟수와 첫 대기 시간(초)
+    custom_options = ('pragmas', 'transaction_mode', 'lock_retries', 'lock_retry_delay')
+
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        for name in self.custom_options:
+            kwargs.pop(name, None)
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        options = self.settings_dict['OPTIONS']
+        pragmas = {**DEFAULT_PRAGMAS, **options.get('pragmas', {})}
+        for name, value in pragmas.items():
+            if value is not None:
+                conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def create_cursor(self, name=None):
+        cursor = self.connection.cursor(factory=RetryingCursorWrapper)
+        options = self.settings_dict['OPTIONS']
+        cursor.lock_retries = options.get('lock_retries', 0)
+        cursor.lock_retry_delay = options.get('lock_retry_delay', RetryingCursorWrapper.lock_retry_delay)
+        return cursor
+
+    def _start_transaction_under_autocommit(self):
+        # 기본 BEGIN(DEFERRED)은 읽기 잠금을 쓰기 잠금으로 올리는 순간 바로 SQLITE_BUSY가 나고
+        # busy_timeout도 소용이 없다. IMMEDIATE는 시작할 때 쓰기 잠금을 기다려서 받는다.
+        mode = self.settings_dict['OPTIONS'].get('transaction_mode')
+        self.cursor().execute(f'BEGIN {mode}' if mode else 'BEGIN')
@@ -0,0 +1,186 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.utils.http import urlencode
+
+from .models import Post
+from .regions import parse_region, region_q
+from .search import search_posts, tokenize
+
+# sort 파라미터: 정렬 필드 (None이면 검색어 관련도 순)
+SORTS = {
+    'relevance': None,
+    'recent': ('-dt_created', '-id'),
+    'price_asc': ('item_price', '-id'),
+    'price_desc': ('-item_price', '-id'),
+}
+
+SORT_LABELS = {
+    'relevance': '정확도순',
+    'recent': '최신순',
+    'price_asc': '낮은 가격순',
+    'price_desc': '높은 가격순',
+}
+
+# (최소, 최대) 원. 최대는 포함하지 않는다.
+PRICE_BUCKETS = [
+    (None, 10000),
+    (10000, 50000),
+    (50000, 100000),
+    (100000, 500000),
+    (500000, None),
+]
+
+CONDITIONS = [value for value, label in Post.condition]
+
+
+def parse_price(value):
+    try:
+        price = int(value)
+    except (TypeError, ValueError):
+        return None
+    return price if price >= 0 else None
+
+
+def parse_filters(params):
+    # 잘못된 값은 무시하고, 같은 조건이면 같은 값이 되도록 정리한다.
+    query = params.get('query', '')
+    sort = params.get('sort')
+    if sort not in SORTS:
+        sort = 'relevance' if tokenize(query) else 'recent'
+    return {
+        'query': query,
+        'conditions': sorted(set(params.getlist('condition')) & set(CONDITIONS)),
+        'price_min': parse_price(params.get('price_min')),
+        'price_max': parse_price(params.get('price_max')),
+        'sort': sort,
+        'region': parse_region(params.get('region')),
+    }
+
+
+def condition_q(filters):
+    return Q(item_condition__in=filters['conditions']) if filters['conditions'] else Q()
+
+
+def price_q(price_min, price_max):
+    q = Q()
+    if price_min is not None:
+        q &= Q(item_price__gte=price_min)
+    if price_max is not None:
+        q &= Q(item_price__lt=price_max)
+    return q
+
+
+def base_posts(filters):
+    queryset = Post.objects.filter(is_sold=False)
+    if filters['region']:
+        queryset = queryset.filter(region_q(filters['region']))
+    return queryset
+
+
+def matching_posts(filters):
+    # 검색어와 지역만 적용한 후보. 조건/가격 필터는 facet을 셀 때 따로 건다.
+    queryset = base_posts(filters)
+    if not tokenize(filters['query']):
+        return queryset
+    return Post.objects.filter(id__in=search_posts(queryset, filters['query']).values('id'))
+
+
+def filtered_posts(filters):
+    queryset = search_posts(base_posts(filters), filters['query'])
+    queryset = queryset.filter(condition_q(filters), price_q(filters['price_min'], filters['price_max']))
+    ordering = SORTS[filters['sort']]
+    if ordering is not None:
+        queryset = queryset.order_by(*ordering)
+    return queryset
+
+
+def facet_cache_key(filters):
+    # 정렬은 개수에 영향이 없으므로 키에서 뺀다. 검색어는 토큰 집합으로 정규화한다.
+    normalized = [
+        sorted(set(tokenize(filters['query']))),
+        filters['conditions'],
+        filters['price_min'],
+        filters['price_max'],
+        filters['region'],
+    ]
+    digest = hashlib.md5(json.dumps(normalized, ensure_ascii=False).encode()).hexdigest()
+    return f'search-facets:{digest}'
+
+
+def count_facets(filters):
+    # 한 번의 집계 쿼리로 모든 facet을 센다.
+    # 상태별 개수에는 가격 필터를, 가격대별 개수에는 상태 필터를 건다(자기 자신의 필터는 빼고 센다).
+    in_price = price_q(filters['price_min'], filters['price_max'])
+    in_condition = condition_q(filters)
+    aggregates = {}
+    for i, condition in enumerate(CONDITIONS):
+        aggregates[f'condition_{i}'] = Count('id', filter=Q(item_condition=condition) & in_price)
+    for i, (low, high) in enumerate(PRICE_BUCKETS):
+        aggregates[f'price_{i}'] = Count('id', filter=price_q(low, high) & in_condition)
+    counts = matching_posts(filters).aggregate(**aggregates)
+    return {
+        'conditions': [counts[f'condition_{i}'] for i in range(len(CONDITIONS))],
+        'price_buckets': [counts[f'price_{i}'] for i in range(len(PRICE_BUCKETS))],
+    }
+
+
+def facet_counts(filters):
+    key = facet_cache_key(filters)
+    counts = cache.get(key)
+    if counts is None:
+        counts = count_facets(filters)
+        cache.set(key, counts, getattr(settings, 'SEARCH_FACET_CACHE_TIMEOUT', 60))
+    return counts
+
+
+def filter_params(filters, **overrides):
+    params = {
+        'query': filters['query'],
+        'condition': filters['conditions'],
+        'price_min': filters['price_min'],
+        'price_max': filters['price_max'],
+        'sort': filters['sort'],
+        'region': filters['region'],
+    }
+    params.update(overrides)
+    return urlencode(
+        {name: value for name, value in params.items() if value not in (None, '', [])},
+        doseq=True,
+    )
+
+
+def price_label(low, high):
+    if low is None:
+        return f'{high:,}원 미만'
+    if high is None:
+        return f'{low:,}원 이상'
+    return f'{low:,}원 ~ {high:,}원'
+
+
+def facet_context(filters):
+    counts = facet_counts(filters)
+    return {
+        'filters': filters,
+        'filter_params': filter_params(filters),
+        'condition_facets': [
+            {'value': value, 'count': count, 'selected': value in filters['conditions']}
+            for value, count in zip(CONDITIONS, counts['conditions'])
+        ],
+        'price_facets': [
+            {
+                'label': price_label(low, high),
+                'count': count,
+                'selected': (filters['price_min'], filters['price_max']) == (low, high),
+                'params': filter_params(filters, price_min=low, price_max=high),
+            }
+            for (low, high), count in zip(PRICE_BUCKETS, counts['price_buckets'])
+        ],
+        'sort_options': [
+            {'value': value, 'label': label, 'selected': value == filters['sort']}
+            for value, label in SORT_LABELS.items()
+        ],
+    }
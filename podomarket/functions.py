@@ -1,7 +1,47 @@
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.core.cache import cache
 from django.shortcuts import redirect
+from django.utils import timezone
 
+from allauth.account.models import EmailAddress
 from allauth.account.utils import send_email_confirmation
 
+from .models import User
+
+PROFILE_COMPLETE_SESSION_KEY = 'profile_complete'
+
 def confirmation_required_redirect(self, request):
     send_email_confirmation(request, request.user)
-    return redirect('account_email_confirmation_required')
\ No newline at end of file
+    return redirect('account_email_confirmation_required')
+
+def email_verified_cache_key(user):
+    # 캐시는 프로세스마다 따로일 수 있으므로 지우는 대신 유저 행의 수정 시각으로 키를 바꾼다.
+    # 다른 프로세스도 다음 요청에서 유저를 읽으면 새 키를 본다. 수정 시각은 저장할 때마다 앞으로만 가므로
+    # 메모리에 있던 유저를 나중에 저장해도 예전 키로 돌아가지 않는다.
+    return f'email-verified:{user.pk}:{user.dt_updated.timestamp()}'
+
+def is_email_verified(user):
+    key = email_verified_cache_key(user)
+    verified = cache.get(key)
+    if verified is None:
+        verified = EmailAddress.objects.filter(user=user, verified=True).exists()
+        cache.set(key, verified, getattr(settings, 'EMAIL_VERIFIED_CACHE_TIMEOUT', 60 * 10))
+    return verified
+
+def forget_email_verified(user_id):
+    User.objects.filter(pk=user_id).update(dt_updated=timezone.now())
+
+def is_profile_complete(user):
+    return bool(user.nickname and user.kakao_id and user.address)
+
+def remember_profile_complete(request, user):
+    # 세션에 로그인한 유저 id를 저장해 두면 다른 유저로 로그인했을 때 무효가 된다.
+    if is_profile_complete(user):
+        request.session[PROFILE_COMPLETE_SESSION_KEY] = str(user.pk)
+    else:
+        request.session.pop(PROFILE_COMPLETE_SESSION_KEY, None)
+
+def has_complete_profile_in_session(request):
+    user_id = request.session.get(SESSION_KEY)
+    return user_id is not None and request.session.get(PROFILE_COMPLETE_SESSION_KEY) == str(user_id)
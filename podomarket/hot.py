@@ -0,0 +1,84 @@
+import math
+import time
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import F, Value
+from django.db.models.functions import Exp, Least
+
+from .models import Post, Comment, Like
+
+# hot_score = Σ 가중치 × exp(-λ × (지금 - 일어난 시각)) (글 작성, 좋아요, 댓글)
+#
+# 매번 모든 글을 감쇠시킬 수는 없으므로 각 글의 점수는 자기 기준 시각(hot_ts) 시점의 값으로 저장한다.
+# 새 이벤트는 기준 시각으로 환산해 더하기만 하면 되고(가중치 × exp(λ × (t - hot_ts))),
+# rebase_hot_scores가 주기적으로 모든 글의 기준 시각을 같은 시각으로 옮기면서 감쇠시킨다.
+# 기준 시각이 같은 글끼리는 저장된 값의 순서가 곧 지금 시점의 순서라서 인덱스로 바로 정렬할 수 있다.
+# 마지막 rebase 이후에 생긴 글만 기준 시각이 조금 늦은데, 그 오차는 exp(λ × rebase 간격) 배 이내다.
+
+DEFAULT_WEIGHTS = {'post': 3.0, 'like': 1.0, 'comment': 2.0}
+
+# exp()가 float 범위(약 709)를 넘지 않도록 지수를 자른다. rebase가 한동안 돌지 않은 글에도
+# 좋아요/댓글 UPDATE가 실패하지 않게 하기 위한 안전장치로, 기본 반감기에서 약 2.4년에 해당한다.
+# 여러 번 더해도 점수가 무한대가 되지 않도록 여유를 둔다.
+MAX_EXPONENT = 600.0
+
+
+def hot_weight(kind):
+    # 기본값은 DEFAULT_WEIGHTS 한 곳에 두고, settings.HOT_SCORE_WEIGHTS는 바꿀 항목만 덮어쓴다.
+    return {**DEFAULT_WEIGHTS, **getattr(settings, 'HOT_SCORE_WEIGHTS', {})}[kind]
+
+
+def decay_rate():
+    # 반감기(시간)를 초당 감쇠율 λ로 바꾼다.
+    return math.log(2) / (getattr(settings, 'HOT_SCORE_HALF_LIFE_HOURS', 24) * 3600)
+
+
+def hot_increment(kind, sign=1, dt=None):
+    # 이벤트 하나를 각 행의 기준 시각(hot_ts)으로 환산한 값. update()에 F('hot_score') +로 붙여 쓴다.
+    timestamp = dt.timestamp() if dt is not None else time.time()
+    exponent = Least((Value(timestamp) - F('hot_ts')) * decay_rate(), Value(MAX_EXPONENT))
+    return sign * hot_weight(kind) * Exp(exponent)
+
+
+def rebase_hot_scores(batch_size=1000, now=None):
+    # 모든 글의 점수를 now 기준으로 감쇠시킨다. id 범위로 나눠 짧은 트랜잭션 여러 번으로 처리한다.
+    # 거래완료된 글도 옮겨야 나중에 붙는 좋아요/댓글의 지수가 커지지 않는다.
+    now = now if now is not None else time.time()
+    rate = decay_rate()
+    queryset = Post.objects.filter(hot_ts__lt=now)
+    updated = 0
+    last_id = 0
+    while True:
+        ids = list(queryset.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size])
+        if not ids:
+            break
+        updated += queryset.filter(id__gte=ids[0], id__lte=ids[-1]).update(
+            hot_score=F('hot_score') * Exp((F('hot_ts') - Value(now)) * rate),
+            hot_ts=now,
+        )
+        last_id = ids[-1]
+    return updated
+
+
+def rebuild_hot_scores(batch_size=1000, now=None):
+    # bulk_create처럼 시그널 없이 들어온 데이터를 위해 좋아요와 댓글로 점수를 처음부터 다시 계산한다.
+    now = now if now is not None else time.time()
+    rate = decay_rate()
+    scores = {}
+
+    def add(post_id, kind, dt):
+        scores[post_id] = scores.get(post_id, 0) + hot_weight(kind) * math.exp((dt.timestamp() - now) * rate)
+
+    for post_id, dt in Post.objects.values_list('id', 'dt_created').iterator(chunk_size=batch_size):
+        add(post_id, 'post', dt)
+    post_type = ContentType.objects.get_for_model(Post)
+    for post_id, dt in Like.objects.filter(content_type=post_type).values_list('object_id', 'dt_created').iterator(chunk_size=batch_size):
+        if post_id in scores:
+            add(post_id, 'like', dt)
+    for post_id, dt in Comment.objects.values_list('post_id', 'dt_created').iterator(chunk_size=batch_size):
+        add(post_id, 'comment', dt)
+
+    posts = [Post(id=post_id, hot_score=score, hot_ts=now) for post_id, score in scores.items()]
+    Post.objects.bulk_update(posts, ['hot_score', 'hot_ts'], batch_size=batch_size)
+    return len(posts)
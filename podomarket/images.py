@@ -0,0 +1,107 @@
+import os
+import posixpath
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+# 이름: (크기, 자르기 여부). thumb는 카드 썸네일(.post .thumb)을,
+# medium은 상세 페이지 이미지(.post-detail .image)를 2배 해상도로 채운다.
+VARIANTS = {
+    'thumb': ((600, 376), True),
+    'medium': ((1000, 660), False),
+}
+
+FORMATS = {
+    'jpeg': ('JPEG', 'jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+    'webp': ('WEBP', 'webp', {'quality': 80, 'method': 4}),
+}
+
+IMAGE_FIELDS = ('image1', 'image2', 'image3')
+
+_executor = None
+
+
+def variant_name(name, variant, fmt='jpeg'):
+    directory, filename = posixpath.split(name)
+    stem = posixpath.splitext(filename)[0]
+    extension = FORMATS[fmt][1]
+    return posixpath.join(directory, 'variants', f'{stem}_{variant}.{extension}')
+
+
+def render_variants(source_path, targets):
+    # 별도 프로세스에서 실행되므로 DB나 Django 스토리지에 접근하지 않고
+    # 파일 경로만 다룬다. targets는 [(variant, fmt, path), ...] 형태. 새로 만든 파일 수를 돌려준다.
+    # 원본보다 새 파일이 이미 있는 버전은 건너뛰고, 모두 있으면 원본을 디코딩하지 않는다.
+    source_mtime = os.path.getmtime(source_path)
+    targets = [
+        (variant, fmt, path) for variant, fmt, path in targets
+        if not (os.path.exists(path) and os.path.getmtime(path) >= source_mtime)
+    ]
+    if not targets:
+        return 0
+
+    with Image.open(source_path) as original:
+        image = ImageOps.exif_transpose(original).convert('RGB')
+
+    for variant, fmt, path in targets:
+        size, crop = VARIANTS[variant]
+        if crop:
+            resized = ImageOps.fit(image, size, Image.LANCZOS)
+        else:
+            resized = image.copy()
+            resized.thumbnail(size, Image.LANCZOS)
+        pil_format, extension, options = FORMATS[fmt]
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # 쓰는 도중의 파일이 노출되지 않도록 임시 파일에 저장한 뒤 교체한다.
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        resized.save(tmp_path, pil_format, **options)
+        os.replace(tmp_path, path)
+    return len(targets)
+
+
+def get_targets(name):
+    return [
+        (variant, fmt, default_storage.path(variant_name(name, variant, fmt)))
+        for variant in VARIANTS
+        for fmt in FORMATS
+    ]
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        workers = getattr(settings, 'IMAGE_VARIANT_WORKERS', 2)
+        _executor = ProcessPoolExecutor(max_workers=workers)
+    return _executor
+
+
+def schedule_variants(post, fields=IMAGE_FIELDS):
+    # 요청을 막지 않도록 프로세스 풀에 넘기고 결과는 기다리지 않는다. 넘긴 작업의 future 목록을 돌려준다.
+    futures = []
+    for field in fields:
+        image = getattr(post, field)
+        if image:
+            futures.append(
+                get_executor().submit(render_variants, default_storage.path(image.name), get_targets(image.name))
+            )
+    return futures
+
+
+def generate_variants(post):
+    rendered = 0
+    for field in IMAGE_FIELDS:
+        image = getattr(post, field)
+        if image and default_storage.exists(image.name):
+            rendered += render_variants(default_storage.path(image.name), get_targets(image.name))
+    return rendered
+
+
+def variant_url(image, variant, fmt='jpeg', fallback=True):
+    if not image:
+        return ''
+    name = variant_name(image.name, variant, fmt)
+    if default_storage.exists(name):
+        return default_storage.url(name)
+    return image.url if fallback else ''
@@ -0,0 +1,279 @@
+import json
+import tempfile
+import time
+from collections import defaultdict
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db import connections, router, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import User, Post, Comment, Like
+from .seeding import manual_timestamps
+
+MODELS = {
+    'podomarket.user': User,
+    'podomarket.post': Post,
+    'podomarket.comment': Comment,
+    'podomarket.like': Like,
+}
+
+# 앞의 모델이 먼저 저장되어야 뒤의 모델이 참조할 수 있다.
+FLUSH_ORDER = [User, Post, Comment, Like]
+
+# 검증은 각 배치에서 한 번에 하므로 clean_fields에서는 FK를 건너뛴다.
+FOREIGN_KEYS = {
+    User: {},
+    Post: {'author': User},
+    Comment: {'author': User, 'post': Post},
+    Like: {'user': User},
+}
+
+IGNORED_USER_FIELDS = {'groups', 'user_permissions', 'following'}
+
+
+# 디코딩에 실패한 위치가 버퍼 끝에서 이만큼 안쪽이면 잘린 원소가 아니라 잘못된 원소로 본다.
+# (true, 숫자, \uXXXX처럼 버퍼 경계에서 잘릴 수 있는 토큰보다 길다.)
+TRUNCATION_MARGIN = 64
+
+
+def iter_json_array(stream, chunk_size=1 << 16):
+    # 큰 JSON 배열을 통째로 읽지 않고 원소 하나씩 디코딩한다.
+    # 잘못된 원소를 만나면 파일 끝까지 읽지 않고 그 원소의 번호와 문자 위치를 알려 준다.
+    decoder = json.JSONDecoder()
+    buffer, pos, eof = '', 0, False
+    offset = 0
+    index = 0
+
+    def fill():
+        nonlocal buffer, pos, eof, offset
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            eof = True
+        offset += pos
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+    while True:
+        while pos < len(buffer) and buffer[pos].isspace():
+            pos += 1
+        if pos < len(buffer):
+            break
+        if eof:
+            return
+        fill()
+    if buffer[pos] != '[':
+        raise ValueError('JSON 배열이 아닙니다.')
+    pos += 1
+
+    while True:
+        while pos < len(buffer) and (buffer[pos].isspace() or buffer[pos] == ','):
+            pos += 1
+        if pos >= len(buffer):
+            if eof:
+                raise ValueError('JSON 배열이 닫히지 않았습니다.')
+            fill()
+            continue
+        if buffer[pos] == ']':
+            return
+        try:
+            obj, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError as error:
+            # 문자열이 덜 읽힌 경우는 닫힐 때까지 더 읽는다.
+            truncated = error.msg.startswith('Unterminated string') or error.pos + TRUNCATION_MARGIN >= len(buffer)
+            if eof or not truncated:
+                raise ValueError(
+                    f'{index}번째 원소(문자 위치 {offset + error.pos})를 읽을 수 없습니다: {error.msg}'
+                ) from error
+            fill()
+            continue
+        yield obj
+        index += 1
+        pos = end
+
+
+def iter_jsonl(stream):
+    for number, line in enumerate(stream, 1):
+        line = line.strip()
+        if line:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as error:
+                raise ValueError(f'{number}번째 줄(문자 위치 {error.pos})을 읽을 수 없습니다: {error.msg}') from error
+
+
+def iter_records(stream, path=''):
+    if path.endswith('.jsonl'):
+        return iter_jsonl(stream)
+    return iter_json_array(stream)
+
+
+def total_changes(model):
+    # 이 연결에서 지금까지 INSERT/UPDATE/DELETE된 행 수. ignore_conflicts로 건너뛴 행은 들어가지 않는다.
+    with connections[router.db_for_write(model)].cursor() as cursor:
+        cursor.execute('SELECT total_changes()')
+        return cursor.fetchone()[0]
+
+
+def resolve_content_type(value):
+    if isinstance(value, (list, tuple)):
+        return ContentType.objects.get_by_natural_key(*value)
+    return ContentType.objects.get_for_id(value)
+
+
+class MarketImporter:
+    def __init__(self, batch_size=1000, progress_every=10000, log=None):
+        self.batch_size = batch_size
+        self.progress_every = progress_every
+        self.log = log or (lambda message: None)
+        self.buffers = defaultdict(list)
+        self.imported = defaultdict(int)
+        self.duplicates = defaultdict(int)
+        self.rejected = defaultdict(int)
+        self.skipped = 0
+        self.seen = 0
+        self.started = None
+        self.now = timezone.now()
+        # 팔로우는 양쪽 유저가 모두 들어온 뒤에 넣어야 하므로 임시 파일에 모아 둔다.
+        self.follows = tempfile.TemporaryFile(mode='w+', encoding='utf-8')
+
+    def run(self, records):
+        self.started = time.perf_counter()
+        with manual_timestamps(Post, Comment, Like):
+            for record in records:
+                self.seen += 1
+                self.add(record)
+                if any(len(buffer) >= self.batch_size for buffer in self.buffers.values()):
+                    self.flush()
+                if self.seen % self.progress_every == 0:
+                    self.report_progress()
+            self.flush()
+        self.import_follows()
+        self.report_progress()
+        return {
+            'imported': {model.__name__: count for model, count in self.imported.items()},
+            'duplicates': {model.__name__: count for model, count in self.duplicates.items()},
+            'rejected': {model.__name__: count for model, count in self.rejected.items()},
+            'skipped': self.skipped,
+        }
+
+    def report_progress(self):
+        elapsed = time.perf_counter() - self.started
+        total = sum(self.imported.values())
+        self.log(f'{self.seen}행 읽음, {total}행 저장 ({total / elapsed if elapsed else 0:.0f}행/초)')
+
+    def add(self, record):
+        model = MODELS.get(str(record.get('model', '')).lower())
+        if model is None:
+            self.skipped += 1
+            return
+        fields = dict(record.get('fields', {}))
+        if model is User:
+            if record.get('pk') is not None:
+                for followee_id in fields.get('following', []):
+                    self.follows.write(f"{record['pk']},{followee_id}\n")
+            for name in IGNORED_USER_FIELDS:
+                fields.pop(name, None)
+        instance = self.build(model, record.get('pk'), fields)
+        if instance is not None:
+            self.buffers[model].append(instance)
+
+    def build(self, model, pk, fields):
+        values = {}
+        for name, value in fields.items():
+            try:
+                field = model._meta.get_field(name)
+            except FieldDoesNotExist:
+                self.rejected[model] += 1
+                return None
+            if name in FOREIGN_KEYS[model]:
+                values[field.attname] = value
+            elif name == 'content_type':
+                try:
+                    values['content_type_id'] = resolve_content_type(value).id
+                except ContentType.DoesNotExist:
+                    self.rejected[model] += 1
+                    return None
+            elif isinstance(value, str) and field.get_internal_type() == 'DateTimeField':
+                values[name] = parse_datetime(value)
+            else:
+                values[name] = value
+        for name in ('dt_created', 'dt_updated'):
+            if hasattr(model, name) and values.get(name) is None and model is not User:
+                values[name] = self.now
+        instance = model(pk=pk, **values)
+        exclude = list(FOREIGN_KEYS[model]) + ['content_type', 'password']
+        try:
+            instance.clean_fields(exclude=exclude)
+        except ValidationError:
+            self.rejected[model] += 1
+            return None
+        return instance
+
+    def existing_ids(self, model, ids):
+        ids = {value for value in ids if value is not None}
+        if not ids:
+            return set()
+        return set(model.objects.filter(pk__in=ids).values_list('pk', flat=True))
+
+    def filter_references(self, model, instances):
+        # 배치마다 참조 대상이 실제로 있는지 모델별 쿼리 한 번으로 확인한다.
+        valid = instances
+        for name, target in FOREIGN_KEYS[model].items():
+            attname = model._meta.get_field(name).attname
+            existing = self.existing_ids(target, (getattr(obj, attname) for obj in valid))
+            valid = [obj for obj in valid if getattr(obj, attname) in existing]
+        if model is Like:
+            by_type = defaultdict(set)
+            for like in valid:
+                by_type[like.content_type_id].add(like.object_id)
+            existing = {
+                content_type_id: self.existing_ids(ContentType.objects.get_for_id(content_type_id).model_class(), object_ids)
+                for content_type_id, object_ids in by_type.items()
+            }
+            valid = [like for like in valid if like.object_id in existing[like.content_type_id]]
+        self.rejected[model] += len(instances) - len(valid)
+        return valid
+
+    def flush(self):
+        with transaction.atomic():
+            for model in FLUSH_ORDER:
+                instances = self.buffers.pop(model, [])
+                if not instances:
+                    continue
+                valid = self.filter_references(model, instances)
+                self.insert(model, valid)
+
+    def insert(self, model, instances):
+        # 이미 있는 행(같은 pk나 unique 값)은 ignore_conflicts로 건너뛰므로, 보낸 행 수가 아니라 실제로 들어간 행 수를 센다.
+        before = total_changes(model)
+        model.objects.bulk_create(instances, batch_size=self.batch_size, ignore_conflicts=True)
+        inserted = total_changes(model) - before
+        self.imported[model] += inserted
+        self.duplicates[model] += len(instances) - inserted
+
+    def import_follows(self):
+        Follow = User.following.through
+        self.follows.seek(0)
+        batch = []
+        for line in self.follows:
+            from_id, to_id = (int(value) for value in line.split(','))
+            batch.append((from_id, to_id))
+            if len(batch) >= self.batch_size:
+                self.save_follows(Follow, batch)
+                batch = []
+        self.save_follows(Follow, batch)
+        self.follows.close()
+
+    def save_follows(self, Follow, pairs):
+        if not pairs:
+            return
+        existing = self.existing_ids(User, [user_id for pair in pairs for user_id in pair])
+        edges = [
+            Follow(from_user_id=from_id, to_user_id=to_id)
+            for from_id, to_id in pairs
+            if from_id in existing and to_id in existing and from_id != to_id
+        ]
+        with transaction.atomic():
+            self.insert(Follow, edges)
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from podomarket.archive import archivable_posts, archive_posts, restore_batch
+from podomarket.models import ArchivedPost
+
+
+class Command(BaseCommand):
+    help = '거래완료 후 오래된 글을 댓글, 좋아요와 함께 보관 테이블로 옮깁니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--limit', type=int, default=None, help='이번 실행에서 옮길 최대 글 수')
+        parser.add_argument('--dry-run', action='store_true', help='옮길 글 수만 출력합니다.')
+        parser.add_argument('--restore', type=int, nargs='+', metavar='POST_ID',
+                            help='보관된 글을 다시 활성 테이블로 되돌립니다.')
+        parser.add_argument('--restore-unsold', action='store_true',
+                            help='판매 중인 채로 보관된 글을 모두 되돌립니다.')
+
+    def handle(self, *args, **options):
+        if options['restore'] or options['restore_unsold']:
+            ids = options['restore'] or list(
+                ArchivedPost.objects.filter(is_sold=False).values_list('id', flat=True)
+            )
+            restored = 0
+            for start in range(0, len(ids), options['batch_size']):
+                restored += restore_batch(ids[start:start + options['batch_size']])
+            self.stdout.write(self.style.SUCCESS(f'글 {restored}개를 되돌렸습니다.'))
+            return
+        if options['dry_run']:
+            self.stdout.write(f'보관 대상: {archivable_posts().count()}개')
+            return
+        archived = archive_posts(
+            batch_size=options['batch_size'],
+            limit=options['limit'],
+            log=self.stdout.write,
+        )
+        self.stdout.write(self.style.SUCCESS(f'글 {archived}개를 보관했습니다.'))
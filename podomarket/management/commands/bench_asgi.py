@@ -0,0 +1,74 @@
+import json
+import subprocess
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_test_environment
+
+from podomarket.benchmark import LOAD_ROUTES, run_load, save_results
+
+# asgi는 같은 동기 뷰를 ASGI 핸들러(스레드 어댑터 경유)로 돌린다.
+MODES = ('wsgi', 'asgi')
+
+
+class Command(BaseCommand):
+    help = '읽기 라우트에 동시 요청을 보내 WSGI와 ASGI의 처리량을 비교합니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mode', choices=MODES, action='append', dest='modes')
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--concurrency', type=int, default=64)
+        parser.add_argument('--warmup', type=int, default=20)
+        parser.add_argument('--route', action='append', dest='routes', choices=LOAD_ROUTES)
+        parser.add_argument('--output', default='bench_results_asgi.json')
+        parser.add_argument('--json', action='store_true', help='결과 JSON만 출력합니다.')
+
+    def handle(self, *args, **options):
+        modes = options['modes'] or list(MODES)
+        if options['json']:
+            # 하위 프로세스로 불린 경우: 한 가지 모드만 측정해 결과를 출력한다.
+            setup_test_environment()
+            try:
+                summary = run_load(
+                    modes[0],
+                    requests=options['requests'],
+                    concurrency=options['concurrency'],
+                    warmup=options['warmup'],
+                    only=options['routes'],
+                )
+            except ValueError as error:
+                raise CommandError(str(error))
+            self.stdout.write(json.dumps(summary, ensure_ascii=False))
+            return
+
+        # 캐시와 커넥션 상태가 섞이지 않도록 모드마다 새 프로세스에서 측정한다.
+        results = {}
+        for mode in modes:
+            self.stdout.write(f'{mode} 측정 중...')
+            results[mode] = self.run_mode(mode, options)
+            summary = results[mode]
+            self.stdout.write(
+                f"{mode}: {summary['throughput_rps']:.1f} req/s, "
+                f"{summary['requests']}건 중 오류 {summary['errors']}건"
+            )
+            for name, route in summary['routes'].items():
+                self.stdout.write(
+                    f"  {name}: p50 {route['p50_ms']:.2f}ms, p95 {route['p95_ms']:.2f}ms, p99 {route['p99_ms']:.2f}ms"
+                )
+
+        save_results(options['output'], results)
+        self.stdout.write(self.style.SUCCESS(f"결과를 {options['output']}에 저장했습니다."))
+
+    def run_mode(self, mode, options):
+        command = [
+            sys.executable, sys.argv[0], 'bench_asgi', '--json', '--mode', mode,
+            '--requests', str(options['requests']),
+            '--concurrency', str(options['concurrency']),
+            '--warmup', str(options['warmup']),
+        ]
+        for route in options['routes'] or []:
+            command += ['--route', route]
+        process = subprocess.run(command, capture_output=True, text=True)
+        if process.returncode != 0:
+            raise CommandError(f'{mode} 측정에 실패했습니다.\n{process.stderr}')
+        return json.loads(process.stdout.strip().splitlines()[-1])
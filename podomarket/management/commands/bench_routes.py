@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_test_environment
+
+from podomarket.benchmark import compare, load_results, run_benchmark, save_results
+
+
+class Command(BaseCommand):
+    help = 'podomarket/urls.py의 모든 라우트를 테스트 클라이언트로 호출해 지연시간과 쿼리 수를 측정합니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--route', action='append', dest='routes')
+        parser.add_argument('--output', default='bench_results.json')
+        parser.add_argument('--compare', default=None, help='비교할 이전 결과 JSON 파일')
+
+    def handle(self, *args, **options):
+        # 테스트 클라이언트 호스트(testserver)를 허용하고 메일 발송을 막는다.
+        setup_test_environment()
+        try:
+            results = run_benchmark(
+                iterations=options['iterations'],
+                warmup=options['warmup'],
+                only=options['routes'],
+                log=self.stdout.write,
+            )
+        except ValueError as error:
+            raise CommandError(str(error))
+
+        save_results(options['output'], results)
+        if results['skipped']:
+            self.stdout.write(self.style.WARNING(
+                f"벤치마크 설정이 없는 라우트: {', '.join(results['skipped'])}"
+            ))
+        self.stdout.write(self.style.SUCCESS(f"결과를 {options['output']}에 저장했습니다."))
+
+        if options['compare']:
+            for row in compare(load_results(options['compare']), results):
+                change = f"{row['p95_change']:+.1f}%" if row['p95_change'] is not None else '-'
+                self.stdout.write(
+                    f"{row['route']}: p95 {row['p95_before']:.2f} -> {row['p95_after']:.2f}ms ({change}), "
+                    f"queries {row['queries_before']} -> {row['queries_after']}"
+                )
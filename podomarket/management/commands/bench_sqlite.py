@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from podomarket.benchmark import SQLITE_MODES, run_contention, save_results
+
+
+class Command(BaseCommand):
+    help = '임시 SQLite 파일에 쓰기/읽기 스레드를 동시에 돌려 기본 설정과 튜닝된 설정(WAL 등)의 경합을 비교합니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mode', choices=SQLITE_MODES, action='append', dest='modes')
+        parser.add_argument('--writers', type=int, default=8)
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--transactions', type=int, default=100, help='쓰기 스레드마다 실행할 트랜잭션 수')
+        parser.add_argument('--output', default=None)
+
+    def handle(self, *args, **options):
+        results = {}
+        for mode in options['modes'] or list(SQLITE_MODES):
+            self.stdout.write(f'{mode} 측정 중...')
+            result = run_contention(
+                mode,
+                writers=options['writers'],
+                readers=options['readers'],
+                transactions=options['transactions'],
+            )
+            results[mode] = result
+            self.stdout.write(
+                f"{mode}: 쓰기 {result['writes_per_s']:.1f}/s "
+                f"(p95 {self.format(result['write_p95_ms'])}ms, 실패 {result['write_errors']}건), "
+                f"읽기 {result['reads_per_s']:.1f}/s "
+                f"(p95 {self.format(result['read_p95_ms'])}ms, 실패 {result['read_errors']}건)"
+            )
+        if options['output']:
+            save_results(options['output'], results)
+            self.stdout.write(self.style.SUCCESS(f"결과를 {options['output']}에 저장했습니다."))
+
+    def format(self, value):
+        return '-' if value is None else f'{value:.2f}'
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from podomarket.similar import build_similar_posts, update_similar_posts
+
+
+class Command(BaseCommand):
+    help = '글 제목/본문의 TF-IDF 벡터로 글마다 비슷한 글을 계산해 SimilarPost에 저장합니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--incremental', action='store_true',
+                            help='마지막 빌드 이후에 올라오거나 바뀐 글만 다시 계산합니다.')
+        parser.add_argument('--k', type=int, default=None)
+        parser.add_argument('--batch-size', type=int, default=512)
+        parser.add_argument('--max-features', type=int, default=None)
+
+    def handle(self, *args, **options):
+        if options['incremental']:
+            result = update_similar_posts(
+                k=options['k'],
+                batch_size=options['batch_size'],
+                log=self.stdout.write,
+            )
+        else:
+            result = build_similar_posts(
+                k=options['k'],
+                batch_size=options['batch_size'],
+                max_features=options['max_features'],
+                log=self.stdout.write,
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"글 {result['posts']}개의 비슷한 글 {result['neighbours']}개를 저장했습니다."
+        ))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from podomarket.storage import ORPHAN_GRACE, collect_garbage
+
+
+class Command(BaseCommand):
+    help = '어떤 게시글/프로필에서도 참조하지 않는 미디어 blob을 지웁니다.'
+
+    def handle(self, *args, **options):
+        deleted = collect_garbage(grace=ORPHAN_GRACE)
+        self.stdout.write(self.style.SUCCESS(f'{deleted}개의 blob을 지웠습니다.'))
@@ -0,0 +1,31 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from podomarket.replication import copy_to_replica
+
+
+class Command(BaseCommand):
+    help = '프라이머리 SQLite DB를 복제본 파일로 복사합니다. 로컬에서 복제 지연을 흉내낼 때 씁니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--alias', action='append', dest='aliases')
+        parser.add_argument('--interval', type=float, default=0, help='0보다 크면 이 간격(초)마다 계속 복사합니다.')
+
+    def handle(self, *args, **options):
+        aliases = options['aliases'] or settings.REPLICA_DATABASES
+        if not aliases:
+            raise CommandError('복제본이 없습니다. PODOMARKET_REPLICA=1로 실행하세요.')
+        for alias in aliases:
+            if alias not in settings.REPLICA_DATABASES:
+                raise CommandError(f'{alias}는 복제본이 아닙니다.')
+
+        while True:
+            for alias in aliases:
+                start = time.perf_counter()
+                copy_to_replica(alias)
+                self.stdout.write(f'{alias}: 복사 완료 ({(time.perf_counter() - start) * 1000:.0f}ms)')
+            if options['interval'] <= 0:
+                break
+            time.sleep(options['interval'])
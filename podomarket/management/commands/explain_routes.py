@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_test_environment
+
+from podomarket.queryplan import advise
+
+
+class Command(BaseCommand):
+    help = '각 라우트가 실행하는 쿼리에 EXPLAIN QUERY PLAN을 돌려 전체 테이블 스캔과 임시 B-tree 정렬을 찾습니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--route', action='append', dest='routes')
+        parser.add_argument('--ignore-table', action='append', dest='ignored_tables', default=[],
+                            help='작은 테이블처럼 스캔해도 괜찮은 테이블은 건너뜁니다.')
+        parser.add_argument('--verbose-plan', action='store_true', help='문제가 없는 쿼리의 실행 계획도 출력합니다.')
+
+    def handle(self, *args, **options):
+        # 테스트 클라이언트 호스트(testserver)를 허용하고 메일 발송을 막는다.
+        setup_test_environment()
+        try:
+            report = advise(only=options['routes'])
+        except ValueError as error:
+            raise CommandError(str(error))
+
+        flagged = 0
+        for name, route in report.items():
+            self.stdout.write(f"{name} ({route['url']}, {route['status']}): 쿼리 {len(route['queries'])}개")
+            for query in route['queries']:
+                issues = [
+                    issue for issue in query['issues']
+                    if not any(issue.endswith(f': {table}') for table in options['ignored_tables'])
+                ]
+                if not issues and not options['verbose_plan']:
+                    continue
+                flagged += bool(issues)
+                style = self.style.WARNING if issues else (lambda text: text)
+                self.stdout.write(style(f"  {', '.join(issues) or 'ok'}"))
+                self.stdout.write(f"    {query['sql'][:200]}")
+                for detail in query['plan']:
+                    self.stdout.write(f'      {detail}')
+
+        if flagged:
+            self.stdout.write(self.style.WARNING(f'인덱스를 검토할 쿼리 {flagged}개'))
+        else:
+            self.stdout.write(self.style.SUCCESS('전체 스캔이나 임시 정렬이 있는 쿼리가 없습니다.'))
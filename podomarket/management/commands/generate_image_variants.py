@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from podomarket.cards import invalidate_post
+from podomarket.images import generate_variants
+from podomarket.models import Post
+
+
+class Command(BaseCommand):
+    help = '기존 게시글 이미지의 썸네일/중간 크기/WebP 버전을 만듭니다.'
+
+    def handle(self, *args, **options):
+        count = rendered = 0
+        posts = Post.objects.select_related('author').only(
+            'id', 'dt_updated', 'image1', 'image2', 'image3', 'author__dt_updated',
+        )
+        for post in posts.iterator():
+            if generate_variants(post):
+                # 썸네일 없이 캐시된 카드를 지운다.
+                invalidate_post(post)
+                rendered += 1
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f'{count}개 글 중 {rendered}개 글의 이미지를 새로 만들었습니다.'))
@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from podomarket.counters import reconcile_counters
+from podomarket.hot import rebuild_hot_scores
+from podomarket.importer import MarketImporter, iter_records
+from podomarket.regions import rebuild_regions
+from podomarket.search import rebuild_index
+from podomarket.timeline import rebuild_timelines
+
+
+class Command(BaseCommand):
+    help = '유저/글/댓글/좋아요 덤프(JSON 배열 또는 JSONL)를 스트리밍으로 읽어 배치로 저장합니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--progress-every', type=int, default=10000)
+        parser.add_argument('--skip-rebuild', action='store_true', help='검색 인덱스/카운터/타임라인/지역/인기 점수 재생성을 건너뜀')
+
+    def handle(self, *args, **options):
+        importer = MarketImporter(
+            batch_size=options['batch_size'],
+            progress_every=options['progress_every'],
+            log=self.stdout.write,
+        )
+        try:
+            with open(options['path'], encoding='utf-8') as stream:
+                result = importer.run(iter_records(stream, options['path']))
+        except FileNotFoundError:
+            raise CommandError(f"{options['path']} 파일이 없습니다.")
+        except ValueError as error:
+            raise CommandError(f'JSON을 읽을 수 없습니다: {error}')
+
+        for name, count in result['imported'].items():
+            self.stdout.write(f'{name}: {count}행 저장')
+        for name, count in result['duplicates'].items():
+            if count:
+                self.stdout.write(f'{name}: 이미 있는 {count}행 건너뜀')
+        for name, count in result['rejected'].items():
+            if count:
+                self.stdout.write(self.style.WARNING(f'{name}: {count}행 검증 실패로 건너뜀'))
+        if result['skipped']:
+            self.stdout.write(f"지원하지 않는 모델 {result['skipped']}행 건너뜀")
+
+        if not options['skip_rebuild']:
+            # bulk_create는 시그널을 보내지 않으므로 파생 데이터를 다시 만든다.
+            self.stdout.write('검색 인덱스, 카운터, 타임라인, 지역, 인기 점수를 다시 만드는 중...')
+            rebuild_index()
+            reconcile_counters()
+            rebuild_timelines()
+            rebuild_regions()
+            rebuild_hot_scores()
+        self.stdout.write(self.style.SUCCESS('완료'))
@@ -0,0 +1,52 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from podomarket.perflog import percentile, read_records
+
+METRICS = ('wall_ms', 'sql_count', 'sql_ms', 'template_ms')
+
+
+class Command(BaseCommand):
+    help = '성능 로그(JSONL)를 뷰별 p50/p95/p99 표로 요약합니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default=None)
+        parser.add_argument('--sort', default='wall_ms', choices=METRICS)
+
+    def handle(self, *args, **options):
+        path = options['path'] or settings.PERF_LOG_PATH
+        samples = defaultdict(lambda: defaultdict(list))
+        try:
+            for record in read_records(path):
+                view = record.get('url_name') or record.get('path')
+                for metric in METRICS:
+                    # ASGI async 경로의 기록에는 SQL 항목이 비어 있다.
+                    if record.get(metric) is not None:
+                        samples[view][metric].append(record[metric])
+        except FileNotFoundError:
+            raise CommandError(f'{path} 파일이 없습니다.')
+
+        rows = []
+        for view, metrics in samples.items():
+            row = {'view': view, 'count': len(metrics['wall_ms'])}
+            for metric in METRICS:
+                values = sorted(metrics[metric])
+                for name, fraction in (('p50', 0.5), ('p95', 0.95), ('p99', 0.99)):
+                    row[f'{metric}_{name}'] = percentile(values, fraction)
+            rows.append(row)
+        rows.sort(key=lambda row: row[f"{options['sort']}_p95"] or 0, reverse=True)
+
+        columns = ['view', 'count'] + [
+            f'{metric}_{name}' for metric in METRICS for name in ('p50', 'p95', 'p99')
+        ]
+        table = [columns] + [[self.format(row[column]) for column in columns] for row in rows]
+        widths = [max(len(line[i]) for line in table) for i in range(len(columns))]
+        for line in table:
+            self.stdout.write('  '.join(cell.ljust(width) for cell, width in zip(line, widths)).rstrip())
+
+    def format(self, value):
+        if isinstance(value, float):
+            return f'{value:.2f}'
+        return str(value)
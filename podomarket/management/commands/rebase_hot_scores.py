@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from podomarket.hot import rebase_hot_scores, rebuild_hot_scores
+
+
+class Command(BaseCommand):
+    help = '모든 글의 인기 점수를 지금 시각 기준으로 감쇠시킵니다. 주기적으로 실행합니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--rebuild', action='store_true',
+                            help='좋아요와 댓글로 모든 글의 점수를 처음부터 다시 계산합니다.')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            count = rebuild_hot_scores(batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'글 {count}개의 인기 점수를 다시 계산했습니다.'))
+        else:
+            count = rebase_hot_scores(batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'글 {count}개의 인기 점수를 감쇠시켰습니다.'))
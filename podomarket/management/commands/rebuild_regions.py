@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from podomarket.regions import rebuild_regions
+
+
+class Command(BaseCommand):
+    help = '유저 주소로 지역 코드를 다시 만들고, 글의 지역과 지역별 글 수를 맞춥니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        result = rebuild_regions(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"유저 {result['users']}명의 지역 코드를 고치고, 지역 {result['regions']}곳의 글 수를 다시 셌습니다."
+        ))
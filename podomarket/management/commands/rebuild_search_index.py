@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from podomarket.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = '검색 인덱스(SearchToken)를 처음부터 다시 만듭니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        count = rebuild_index(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'{count}개의 글을 인덱싱했습니다.'))
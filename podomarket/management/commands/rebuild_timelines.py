@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from podomarket.timeline import rebuild_timelines
+
+
+class Command(BaseCommand):
+    help = '팔로워 수와 팔로잉 타임라인(TimelineEntry)을 처음부터 다시 만듭니다.'
+
+    def handle(self, *args, **options):
+        rebuild_timelines()
+        self.stdout.write(self.style.SUCCESS('타임라인을 다시 만들었습니다.'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from podomarket.counters import reconcile_counters
+
+
+class Command(BaseCommand):
+    help = '좋아요/댓글 수 컬럼을 실제 Like, Comment 개수와 맞춥니다.'
+
+    def handle(self, *args, **options):
+        fixed = reconcile_counters()
+        self.stdout.write(self.style.SUCCESS(
+            f"Post {fixed['post']}개, Comment {fixed['comment']}개의 카운터를 수정했습니다."
+        ))
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_test_environment
+
+from podomarket.benchmark import save_results
+from podomarket.replay import ClientTarget, HttpTarget, load_trace, replay
+
+
+class Command(BaseCommand):
+    help = 'JSONL 요청 기록을 기록된 유저의 세션으로 다시 재생하고 처리량/오류율/지연시간을 보고합니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('trace', help='성능 로그 형식의 JSONL 파일')
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--speed', type=float, default=1.0, help='재생 배속. 0이면 간격 없이 재생')
+        parser.add_argument('--limit', type=int, default=None)
+        parser.add_argument('--base-url', default=None, help='지정하면 실행 중인 서버에 HTTP로 요청')
+        parser.add_argument('--output', default=None)
+
+    def handle(self, *args, **options):
+        try:
+            records = load_trace(options['trace'], limit=options['limit'])
+        except FileNotFoundError:
+            raise CommandError(f"{options['trace']} 파일이 없습니다.")
+        if not records:
+            raise CommandError('재생할 요청이 없습니다.')
+
+        if options['base_url']:
+            target = HttpTarget(options['base_url'])
+        else:
+            # 테스트 클라이언트 호스트(testserver)를 허용하고 메일 발송을 막는다.
+            setup_test_environment()
+            target = ClientTarget()
+
+        self.stdout.write(self.style.WARNING('쓰기 요청도 그대로 재생되므로 DB 사본에서 실행하세요.'))
+        report = replay(records, target, concurrency=options['concurrency'], speed=options['speed'])
+
+        self.stdout.write(
+            f"requests {report['requests']}, {report['throughput_rps']:.1f} req/s, "
+            f"error rate {report['error_rate'] * 100:.2f}%"
+        )
+        for route, summary in sorted(report['routes'].items(), key=lambda item: -item[1]['p95_ms']):
+            self.stdout.write(
+                f"{route}: n={summary['requests']} p50 {summary['p50_ms']:.2f}ms "
+                f"p95 {summary['p95_ms']:.2f}ms p99 {summary['p99_ms']:.2f}ms errors {summary['errors']}"
+            )
+        if options['output']:
+            save_results(options['output'], report)
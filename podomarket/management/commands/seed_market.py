@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from podomarket.counters import reconcile_counters
+from podomarket.hot import rebuild_hot_scores
+from podomarket.regions import rebuild_regions
+from podomarket.search import rebuild_index
+from podomarket.seeding import SEED_PASSWORD, MarketSeeder
+from podomarket.timeline import rebuild_timelines
+
+
+class Command(BaseCommand):
+    help = '부하 테스트용 유저/글/댓글/좋아요/팔로우 데이터를 대량으로 만듭니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--posts', type=int, default=1000)
+        parser.add_argument('--comments', type=int, default=3000)
+        parser.add_argument('--likes', type=int, default=5000)
+        parser.add_argument('--follows', type=int, default=1000)
+        parser.add_argument('--days', type=int, default=90)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=None)
+
+    def handle(self, *args, **options):
+        if options['users'] < 1:
+            raise CommandError('--users는 1 이상이어야 합니다.')
+        seeder = MarketSeeder(
+            users=options['users'],
+            posts=options['posts'],
+            comments=options['comments'],
+            likes=options['likes'],
+            follows=options['follows'],
+            days=options['days'],
+            batch_size=options['batch_size'],
+            seed=options['seed'],
+            log=self.stdout.write,
+        )
+        seeder.run()
+
+        # bulk_create는 시그널을 보내지 않으므로 파생 데이터를 다시 만든다.
+        self.stdout.write('검색 인덱스, 카운터, 타임라인, 지역, 인기 점수를 다시 만드는 중...')
+        rebuild_index()
+        reconcile_counters()
+        rebuild_timelines()
+        rebuild_regions()
+        rebuild_hot_scores()
+        self.stdout.write(self.style.SUCCESS(f'완료. 시드 유저 비밀번호: {SEED_PASSWORD}'))
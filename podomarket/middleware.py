@@ -1,18 +1,47 @@
+import asyncio
+import random
+import time
+import uuid
+from contextlib import ExitStack
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.db import connections
 from django.shortcuts import redirect
 from django.urls import reverse
+from django.utils import timezone
+
+from .functions import (
+    has_complete_profile_in_session,
+    is_profile_complete,
+    remember_profile_complete,
+)
+from .perflog import QueryTimer, get_writer
+from .routers import end_request, start_request
 
 
 class ProfileSetupMiddleware:
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
         # One-time configuration and initialization.
+        if asyncio.iscoroutinefunction(get_response):
+            # ASGI에서는 요청마다 스레드를 점유하지 않도록 async 모드로 동작한다.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+        self.exempt_prefixes = tuple(
+            prefix for prefix in (settings.STATIC_URL, settings.MEDIA_URL)
+            if prefix
+        ) + tuple(getattr(settings, 'PROFILE_SETUP_EXEMPT_PREFIXES', ()))
+        self.profile_set_path = None
 
     def __call__(self, request):
-        if (
-            request.user.is_authenticated and
-            not (request.user.nickname and request.user.kakao_id and request.user.address) and
-            request.path_info != reverse('profile-set')
-        ):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+
+        if self.needs_profile_setup(request):
             return redirect('profile-set')
 
         response = self.get_response(request)
@@ -20,4 +49,169 @@ class ProfileSetupMiddleware:
         # Code to be executed for each request/response after
         # the view is called.
 
-        return response
\ No newline at end of file
+        return response
+
+    async def __acall__(self, request):
+        # 세션과 유저 조회는 DB를 쓰므로 면제 경로가 아닐 때만 스레드로 넘긴다.
+        if not self.is_exempt(request) and await sync_to_async(self.needs_profile_setup)(request):
+            return redirect('profile-set')
+        return await self.get_response(request)
+
+    def is_exempt(self, request):
+        return request.path_info.startswith(self.exempt_prefixes)
+
+    def needs_profile_setup(self, request):
+        # 정적 파일이나 업로드 파일 요청은 아무것도 확인하지 않는다.
+        if self.is_exempt(request):
+            return False
+        # 한 번 확인된 세션은 유저를 DB에서 불러오지 않고 통과시킨다.
+        if has_complete_profile_in_session(request):
+            return False
+        if not request.user.is_authenticated:
+            return False
+        if is_profile_complete(request.user):
+            remember_profile_complete(request, request.user)
+            return False
+        if self.profile_set_path is None:
+            self.profile_set_path = reverse('profile-set')
+        return request.path_info != self.profile_set_path
+
+
+class PerformanceLogMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'PERF_LOG_SAMPLE_RATE', 0)
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        if not self.is_sampled():
+            return self.get_response(request)
+
+        timer = self.start(request)
+        start = time.perf_counter()
+        with self.wrap_connections(timer):
+            response = self.get_response(request)
+        wall_time = time.perf_counter() - start
+
+        get_writer().write(self.make_record(request, response, timer, wall_time))
+        return response
+
+    async def __acall__(self, request):
+        if not self.is_sampled():
+            return await self.get_response(request)
+
+        # ASGI에서 동기 뷰는 sync_to_async로 다른 스레드에서 실행된다. 그 스레드의 커넥션은
+        # 여기서 감쌀 수 없으므로 SQL 항목은 비워 둔다.
+        self.start(request)
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        wall_time = time.perf_counter() - start
+
+        record = await sync_to_async(self.make_record)(request, response, None, wall_time)
+        get_writer().write(record)
+        return response
+
+    def is_sampled(self):
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def start(self, request):
+        request._perf_template_start = None
+        request._perf_template_time = 0.0
+        return QueryTimer()
+
+    def wrap_connections(self, timer):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(timer))
+        return stack
+
+    def process_template_response(self, request, response):
+        # 렌더링 직전에 불리므로 여기서부터 post-render 콜백까지를 템플릿 시간으로 본다.
+        if hasattr(request, '_perf_template_start'):
+            request._perf_template_start = time.perf_counter()
+            response.add_post_render_callback(
+                lambda rendered: self.record_template_time(request)
+            )
+        return response
+
+    def record_template_time(self, request):
+        request._perf_template_time += time.perf_counter() - request._perf_template_start
+
+    def make_record(self, request, response, timer, wall_time):
+        match = request.resolver_match
+        session = getattr(request, 'session', None)
+        return {
+            'request_id': uuid.uuid4().hex,
+            'ts': timezone.now().isoformat(),
+            'method': request.method,
+            'path': request.get_full_path(),
+            'url_name': match.view_name if match else None,
+            'status': response.status_code,
+            'user_id': session.get(SESSION_KEY) if session is not None else None,
+            'wall_ms': round(wall_time * 1000, 3),
+            'sql_count': timer.count if timer else None,
+            'sql_ms': round(timer.total * 1000, 3) if timer else None,
+            'slowest_sql': timer.slowest_sql if timer else None,
+            'slowest_sql_ms': round(timer.slowest * 1000, 3) if timer else None,
+            'template_ms': round(request._perf_template_time * 1000, 3),
+            'response_bytes': None if response.streaming else len(response.content),
+        }
+
+
+class ReplicaRoutingMiddleware:
+    # REPLICA_READ_VIEWS에 있는 화면의 GET 요청만 복제본에서 읽게 한다.
+    # 방금 글/댓글/좋아요를 쓴 브라우저는 쿠키로 표시해 두고 잠시 프라이머리에서 읽게 해서
+    # 자기가 쓴 내용이 복제 전이라 안 보이는 일이 없게 한다.
+    sync_capable = True
+    async_capable = True
+    pin_cookie_name = 'replica_pin'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.read_views = set(getattr(settings, 'REPLICA_READ_VIEWS', ()))
+        self.sticky_seconds = getattr(settings, 'REPLICA_STICKY_SECONDS', 10)
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        state, token = start_request()
+        request._replica_state = state
+        try:
+            response = self.get_response(request)
+        finally:
+            end_request(token)
+        return self.pin_after_write(state, response)
+
+    async def __acall__(self, request):
+        state, token = start_request()
+        request._replica_state = state
+        try:
+            response = await self.get_response(request)
+        finally:
+            end_request(token)
+        return self.pin_after_write(state, response)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        state = getattr(request, '_replica_state', None)
+        if state is None or request.method not in ('GET', 'HEAD'):
+            return None
+        if request.COOKIES.get(self.pin_cookie_name):
+            return None
+        state.use_replica = request.resolver_match.url_name in self.read_views
+        return None
+
+    def pin_after_write(self, state, response):
+        if state.wrote:
+            response.set_cookie(
+                self.pin_cookie_name, '1',
+                max_age=self.sticky_seconds, httponly=True, samesite='Lax',
+            )
+        return response
@@ -0,0 +1,60 @@
+# Generated by Django 4.0 on 2026-10-16 20:39
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_subquery(queryset, field):
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(count=Count('id'))
+            .values('count')
+        ),
+        0,
+    )
+
+
+def fill_counters(apps, schema_editor):
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    Post = apps.get_model('podomarket', 'Post')
+    Comment = apps.get_model('podomarket', 'Comment')
+    Like = apps.get_model('podomarket', 'Like')
+
+    Post.objects.update(comment_count=count_subquery(Comment.objects.all(), 'post'))
+    for model_name, model in (('post', Post), ('comment', Comment)):
+        ctype = ContentType.objects.filter(app_label='podomarket', model=model_name).first()
+        if ctype is not None:
+            model.objects.update(
+                like_count=count_subquery(Like.objects.filter(content_type=ctype), 'object_id')
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('podomarket', '0012_searchtoken'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 4.0 on 2026-10-16 20:42
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_timelines(apps, schema_editor):
+    User = apps.get_model('podomarket', 'User')
+    Post = apps.get_model('podomarket', 'Post')
+    TimelineEntry = apps.get_model('podomarket', 'TimelineEntry')
+    Follow = User.following.through
+
+    for author in User.objects.all():
+        follower_ids = list(
+            Follow.objects.filter(to_user=author).values_list('from_user_id', flat=True)
+        )
+        User.objects.filter(id=author.id).update(follower_count=len(follower_ids))
+        posts = Post.objects.filter(author=author, is_sold=False)
+        TimelineEntry.objects.bulk_create(
+            [
+                TimelineEntry(
+                    user_id=user_id,
+                    post_id=post.id,
+                    author_id=author.id,
+                    dt_created=post.dt_created,
+                )
+                for post in posts
+                for user_id in follower_ids
+            ],
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('podomarket', '0014_mediablob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='follower_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='TimelineEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dt_created', models.DateTimeField()),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='podomarket.user')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to='podomarket.post')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to='podomarket.user')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='timelineentry',
+            index=models.Index(fields=['user', '-dt_created', 'post'], name='timeline_user_dt_post_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='timelineentry',
+            unique_together={('user', 'post')},
+        ),
+        migrations.RunPython(fill_timelines, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 4.0 on 2026-10-16 20:55
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicate_likes(apps, schema_editor):
+    # 제약 조건을 걸기 전에 중복 좋아요는 가장 먼저 생긴 것만 남기고 지운다.
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    Post = apps.get_model('podomarket', 'Post')
+    Comment = apps.get_model('podomarket', 'Comment')
+    Like = apps.get_model('podomarket', 'Like')
+
+    counted = {}
+    for model_name, model in (('post', Post), ('comment', Comment)):
+        ctype = ContentType.objects.filter(app_label='podomarket', model=model_name).first()
+        if ctype is not None:
+            counted[ctype.id] = model
+
+    duplicates = (
+        Like.objects.values('user', 'content_type', 'object_id')
+        .annotate(keep_id=Min('id'), total=Count('id'))
+        .filter(total__gt=1)
+    )
+    for row in duplicates:
+        Like.objects.filter(
+            user=row['user'], content_type=row['content_type'], object_id=row['object_id'],
+        ).exclude(id=row['keep_id']).delete()
+        model = counted.get(row['content_type'])
+        if model is not None:
+            model.objects.filter(id=row['object_id']).update(
+                like_count=Like.objects.filter(
+                    content_type=row['content_type'], object_id=row['object_id'],
+                ).count()
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('podomarket', '0015_timeline'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_likes, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='like',
+            constraint=models.UniqueConstraint(fields=('user', 'content_type', 'object_id'), name='unique_like'),
+        ),
+    ]
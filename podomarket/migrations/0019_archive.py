@@ -0,0 +1,75 @@
+# Generated by Django 4.0 on 2026-10-16 21:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('podomarket', '0018_replicaheartbeat'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedPost',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=60)),
+                ('item_price', models.IntegerField()),
+                ('item_condition', models.CharField(choices=[('새제품', '새제품'), ('최상', '최상'), ('상', '상'), ('중', '중'), ('하', '하')], max_length=10)),
+                ('item_details', models.TextField(blank=True)),
+                ('image1', models.ImageField(upload_to='item_pics')),
+                ('image2', models.ImageField(blank=True, upload_to='item_pics')),
+                ('image3', models.ImageField(blank=True, upload_to='item_pics')),
+                ('dt_created', models.DateTimeField()),
+                ('dt_updated', models.DateTimeField()),
+                ('is_sold', models.BooleanField(default=False)),
+                ('like_count', models.PositiveIntegerField(default=0)),
+                ('comment_count', models.PositiveIntegerField(default=0)),
+                ('dt_archived', models.DateTimeField()),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_posts', to='podomarket.user')),
+            ],
+            options={
+                'ordering': ['-dt_created'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedLike',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('dt_created', models.DateTimeField()),
+                ('object_id', models.PositiveIntegerField()),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='contenttypes.contenttype')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='podomarket.user')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedComment',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('content', models.TextField(max_length=500)),
+                ('dt_created', models.DateTimeField()),
+                ('dt_updated', models.DateTimeField()),
+                ('like_count', models.PositiveIntegerField(default=0)),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='podomarket.user')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='comments', to='podomarket.archivedpost')),
+            ],
+            options={
+                'ordering': ['dt_created'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='archivedpost',
+            index=models.Index(fields=['author', '-dt_created'], name='archivedpost_author_dt_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedlike',
+            index=models.Index(fields=['user', 'content_type', 'object_id'], name='archivedlike_user_target_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedcomment',
+            index=models.Index(fields=['post', 'dt_created'], name='archivedcomment_post_dt_idx'),
+        ),
+    ]
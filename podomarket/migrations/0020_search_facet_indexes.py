@@ -0,0 +1,21 @@
+# Generated by Django 4.0 on 2026-10-16 21:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('podomarket', '0019_archive'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('is_sold', False)), fields=['item_price', '-id'], name='post_unsold_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('is_sold', False)), fields=['item_condition', 'item_price'], name='post_unsold_cond_price_idx'),
+        ),
+    ]
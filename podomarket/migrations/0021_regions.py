@@ -0,0 +1,117 @@
+# Generated by Django 4.0 on 2026-10-16 21:07
+
+import unicodedata
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+
+# 나중에 podomarket.regions의 규칙이 바뀌어도 이 마이그레이션의 결과는 같아야 하므로 당시 규칙을 옮겨 둔다.
+SIDO_NAMES = {
+    '서울': ('서울특별시', '서울시'),
+    '부산': ('부산광역시', '부산시'),
+    '대구': ('대구광역시', '대구시'),
+    '인천': ('인천광역시', '인천시'),
+    '광주': ('광주광역시', '광주시'),
+    '대전': ('대전광역시', '대전시'),
+    '울산': ('울산광역시', '울산시'),
+    '세종': ('세종특별자치시', '세종시'),
+    '경기': ('경기도',),
+    '강원': ('강원도', '강원특별자치도'),
+    '충북': ('충청북도',),
+    '충남': ('충청남도',),
+    '전북': ('전라북도', '전북특별자치도'),
+    '전남': ('전라남도',),
+    '경북': ('경상북도',),
+    '경남': ('경상남도',),
+    '제주': ('제주도', '제주특별자치도'),
+}
+
+SIDO_ALIASES = {alias: name for name, aliases in SIDO_NAMES.items() for alias in (name, *aliases)}
+
+
+def region_code(address):
+    words = unicodedata.normalize('NFKC', address or '').split()
+    if not words or words[0] not in SIDO_ALIASES:
+        return ''
+    parts = [SIDO_ALIASES[words[0]]]
+    for word in words[1:]:
+        if word.endswith(('시', '군', '구')) and len(parts) < 3:
+            parts.append(word)
+        elif word.endswith(('동', '읍', '면', '가')) and len(parts) > 1:
+            parts.append(word)
+            break
+        else:
+            break
+    return '/'.join(parts)
+
+
+def region_prefixes(code):
+    if not code:
+        return []
+    parts = code.split('/')
+    return ['/'.join(parts[:i]) for i in range(1, len(parts) + 1)]
+
+
+def fill_regions(apps, schema_editor):
+    User = apps.get_model('podomarket', 'User')
+    Post = apps.get_model('podomarket', 'Post')
+    RegionCount = apps.get_model('podomarket', 'RegionCount')
+
+    users = list(User.objects.only('id', 'address'))
+    for user in users:
+        user.region = region_code(user.address)
+    User.objects.bulk_update(users, ['region'], batch_size=1000)
+    Post.objects.update(
+        region=Subquery(User.objects.filter(id=OuterRef('author_id')).values('region')[:1])
+    )
+
+    counts = {}
+    rows = Post.objects.filter(is_sold=False).exclude(region='').values('region').annotate(count=Count('id')).order_by()
+    for row in rows:
+        for prefix in region_prefixes(row['region']):
+            counts[prefix] = counts.get(prefix, 0) + row['count']
+    RegionCount.objects.bulk_create(
+        [
+            RegionCount(code=code, parent=code.rpartition('/')[0], post_count=count)
+            for code, count in counts.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('podomarket', '0020_search_facet_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegionCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(max_length=60, unique=True)),
+                ('parent', models.CharField(blank=True, max_length=60)),
+                ('post_count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='region',
+            field=models.CharField(blank=True, default='', editable=False, max_length=60),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='region',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=60),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('is_sold', False)), fields=['region', '-dt_created', '-id'], name='post_unsold_region_dt_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='regioncount',
+            index=models.Index(fields=['parent', 'code'], name='regioncount_parent_idx'),
+        ),
+        migrations.RunPython(fill_regions, migrations.RunPython.noop),
+    ]
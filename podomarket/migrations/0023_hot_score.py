@@ -0,0 +1,68 @@
+# Generated by Django 4.0 on 2026-10-16 21:14
+
+import math
+import time
+
+from django.conf import settings
+from django.db import migrations, models
+
+WEIGHTS = {'post': 3.0, 'like': 1.0, 'comment': 2.0}
+HALF_LIFE_HOURS = 24
+
+
+def fill_hot_scores(apps, schema_editor):
+    weights = {**WEIGHTS, **getattr(settings, 'HOT_SCORE_WEIGHTS', {})}
+    rate = math.log(2) / (getattr(settings, 'HOT_SCORE_HALF_LIFE_HOURS', HALF_LIFE_HOURS) * 3600)
+
+    Post = apps.get_model('podomarket', 'Post')
+    Comment = apps.get_model('podomarket', 'Comment')
+    Like = apps.get_model('podomarket', 'Like')
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+
+    now = time.time()
+    scores = {}
+
+    def add(post_id, kind, dt):
+        if post_id in scores:
+            scores[post_id] += weights[kind] * math.exp((dt.timestamp() - now) * rate)
+
+    for post_id, dt in Post.objects.values_list('id', 'dt_created'):
+        scores[post_id] = 0
+        add(post_id, 'post', dt)
+    post_type = ContentType.objects.filter(app_label='podomarket', model='post').first()
+    if post_type is not None:
+        for post_id, dt in Like.objects.filter(content_type=post_type).values_list('object_id', 'dt_created'):
+            add(post_id, 'like', dt)
+    for post_id, dt in Comment.objects.values_list('post_id', 'dt_created'):
+        add(post_id, 'comment', dt)
+
+    Post.objects.bulk_update(
+        [Post(id=post_id, hot_score=score, hot_ts=now) for post_id, score in scores.items()],
+        ['hot_score', 'hot_ts'],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('podomarket', '0022_similarpost'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='hot_score',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='hot_ts',
+            field=models.FloatField(default=time.time, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('is_sold', False)), fields=['-hot_score', '-id'], name='post_unsold_hot_idx'),
+        ),
+        migrations.RunPython(fill_hot_scores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.0 on 2026-10-16 22:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('podomarket', '0023_hot_score'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='dt_updated',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
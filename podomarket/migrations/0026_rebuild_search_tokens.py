@@ -0,0 +1,51 @@
+# Generated by Django 4.0 on 2026-10-16 22:41
+
+import re
+import unicodedata
+
+from django.db import migrations
+
+WORD_RE = re.compile(r'\w+')
+
+
+def index_terms(text):
+    letters = ''.join(WORD_RE.findall(unicodedata.normalize('NFKC', text or '').lower()))
+    return [letters[i:i + 2] for i in range(len(letters) - 1)]
+
+
+def build_weights(post):
+    # 제목은 3, 내용은 1의 가중치로 센다.
+    weights = {}
+    for text, weight in ((post.title, 3), (post.item_details, 1)):
+        for term in index_terms(text):
+            weights[term] = weights.get(term, 0) + weight
+    return weights
+
+
+def rebuild_search_tokens(apps, schema_editor):
+    # 단어 사이에 걸친 bigram을 넣고 한 글자 토큰을 빼도록 바뀐 토큰으로 다시 만든다.
+    Post = apps.get_model('podomarket', 'Post')
+    SearchToken = apps.get_model('podomarket', 'SearchToken')
+
+    SearchToken.objects.all().delete()
+    tokens = []
+    for post in Post.objects.only('id', 'title', 'item_details').order_by('id').iterator(chunk_size=500):
+        tokens.extend(
+            SearchToken(term=term, post_id=post.id, weight=weight)
+            for term, weight in build_weights(post).items()
+        )
+        if len(tokens) >= 500:
+            SearchToken.objects.bulk_create(tokens)
+            tokens = []
+    SearchToken.objects.bulk_create(tokens)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('podomarket', '0025_timeline_index_order'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_search_tokens, migrations.RunPython.noop),
+    ]
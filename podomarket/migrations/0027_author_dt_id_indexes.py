@@ -0,0 +1,33 @@
+# Generated by Django 4.0 on 2026-10-16 22:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('podomarket', '0026_rebuild_search_tokens'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='archivedpost',
+            name='archivedpost_author_dt_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='post',
+            name='post_author_dt_idx',
+        ),
+        migrations.AddIndex(
+            model_name='archivedpost',
+            index=models.Index(fields=['author', '-dt_created', '-id'], name='archivedpost_author_dt_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='like',
+            index=models.Index(fields=['user', 'content_type', '-dt_created', '-id'], name='like_user_dt_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', '-dt_created', '-id'], name='post_author_dt_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.0 on 2026-10-16 22:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('podomarket', '0027_author_dt_id_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DirtySimilarPost',
+            fields=[
+                ('post_id', models.BigIntegerField(primary_key=True, serialize=False)),
+            ],
+        ),
+    ]
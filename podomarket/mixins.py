@@ -1,13 +1,25 @@
 from braces.views import LoginRequiredMixin, UserPassesTestMixin
-from allauth.account.models import EmailAddress
-from .functions import confirmation_required_redirect
+from django.http import JsonResponse
+from .conditional import finish_response, not_modified
+from .functions import confirmation_required_redirect, is_email_verified
+from .pagination import CursorPaginator
 
 class LoginAndVerificationRequiredMixin(LoginRequiredMixin, UserPassesTestMixin):
     redirect_unauthenticated_users = True
     raise_exception = confirmation_required_redirect
 
     def test_func(self, user):
-        return EmailAddress.objects.filter(user=user, verified=True).exists()
+        return is_email_verified(user)
+
+class JsonLoginAndVerificationRequiredMixin:
+    # JSON API는 로그인/인증 페이지로 리다이렉트하지 않고 상태 코드로 알린다.
+
+    def dispatch(self, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({'error': 'login_required'}, status=401)
+        if not is_email_verified(request.user):
+            return JsonResponse({'error': 'email_verification_required'}, status=403)
+        return super().dispatch(request, *args, **kwargs)
 
 class LoginAndOwnershipRequiredMixin(LoginRequiredMixin, UserPassesTestMixin):
     redirect_unauthenticated_users = False
@@ -15,4 +27,33 @@ class LoginAndOwnershipRequiredMixin(LoginRequiredMixin, UserPassesTestMixin):
 
     def test_func(self, user):
         obj = self.get_object()
-        return obj.author == user
\ No newline at end of file
+        return obj.author == user
+
+class CursorPaginationMixin:
+    # ?cursor= 파라미터가 있으면 OFFSET 대신 keyset 페이지네이션을 사용한다.
+    cursor_query_param = 'cursor'
+    # 커서에 담을 (시각, id) 필드. 목록의 정렬 순서와 같아야 한다.
+    cursor_fields = ('dt_created', 'id')
+
+    def is_cursor_mode(self):
+        return self.cursor_query_param in self.request.GET
+
+    def paginate_queryset(self, queryset, page_size):
+        if not self.is_cursor_mode():
+            return super().paginate_queryset(queryset, page_size)
+        paginator = CursorPaginator(queryset, page_size, self.cursor_fields)
+        page = paginator.page(self.request.GET.get(self.cursor_query_param))
+        return (paginator, page, page.object_list, page.has_other_pages())
+
+class ConditionalGetMixin:
+    # get_version()이 돌려준 버전이 클라이언트가 가진 것과 같으면 렌더링하지 않고 304를 돌려준다.
+
+    def get_version(self):
+        return None
+
+    def get(self, request, *args, **kwargs):
+        version = self.get_version()
+        response = not_modified(request, version)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        return finish_response(request, response, version)
@@ -1,3 +1,4 @@
+import time
 from secrets import choice
 from tkinter import CASCADE
 from django.db import models
@@ -26,6 +27,8 @@ class User(AbstractUser):
         null=True,
         validators = [validate_no_special_characters]
     )
+    # address를 정규화한 '시/구/동' 코드. 저장할 때 signals에서 채운다.
+    region = models.CharField(max_length=60, blank=True, default='', editable=False, db_index=True)
     profile_pic = models.ImageField(
         default="default_profile_pic.jpg",
         upload_to="profile_pics"
@@ -36,6 +39,10 @@ class User(AbstractUser):
         symmetrical=False,
         related_name='followers'
     )
+    follower_count = models.PositiveIntegerField(default=0)
+    # 닉네임, 주소, 프로필 사진이나 이메일 인증 상태가 바뀐 시각.
+    # 글 카드와 댓글에 보이는 작성자 정보의 조건부 응답 버전과 이메일 인증 캐시 키에 쓴다.
+    dt_updated = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.email
@@ -65,6 +72,13 @@ class Post(models.Model):
     dt_created = models.DateTimeField(auto_now_add=True)
     dt_updated = models.DateTimeField(auto_now=True)
     is_sold = models.BooleanField(default=False)
+    like_count = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0)
+    # 작성자의 region을 복사해 둔다. 동네별 목록을 조인 없이 인덱스로 읽기 위해서다.
+    region = models.CharField(max_length=60, blank=True, default='', editable=False)
+    # 좋아요/댓글/작성 시각을 감쇠시켜 합친 인기 점수. hot_ts 시점 기준 값이다. (hot.py 참고)
+    hot_score = models.FloatField(default=0, editable=False)
+    hot_ts = models.FloatField(default=time.time, editable=False)
 
     likes = GenericRelation('Like', related_query_name='post')
 
@@ -73,6 +87,39 @@ class Post(models.Model):
 
     class Meta:
         ordering = ['-dt_created']
+        indexes = [
+            # 판매 중인 글 목록(홈, 검색, 타임라인)은 팔린 글을 제외하고 최신순으로 읽는다.
+            models.Index(
+                fields=['-dt_created', '-id'],
+                name='post_unsold_dt_idx',
+                condition=models.Q(is_sold=False),
+            ),
+            # 프로필과 작성자별 글 목록. keyset 페이지의 (-dt_created, -id) 정렬까지 인덱스로 읽는다.
+            models.Index(fields=['author', '-dt_created', '-id'], name='post_author_dt_idx'),
+            # 검색 가격순 정렬과 가격/상태 필터
+            models.Index(
+                fields=['item_price', '-id'],
+                name='post_unsold_price_idx',
+                condition=models.Q(is_sold=False),
+            ),
+            models.Index(
+                fields=['item_condition', 'item_price'],
+                name='post_unsold_cond_price_idx',
+                condition=models.Q(is_sold=False),
+            ),
+            # 동네별 목록
+            models.Index(
+                fields=['region', '-dt_created', '-id'],
+                name='post_unsold_region_dt_idx',
+                condition=models.Q(is_sold=False),
+            ),
+            # 인기 탭
+            models.Index(
+                fields=['-hot_score', '-id'],
+                name='post_unsold_hot_idx',
+                condition=models.Q(is_sold=False),
+            ),
+        ]
 
 class Comment(models.Model):
     content = models.TextField(max_length=500, blank=False)
@@ -84,6 +131,7 @@ class Comment(models.Model):
         on_delete=models.CASCADE,
         related_name='comments'
     )
+    like_count = models.PositiveIntegerField(default=0)
 
     likes = GenericRelation('Like', related_query_name='comment')
 
@@ -92,6 +140,9 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['dt_created']
+        indexes = [
+            models.Index(fields=['post', 'dt_created'], name='comment_post_dt_idx'),
+        ]
 
 class Like(models.Model):
     dt_created = models.DateTimeField(auto_now_add=True)
@@ -104,3 +155,201 @@ class Like(models.Model):
 
     def __str__(self):
         return f"({self.user}, {self.liked_object})"
+
+    class Meta:
+        # 좋아요 토글이 동시에 들어와도 같은 대상에 두 번 좋아요할 수 없다.
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'content_type', 'object_id'],
+                name='unique_like',
+            ),
+        ]
+        # (user, content_type) 조회는 unique_like 인덱스의 앞부분으로 처리된다.
+        indexes = [
+            models.Index(fields=['content_type', 'object_id'], name='like_target_idx'),
+            # 위시리스트는 최근에 누른 좋아요부터 읽는다.
+            models.Index(fields=['user', 'content_type', '-dt_created', '-id'], name='like_user_dt_idx'),
+        ]
+
+class SearchToken(models.Model):
+    term = models.CharField(max_length=2)
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='search_tokens'
+    )
+    weight = models.PositiveIntegerField()
+
+    def __str__(self):
+        return f"({self.term}, {self.post_id})"
+
+    class Meta:
+        unique_together = [['term', 'post']]
+
+class MediaBlob(models.Model):
+    name = models.CharField(max_length=100, unique=True)
+    size = models.PositiveBigIntegerField()
+    ref_count = models.IntegerField(default=0)
+    dt_created = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"({self.name}, {self.ref_count})"
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    dt_created = models.DateTimeField()
+
+    def __str__(self):
+        return f"({self.user_id}, {self.post_id})"
+
+    class Meta:
+        unique_together = [['user', 'post']]
+        indexes = [
+            # 타임라인 페이지는 (-dt_created, -post_id) 순서로 이 인덱스를 범위 스캔한다.
+            models.Index(
+                fields=['user', '-dt_created', '-post'],
+                name='timeline_user_dt_post_idx',
+            ),
+        ]
+
+class SimilarPost(models.Model):
+    # build_similar_posts 명령이 미리 계산해 둔 비슷한 글. rank가 작을수록 비슷하다.
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='similar_posts'
+    )
+    neighbour = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='neighbour_of'
+    )
+    score = models.FloatField()
+    rank = models.PositiveSmallIntegerField()
+
+    def __str__(self):
+        return f"({self.post_id}, {self.neighbour_id}, {self.score:.3f})"
+
+    class Meta:
+        unique_together = [['post', 'neighbour']]
+        indexes = [
+            models.Index(fields=['post', 'rank'], name='similarpost_post_rank_idx'),
+        ]
+
+class DirtySimilarPost(models.Model):
+    # 제목/본문이나 거래 상태가 바뀐 글, 지워진 글. build_similar_posts --incremental이 다시 계산하고 지운다.
+    # 지워진 글도 남아야 하므로 Post를 가리키지 않고 id만 적는다.
+    post_id = models.BigIntegerField(primary_key=True)
+
+    def __str__(self):
+        return str(self.post_id)
+
+class RegionCount(models.Model):
+    # 지역(과 그 하위 지역)에 있는 판매 중인 글 수. 지역 선택기가 집계 없이 바로 읽는다.
+    code = models.CharField(max_length=60, unique=True)
+    parent = models.CharField(max_length=60, blank=True)
+    post_count = models.IntegerField(default=0)
+
+    @property
+    def name(self):
+        return self.code.rpartition('/')[2]
+
+    def __str__(self):
+        return f"({self.code}, {self.post_count})"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['parent', 'code'], name='regioncount_parent_idx'),
+        ]
+
+class ReplicaHeartbeat(models.Model):
+    # 복제 작업이 복사 직전에 프라이머리에 시각을 적는다.
+    # 복제본에서 이 값을 읽으면 얼마나 뒤처졌는지 알 수 있다.
+    dt_beat = models.DateTimeField()
+
+    def __str__(self):
+        return str(self.dt_beat)
+
+class ArchivedPost(models.Model):
+    # 거래가 끝난 지 오래된 글을 Post에서 옮겨 둔다. id는 원래 글의 id를 그대로 쓴다.
+    # 값을 그대로 보존해야 하므로 auto_now 필드를 쓰지 않는다.
+    id = models.BigIntegerField(primary_key=True)
+    title = models.CharField(max_length=60)
+    item_price = models.IntegerField()
+    item_condition = models.CharField(max_length=10, choices=Post.condition)
+    item_details = models.TextField(blank=True)
+    image1 = models.ImageField(upload_to="item_pics")
+    image2 = models.ImageField(upload_to="item_pics", blank=True)
+    image3 = models.ImageField(upload_to="item_pics", blank=True)
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_posts'
+    )
+    dt_created = models.DateTimeField()
+    dt_updated = models.DateTimeField()
+    is_sold = models.BooleanField(default=False)
+    like_count = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0)
+    dt_archived = models.DateTimeField()
+
+    def __str__(self):
+        return self.title
+
+    class Meta:
+        ordering = ['-dt_created']
+        indexes = [
+            models.Index(fields=['author', '-dt_created', '-id'], name='archivedpost_author_dt_idx'),
+        ]
+
+class ArchivedComment(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    content = models.TextField(max_length=500)
+    dt_created = models.DateTimeField()
+    dt_updated = models.DateTimeField()
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    post = models.ForeignKey(
+        ArchivedPost,
+        on_delete=models.CASCADE,
+        related_name='comments'
+    )
+    like_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return self.content[:30]
+
+    class Meta:
+        ordering = ['dt_created']
+        indexes = [
+            models.Index(fields=['post', 'dt_created'], name='archivedcomment_post_dt_idx'),
+        ]
+
+class ArchivedLike(models.Model):
+    # content_type은 원래 대상(Post/Comment)의 것을 그대로 두고, object_id로 보관된 글/댓글을 가리킨다.
+    id = models.BigIntegerField(primary_key=True)
+    dt_created = models.DateTimeField()
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE, related_name='+')
+    object_id = models.PositiveIntegerField()
+
+    def __str__(self):
+        return f"({self.user_id}, {self.content_type_id}, {self.object_id})"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'content_type', 'object_id'], name='archivedlike_user_target_idx'),
+        ]
@@ -0,0 +1,108 @@
+import base64
+import binascii
+import json
+
+from django.db.models import Q
+from django.http import Http404
+from django.utils.dateparse import parse_datetime
+
+
+def encode_cursor(direction, post, fields=('dt_created', 'id')):
+    dt_field, id_field = fields
+    raw = json.dumps([direction, getattr(post, dt_field).isoformat(), getattr(post, id_field)])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        direction, dt_created, pk = json.loads(base64.urlsafe_b64decode(padded))
+        dt_created = parse_datetime(dt_created)
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError):
+        raise Http404('잘못된 페이지입니다.')
+    if direction not in ('next', 'prev') or dt_created is None or not isinstance(pk, int):
+        raise Http404('잘못된 페이지입니다.')
+    return direction, dt_created, pk
+
+
+class CursorPage:
+    is_cursor = True
+
+    def __init__(self, object_list, has_next, has_previous, fields=('dt_created', 'id')):
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self.fields = fields
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if self._has_next and self.object_list:
+            return encode_cursor('next', self.object_list[-1], self.fields)
+        return None
+
+    @property
+    def previous_cursor(self):
+        if self._has_previous and self.object_list:
+            return encode_cursor('prev', self.object_list[0], self.fields)
+        return None
+
+
+def keyset_rows(queryset, direction, dt_created=None, pk=None, limit=None, id_field='id', dt_field='dt_created'):
+    # (dt_field, id_field) 기준으로 커서 다음('next', 최신순) 또는 이전('prev', 오래된 순) 행을 읽는다.
+    if direction == 'next':
+        ordering = ('-' + dt_field, '-' + id_field)
+        condition = Q(**{dt_field + '__lt': dt_created}) | Q(**{dt_field: dt_created, id_field + '__lt': pk})
+    else:
+        ordering = (dt_field, id_field)
+        condition = Q(**{dt_field + '__gt': dt_created}) | Q(**{dt_field: dt_created, id_field + '__gt': pk})
+    if dt_created is not None:
+        queryset = queryset.filter(condition)
+    queryset = queryset.order_by(*ordering)
+    return list(queryset if limit is None else queryset[:limit])
+
+
+class CursorPaginator:
+    """(dt_created, id) 기준 keyset 페이지네이터. COUNT 쿼리를 하지 않는다.
+
+    fields로 다른 (시각, id) 필드나 annotate한 값을 기준으로 삼을 수 있다.
+    """
+
+    def __init__(self, queryset, per_page, fields=('dt_created', 'id')):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.fields = fields
+
+    def fetch(self, direction, dt_created, pk, limit):
+        dt_field, id_field = self.fields
+        return keyset_rows(self.queryset, direction, dt_created, pk, limit, id_field=id_field, dt_field=dt_field)
+
+    def page(self, token=None):
+        if not token:
+            posts = self.fetch('next', None, None, self.per_page + 1)
+            return CursorPage(posts[:self.per_page], len(posts) > self.per_page, False, self.fields)
+
+        direction, dt_created, pk = decode_cursor(token)
+        posts = self.fetch(direction, dt_created, pk, self.per_page + 1)
+        if direction == 'next':
+            return CursorPage(posts[:self.per_page], len(posts) > self.per_page, True, self.fields)
+
+        # 이전 페이지는 반대 방향으로 읽은 뒤 뒤집는다.
+        has_previous = len(posts) > self.per_page
+        posts = posts[:self.per_page]
+        posts.reverse()
+        return CursorPage(posts, True, has_previous, self.fields)
@@ -0,0 +1,107 @@
+import atexit
+import json
+import math
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+
+
+class RingBufferJsonlWriter:
+    # 요청 스레드는 deque에 넣기만 하고, 파일 쓰기는 백그라운드 스레드가 한다.
+    # 버퍼가 가득 차면 가장 오래된 기록부터 버린다.
+
+    def __init__(self, path, capacity=10000, flush_interval=1.0):
+        self.path = path
+        self.buffer = deque(maxlen=capacity)
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.thread = None
+        self.dropped = 0
+
+    def write(self, record):
+        if self.thread is None:
+            self.start()
+        if len(self.buffer) == self.buffer.maxlen:
+            self.dropped += 1
+        self.buffer.append(record)
+
+    def start(self):
+        with self.lock:
+            if self.thread is not None:
+                return
+            self.thread = threading.Thread(target=self.run, name='perflog-writer', daemon=True)
+            self.thread.start()
+            atexit.register(self.flush)
+
+    def run(self):
+        while True:
+            self.wakeup.wait(self.flush_interval)
+            self.wakeup.clear()
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            records = []
+            while self.buffer:
+                records.append(self.buffer.popleft())
+            if not records:
+                return
+            with open(self.path, 'a', encoding='utf-8') as log_file:
+                for record in records:
+                    log_file.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+class QueryTimer:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.slowest_sql = None
+        self.slowest = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.count += 1
+            self.total += elapsed
+            if elapsed >= self.slowest:
+                self.slowest = elapsed
+                self.slowest_sql = sql
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = RingBufferJsonlWriter(
+                    settings.PERF_LOG_PATH,
+                    capacity=getattr(settings, 'PERF_LOG_BUFFER_SIZE', 10000),
+                    flush_interval=getattr(settings, 'PERF_LOG_FLUSH_INTERVAL', 1.0),
+                )
+    return _writer
+
+
+def percentile(sorted_values, fraction):
+    # nearest-rank 방식
+    if not sorted_values:
+        return None
+    rank = math.ceil(fraction * len(sorted_values))
+    return sorted_values[min(max(rank, 1), len(sorted_values)) - 1]
+
+
+def read_records(path):
+    with open(path, encoding='utf-8') as log_file:
+        for line in log_file:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
@@ -0,0 +1,78 @@
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+
+from .benchmark import ROUTES, BenchmarkData, discover_route_names
+
+
+class StatementRecorder:
+    # 파라미터가 채워지기 전의 SQL과 파라미터를 그대로 모아 EXPLAIN에 다시 쓴다.
+
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        if not many and sql.lstrip().upper().startswith('SELECT'):
+            self.statements.append((sql, tuple(params or ())))
+        return execute(sql, params, many, context)
+
+
+def explain(sql, params):
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def plan_issues(plan):
+    # 서브쿼리를 코루틴으로 읽는 SCAN은 테이블 스캔이 아니므로 제외한다.
+    coroutines = {detail[len('CO-ROUTINE '):] for detail in plan if detail.startswith('CO-ROUTINE ')}
+    issues = []
+    for detail in plan:
+        if (
+            detail.startswith('SCAN ') and ' USING ' not in detail
+            and detail[5:] not in coroutines and detail != 'SCAN CONSTANT ROW'
+        ):
+            issues.append(f'full scan: {detail[5:]}')
+        elif detail.startswith('USE TEMP B-TREE'):
+            issues.append(f'temp b-tree: {detail[len("USE TEMP B-TREE "):].lower()}')
+    return issues
+
+
+def capture_statements(client, url, params):
+    recorder = StatementRecorder()
+    with connection.execute_wrapper(recorder):
+        response = client.get(url, params)
+    return response.status_code, recorder.statements
+
+
+def advise(only=None):
+    if connection.vendor != 'sqlite':
+        raise ValueError('EXPLAIN QUERY PLAN 분석은 SQLite에서만 지원합니다.')
+    data = BenchmarkData()
+    anonymous_client = Client()
+    viewer_client = Client()
+    viewer_client.force_login(data.viewer)
+
+    report = {}
+    for name in discover_route_names():
+        if only and name not in only:
+            continue
+        if name not in ROUTES or ROUTES[name][0] != 'get':
+            continue
+        method, login_required, make_kwargs, make_params = ROUTES[name]
+        url = reverse(name, kwargs=make_kwargs(data) if make_kwargs else None)
+        client = viewer_client if login_required else anonymous_client
+        # 첫 요청은 세션/캐시를 채우므로 두 번째 요청의 쿼리를 분석한다.
+        client.get(url, make_params(data) if make_params else {})
+        status, statements = capture_statements(client, url, make_params(data) if make_params else {})
+
+        queries = []
+        seen = set()
+        for sql, params in statements:
+            if sql in seen:
+                continue
+            seen.add(sql)
+            plan = explain(sql, params)
+            queries.append({'sql': sql, 'plan': plan, 'issues': plan_issues(plan)})
+        report[name] = {'url': url, 'status': status, 'queries': queries}
+    return report
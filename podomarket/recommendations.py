@@ -0,0 +1,12 @@
+from django.conf import settings
+
+from .models import Post
+
+
+def similar_posts(post_id):
+    # 미리 계산된 이웃 중 아직 판매 중인 글만 한 번의 쿼리로 읽는다.
+    return (
+        Post.objects.filter(neighbour_of__post_id=post_id, is_sold=False)
+        .select_related('author')
+        .order_by('neighbour_of__rank')[:getattr(settings, 'SIMILAR_POSTS_SHOWN', 4)]
+    )
@@ -0,0 +1,149 @@
+import unicodedata
+
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+
+from .models import User, Post, RegionCount
+
+SEPARATOR = '/'
+
+# 시/도 이름은 줄임말로 맞춘다. ('서울특별시', '서울시' -> '서울')
+SIDO_NAMES = {
+    '서울': ('서울특별시', '서울시'),
+    '부산': ('부산광역시', '부산시'),
+    '대구': ('대구광역시', '대구시'),
+    '인천': ('인천광역시', '인천시'),
+    '광주': ('광주광역시', '광주시'),
+    '대전': ('대전광역시', '대전시'),
+    '울산': ('울산광역시', '울산시'),
+    '세종': ('세종특별자치시', '세종시'),
+    '경기': ('경기도',),
+    '강원': ('강원도', '강원특별자치도'),
+    '충북': ('충청북도',),
+    '충남': ('충청남도',),
+    '전북': ('전라북도', '전북특별자치도'),
+    '전남': ('전라남도',),
+    '경북': ('경상북도',),
+    '경남': ('경상남도',),
+    '제주': ('제주도', '제주특별자치도'),
+}
+
+SIDO_ALIASES = {alias: name for name, aliases in SIDO_NAMES.items() for alias in (name, *aliases)}
+
+DISTRICT_SUFFIXES = ('시', '군', '구')
+TOWN_SUFFIXES = ('동', '읍', '면', '가')
+
+
+def region_code(address):
+    # '서울특별시 강남구 역삼동 123' -> '서울/강남구/역삼동'
+    # 시/도 다음의 시/군/구를 모두 넣고, 첫 동/읍/면까지만 쓴다. 번지 같은 나머지는 버린다.
+    words = unicodedata.normalize('NFKC', address or '').split()
+    if not words or words[0] not in SIDO_ALIASES:
+        return ''
+    parts = [SIDO_ALIASES[words[0]]]
+    for word in words[1:]:
+        if word.endswith(DISTRICT_SUFFIXES) and len(parts) < 3:
+            parts.append(word)
+        elif word.endswith(TOWN_SUFFIXES) and len(parts) > 1:
+            parts.append(word)
+            break
+        else:
+            break
+    return SEPARATOR.join(parts)
+
+
+def region_prefixes(code):
+    # '서울/강남구/역삼동' -> ['서울', '서울/강남구', '서울/강남구/역삼동']
+    if not code:
+        return []
+    parts = code.split(SEPARATOR)
+    return [SEPARATOR.join(parts[:i]) for i in range(1, len(parts) + 1)]
+
+
+def region_q(code, field='region'):
+    # 하위 지역까지 포함한다. LIKE 대신 범위 비교 하나로 써서 region 인덱스를 탄다.
+    # 코드에는 '/' 말고 특수문자가 없고 '/' 다음 문자가 '0'이므로,
+    # [code, code + '0') 범위가 정확히 자기 자신과 하위 지역이다.
+    return Q(**{f'{field}__gte': code, f'{field}__lt': code + chr(ord(SEPARATOR) + 1)})
+
+
+def parse_region(value):
+    code = SEPARATOR.join(part.strip() for part in (value or '').split(SEPARATOR) if part.strip())
+    return code if code.split(SEPARATOR)[0] in SIDO_NAMES else ''
+
+
+def change_region_count(code, delta):
+    prefixes = region_prefixes(code)
+    if not prefixes or not delta:
+        return
+    if delta > 0:
+        RegionCount.objects.bulk_create(
+            [
+                RegionCount(code=prefix, parent=prefix.rpartition(SEPARATOR)[0], post_count=0)
+                for prefix in prefixes
+            ],
+            ignore_conflicts=True,
+        )
+    RegionCount.objects.filter(code__in=prefixes).update(post_count=F('post_count') + delta)
+
+
+def move_author_posts(user, old_code, new_code):
+    # 주소가 바뀌면 작성자의 글 지역과 지역별 개수를 함께 옮긴다.
+    with transaction.atomic():
+        count = Post.objects.filter(author=user, is_sold=False).count()
+        Post.objects.filter(author=user).update(region=new_code)
+        change_region_count(old_code, -count)
+        change_region_count(new_code, count)
+
+
+def rebuild_regions(batch_size=1000):
+    # bulk_create나 직접 SQL로 바뀐 데이터를 위해 지역 코드와 개수를 처음부터 다시 만든다.
+    with transaction.atomic():
+        users = []
+        for user in User.objects.only('id', 'address', 'region').iterator(chunk_size=batch_size):
+            code = region_code(user.address)
+            if code != user.region:
+                user.region = code
+                users.append(user)
+        User.objects.bulk_update(users, ['region'], batch_size=batch_size)
+
+        Post.objects.update(
+            region=Subquery(User.objects.filter(id=OuterRef('author_id')).values('region')[:1])
+        )
+
+        counts = {}
+        rows = (
+            Post.objects.filter(is_sold=False).exclude(region='')
+            .values('region').annotate(count=Count('id')).order_by()
+        )
+        for row in rows:
+            for prefix in region_prefixes(row['region']):
+                counts[prefix] = counts.get(prefix, 0) + row['count']
+        RegionCount.objects.all().delete()
+        RegionCount.objects.bulk_create(
+            [
+                RegionCount(code=code, parent=code.rpartition(SEPARATOR)[0], post_count=count)
+                for code, count in counts.items()
+            ],
+            batch_size=batch_size,
+        )
+    return {'users': len(users), 'regions': len(counts)}
+
+
+def region_context(code, user=None, params=''):
+    # 지역 선택기: 현재 지역의 상위 경로와 글이 있는 하위 지역 목록. 개수는 RegionCount에서 바로 읽는다.
+    children = RegionCount.objects.filter(parent=code, post_count__gt=0).order_by('code')
+    return {
+        'region': code,
+        # 지역 링크에 함께 붙일 다른 필터 파라미터
+        'region_params': params,
+        'region_path': [
+            {'code': prefix, 'name': prefix.rpartition(SEPARATOR)[2]}
+            for prefix in region_prefixes(code)
+        ],
+        'region_children': [
+            {'code': child.code, 'name': child.name, 'count': child.post_count}
+            for child in children
+        ],
+        'my_region': getattr(user, 'region', '') if user is not None and user.is_authenticated else '',
+    }
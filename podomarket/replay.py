@@ -0,0 +1,217 @@
+import secrets
+import string
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.cookies import SimpleCookie
+from importlib import import_module
+from urllib import error, parse, request as urlrequest
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.test import Client
+from django.urls import Resolver404, resolve
+
+from .models import User
+from .perflog import percentile, read_records
+
+# 기록에는 POST 본문이 없으므로 본문이 필요한 라우트는 기본값을 보낸다.
+DEFAULT_POST_DATA = {
+    'comment-create': {'content': '리플레이 댓글'},
+}
+
+
+def route_name(record):
+    if record.get('url_name'):
+        return record['url_name']
+    try:
+        return resolve(parse.urlsplit(record['path']).path).view_name
+    except Resolver404:
+        return record['path']
+
+
+def load_trace(path, limit=None):
+    records = []
+    for record in read_records(path):
+        if 'path' not in record:
+            continue
+        records.append(record)
+        if limit and len(records) >= limit:
+            break
+    return records
+
+
+def trace_offsets(records, speed):
+    # 기록된 시각 간격을 speed로 나눈 값을 각 요청의 출발 시각으로 쓴다.
+    if speed <= 0:
+        return [0.0] * len(records)
+    times = []
+    for record in records:
+        ts = record.get('ts')
+        times.append(datetime.fromisoformat(ts).timestamp() if ts else None)
+    first = next((t for t in times if t is not None), None)
+    if first is None:
+        return [0.0] * len(records)
+    offsets = []
+    last = 0.0
+    for t in times:
+        if t is not None:
+            last = max((t - first) / speed, 0.0)
+        offsets.append(last)
+    return offsets
+
+
+def create_sessions(user_ids):
+    # 기록된 유저마다 로그인된 세션을 DB에 만들어 두고 세션 키를 돌려준다.
+    engine = import_module(settings.SESSION_ENGINE)
+    backend = settings.AUTHENTICATION_BACKENDS[0]
+    sessions = {}
+    try:
+        for user in User.objects.filter(id__in=user_ids):
+            session = engine.SessionStore()
+            session[SESSION_KEY] = user._meta.pk.value_to_string(user)
+            session[BACKEND_SESSION_KEY] = backend
+            session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+            session.save()
+            sessions[str(user.id)] = session.session_key
+    except BaseException:
+        delete_sessions(sessions.values())
+        raise
+    return sessions
+
+
+def delete_sessions(session_keys):
+    # 재생이 끝나면(중간에 실패하거나 중단돼도) 만들어 둔 로그인 세션을 지운다.
+    engine = import_module(settings.SESSION_ENGINE)
+    for session_key in session_keys:
+        engine.SessionStore(session_key=session_key).delete()
+
+
+def new_csrf_token():
+    alphabet = string.ascii_letters + string.digits
+    return ''.join(secrets.choice(alphabet) for _ in range(32))
+
+
+class ClientTarget:
+    # 같은 프로세스 안에서 테스트 클라이언트로 앱을 호출한다.
+
+    def send(self, method, path, session_key, data):
+        # 뷰 예외는 다시 던지지 않고 500 응답으로 집계한다.
+        client = Client(raise_request_exception=False)
+        if session_key:
+            client.cookies[settings.SESSION_COOKIE_NAME] = session_key
+        if method == 'POST':
+            response = client.post(path, data, HTTP_REFERER=path)
+        else:
+            response = client.generic(method, path)
+        return response.status_code
+
+
+class HttpTarget:
+    # 실행 중인 서버(--base-url)에 실제 HTTP 요청을 보낸다.
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+
+    def send(self, method, path, session_key, data):
+        url = self.base_url + path
+        cookie = SimpleCookie()
+        headers = {'Referer': url}
+        body = None
+        if session_key:
+            cookie[settings.SESSION_COOKIE_NAME] = session_key
+        if method == 'POST':
+            token = new_csrf_token()
+            cookie[settings.CSRF_COOKIE_NAME] = token
+            headers['X-CSRFToken'] = token
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+            body = parse.urlencode(data).encode()
+        if cookie:
+            headers['Cookie'] = '; '.join(f'{key}={morsel.value}' for key, morsel in cookie.items())
+        req = urlrequest.Request(url, data=body, headers=headers, method=method)
+        opener = urlrequest.build_opener(NoRedirect)
+        try:
+            with opener.open(req, timeout=30) as response:
+                response.read()
+                return response.status
+        except error.HTTPError as http_error:
+            return http_error.code
+
+
+class NoRedirect(urlrequest.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class ReplayStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.errors = defaultdict(int)
+
+    def add(self, route, latency, status):
+        with self.lock:
+            self.latencies[route].append(latency)
+            self.statuses[route][status] += 1
+            if status is None or status >= 500:
+                self.errors[route] += 1
+
+    def report(self, elapsed):
+        total = sum(len(values) for values in self.latencies.values())
+        errors = sum(self.errors.values())
+        routes = {}
+        for route, values in self.latencies.items():
+            values = sorted(values)
+            routes[route] = {
+                'requests': len(values),
+                'errors': self.errors[route],
+                'p50_ms': percentile(values, 0.5),
+                'p95_ms': percentile(values, 0.95),
+                'p99_ms': percentile(values, 0.99),
+                'statuses': {str(status): count for status, count in self.statuses[route].items()},
+            }
+        return {
+            'requests': total,
+            'elapsed_s': elapsed,
+            'throughput_rps': total / elapsed if elapsed else None,
+            'error_rate': errors / total if total else 0.0,
+            'routes': routes,
+        }
+
+
+def replay(records, target, concurrency=4, speed=1.0):
+    user_ids = {record['user_id'] for record in records if record.get('user_id')}
+    sessions = create_sessions(user_ids)
+    try:
+        return run_replay(records, target, sessions, concurrency, speed)
+    finally:
+        delete_sessions(sessions.values())
+
+
+def run_replay(records, target, sessions, concurrency, speed):
+    offsets = trace_offsets(records, speed)
+    stats = ReplayStats()
+
+    def send(record):
+        route = route_name(record)
+        method = record.get('method', 'GET').upper()
+        data = DEFAULT_POST_DATA.get(route, {}) if method == 'POST' else None
+        session_key = sessions.get(str(record.get('user_id'))) if record.get('user_id') else None
+        start = time.perf_counter()
+        try:
+            status = target.send(method, record['path'], session_key, data)
+        except Exception:
+            status = None
+        stats.add(route, (time.perf_counter() - start) * 1000, status)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for record, offset in zip(records, offsets):
+            delay = offset - (time.perf_counter() - started)
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(send, record)
+    return stats.report(time.perf_counter() - started)
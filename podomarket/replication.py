@@ -0,0 +1,20 @@
+from django.db import connections
+from django.utils import timezone
+
+from .models import ReplicaHeartbeat
+
+
+def beat():
+    ReplicaHeartbeat.objects.using('default').update_or_create(
+        id=1, defaults={'dt_beat': timezone.now()},
+    )
+
+
+def copy_to_replica(alias, pages=-1):
+    # 로컬 SQLite 복제본용: 하트비트를 찍고 sqlite3 백업 API로 프라이머리를 통째로 복사한다.
+    # 백업 API는 복사 중에도 프라이머리 쓰기를 막지 않고 일관된 스냅샷을 만든다.
+    beat()
+    source, target = connections['default'], connections[alias]
+    source.ensure_connection()
+    target.ensure_connection()
+    source.connection.backup(target.connection, pages=pages)
@@ -0,0 +1,95 @@
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+# 요청마다 하나씩 만들어지는 상태. 미들웨어가 설정하고 라우터가 읽는다.
+# sync_to_async로 넘어간 스레드에서도 같은 객체를 보도록 값을 바꾸지 않고 속성만 바꾼다.
+_request_state = ContextVar('podomarket_replica_state', default=None)
+
+# 복제본별 (확인한 시각, 지연 초)
+_lag_cache = {}
+
+
+class ReplicaState:
+    def __init__(self):
+        self.use_replica = False
+        self.wrote = False
+
+
+def start_request():
+    state = ReplicaState()
+    return state, _request_state.set(state)
+
+
+def end_request(token):
+    _request_state.reset(token)
+
+
+def replica_aliases():
+    return getattr(settings, 'REPLICA_DATABASES', [])
+
+
+def measure_lag(alias):
+    from .models import ReplicaHeartbeat
+    try:
+        beat = ReplicaHeartbeat.objects.using(alias).values_list('dt_beat', flat=True).first()
+    except Exception:
+        # 아직 복사되지 않았거나 열 수 없는 복제본
+        return None
+    if beat is None:
+        return None
+    return (timezone.now() - beat).total_seconds()
+
+
+def replica_lag(alias):
+    # 읽을 때마다 확인하지 않고 REPLICA_LAG_CHECK_INTERVAL초 동안 결과를 재사용한다.
+    now = time.monotonic()
+    checked = _lag_cache.get(alias)
+    if checked is None or now - checked[0] > getattr(settings, 'REPLICA_LAG_CHECK_INTERVAL', 5):
+        checked = (now, measure_lag(alias))
+        _lag_cache[alias] = checked
+    return checked[1]
+
+
+def healthy_replicas():
+    max_lag = getattr(settings, 'REPLICA_MAX_LAG', 30)
+    replicas = []
+    for alias in replica_aliases():
+        lag = replica_lag(alias)
+        if lag is not None and lag <= max_lag:
+            replicas.append(alias)
+    return replicas
+
+
+class PrimaryReplicaRouter:
+    # 목록/상세 화면의 읽기만 복제본으로 보내고, 나머지는 모두 프라이머리(default)를 쓴다.
+    # 세션, 인증 등 다른 앱의 테이블은 항상 프라이머리에서 읽는다.
+
+    def db_for_read(self, model, **hints):
+        state = _request_state.get()
+        if state is None or not state.use_replica or model._meta.app_label != 'podomarket':
+            return None
+        if connections['default'].in_atomic_block:
+            return None
+        replicas = healthy_replicas()
+        if not replicas:
+            # 복제본이 모두 너무 뒤처져 있으면 프라이머리에서 읽는다.
+            return None
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        state = _request_state.get()
+        if state is not None and model._meta.app_label == 'podomarket':
+            state.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # 복제본은 프라이머리의 복사본이므로 어느 쪽에서 읽은 객체끼리도 연결할 수 있다.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in replica_aliases()
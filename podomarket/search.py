@@ -0,0 +1,97 @@
+import re
+import unicodedata
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+
+from .models import Post, SearchToken
+
+TITLE_WEIGHT = 3
+DETAILS_WEIGHT = 1
+
+WORD_RE = re.compile(r'\w+')
+
+
+def normalize(text):
+    return unicodedata.normalize('NFKC', text or '').lower()
+
+
+def bigrams(text):
+    return [text[i:i + 2] for i in range(len(text) - 1)]
+
+
+def tokenize(text):
+    # 검색어를 토큰으로 자른다. 한글은 띄어쓰기가 제각각이라 단어 단위가 아닌 2글자(bigram) 단위로 자른다.
+    # 한 글자짜리 단어는 bigram이 없으므로 그대로 토큰이 되고, search_posts가 부분 문자열로 찾는다.
+    tokens = []
+    for word in WORD_RE.findall(normalize(text)):
+        if len(word) == 1:
+            tokens.append(word)
+        else:
+            tokens.extend(bigrams(word))
+    return tokens
+
+
+def index_terms(text):
+    # 인덱스에는 공백을 뺀 전체 글자의 bigram을 넣는다. 단어 사이에 걸친 bigram도 들어가므로
+    # '아이폰케이스'로 검색해도 '아이폰 케이스'를 찾는다.
+    return bigrams(''.join(WORD_RE.findall(normalize(text))))
+
+
+def build_weights(post):
+    weights = {}
+    for term in index_terms(post.title):
+        weights[term] = weights.get(term, 0) + TITLE_WEIGHT
+    for term in index_terms(post.item_details):
+        weights[term] = weights.get(term, 0) + DETAILS_WEIGHT
+    return weights
+
+
+def build_tokens(post):
+    return [
+        SearchToken(term=term, post_id=post.id, weight=weight)
+        for term, weight in build_weights(post).items()
+    ]
+
+
+def index_post(post):
+    with transaction.atomic():
+        SearchToken.objects.filter(post_id=post.id).delete()
+        SearchToken.objects.bulk_create(build_tokens(post))
+
+
+def rebuild_index(batch_size=500):
+    count = 0
+    with transaction.atomic():
+        SearchToken.objects.all().delete()
+        tokens = []
+        posts = Post.objects.only('id', 'title', 'item_details').order_by('id')
+        for post in posts.iterator(chunk_size=batch_size):
+            tokens.extend(build_tokens(post))
+            count += 1
+            if len(tokens) >= batch_size:
+                SearchToken.objects.bulk_create(tokens)
+                tokens = []
+        SearchToken.objects.bulk_create(tokens)
+    return count
+
+
+def search_posts(queryset, query):
+    terms = set(tokenize(query))
+    if not terms:
+        return queryset
+    # 한 글자 토큰은 인덱스에 없으므로 원래처럼 제목과 내용에서 부분 문자열로 찾는다.
+    for char in sorted(term for term in terms if len(term) == 1):
+        queryset = queryset.filter(Q(title__icontains=char) | Q(item_details__icontains=char))
+    terms = {term for term in terms if len(term) == 2}
+    if not terms:
+        return queryset.order_by('-dt_created', '-id')
+    # 모든 토큰을 포함하는 글만 남기고, 가중치 합으로 순위를 매긴다.
+    return queryset.filter(
+        search_tokens__term__in=terms
+    ).annotate(
+        matched_terms=Count('search_tokens__term', distinct=True),
+        search_score=Sum('search_tokens__weight'),
+    ).filter(
+        matched_terms=len(terms)
+    ).order_by('-search_score', '-dt_created', '-id')
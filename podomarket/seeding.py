@@ -0,0 +1,210 @@
+import os
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from itertools import accumulate
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.utils import timezone
+
+from allauth.account.models import EmailAddress
+
+from .models import User, Post, Comment, Like
+
+SEED_PASSWORD = 'Podomarket1'
+
+REGIONS = [
+    '서울 강남구 역삼동', '서울 마포구 합정동', '서울 송파구 잠실동', '서울 관악구 신림동',
+    '부산 해운대구 우동', '부산 수영구 광안동', '대구 수성구 범어동', '인천 연수구 송도동',
+    '경기 성남시 분당구', '경기 수원시 영통구', '대전 유성구 봉명동', '광주 북구 용봉동',
+]
+
+ITEMS = [
+    '아이폰', '갤럭시', '에어팟', '맥북', '아이패드', '닌텐도 스위치', '플레이스테이션',
+    '캠핑 의자', '전기 자전거', '책상', '의자', '모니터', '키보드', '마우스', '스탠드',
+    '유모차', '카시트', '원피스', '패딩', '운동화', '가방', '전자레인지', '에어프라이어',
+]
+
+ADJECTIVES = ['거의 새것', '급처', '미개봉', '풀박스', '상태 좋은', '저렴하게', '직거래', '택포']
+
+DETAILS = [
+    '사용감 거의 없습니다.', '박스 포함입니다.', '직거래 선호합니다.', '네고 가능해요.',
+    '생활 기스 조금 있어요.', '이사 가서 정리합니다.', '선물 받았는데 안 써서 팝니다.',
+]
+
+COMMENTS = ['구매 가능할까요?', '네고 되나요?', '아직 판매 중인가요?', '직거래 어디서 하세요?', '찜했습니다!']
+
+
+def zipf_weights(count, exponent=1.1):
+    # 소수의 인기 유저/글에 활동이 몰리는 분포를 흉내낸다.
+    # random.choices에 바로 넘길 수 있도록 누적 가중치로 돌려준다.
+    return list(accumulate(1 / (rank ** exponent) for rank in range(1, count + 1)))
+
+
+def seed_images():
+    directory = os.path.join(settings.MEDIA_ROOT, 'item_pics')
+    try:
+        names = sorted(os.listdir(directory))
+    except FileNotFoundError:
+        names = []
+    return [f'item_pics/{name}' for name in names if not name.startswith('.')] or ['default_profile_pic.jpg']
+
+
+@contextmanager
+def manual_timestamps(*models):
+    # bulk_create에서도 auto_now/auto_now_add가 현재 시각으로 덮어쓰지 않도록 잠시 끈다.
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now = auto_now
+            field.auto_now_add = auto_now_add
+
+
+class MarketSeeder:
+    def __init__(self, users, posts, comments, likes, follows, days=90, batch_size=1000, seed=None, log=None):
+        self.counts = {
+            'users': users, 'posts': posts, 'comments': comments,
+            'likes': likes, 'follows': follows,
+        }
+        self.days = days
+        self.batch_size = batch_size
+        self.random = random.Random(seed)
+        self.log = log or (lambda message: None)
+        self.now = timezone.now()
+
+    def random_time(self, after=None):
+        start = after or self.now - timedelta(days=self.days)
+        span = max((self.now - start).total_seconds(), 1)
+        return start + timedelta(seconds=self.random.random() * span)
+
+    def run(self):
+        with transaction.atomic(), manual_timestamps(Post, Comment, Like):
+            users = self.create_users()
+            posts = self.create_posts(users)
+            comments = self.create_comments(users, posts)
+            self.create_likes(users, posts, comments)
+            self.create_follows(users)
+        return self.counts
+
+    def create_users(self):
+        start = User.objects.count()
+        password = make_password(SEED_PASSWORD)
+        users = []
+        for i in range(start, start + self.counts['users']):
+            users.append(User(
+                username=f'seed{i}',
+                email=f'seed{i}@podomarket.com',
+                password=password,
+                nickname=f'seed{i}',
+                kakao_id=f'kakao{i}',
+                address=self.random.choice(REGIONS),
+            ))
+        users = User.objects.bulk_create(users, batch_size=self.batch_size)
+        EmailAddress.objects.bulk_create(
+            [EmailAddress(user=user, email=user.email, verified=True, primary=True) for user in users],
+            batch_size=self.batch_size,
+        )
+        self.log(f'users: {len(users)}')
+        return users
+
+    def create_posts(self, users):
+        images = seed_images()
+        authors = self.random.choices(users, cum_weights=zipf_weights(len(users)), k=self.counts['posts'])
+        posts = []
+        for author in authors:
+            dt_created = self.random_time()
+            posts.append(Post(
+                title=f'{self.random.choice(ADJECTIVES)} {self.random.choice(ITEMS)}',
+                item_price=self.random.randint(1, 200) * 1000,
+                item_condition=self.random.choice(Post.condition)[0],
+                item_details=' '.join(self.random.sample(DETAILS, 3)),
+                image1=self.random.choice(images),
+                author=author,
+                dt_created=dt_created,
+                dt_updated=dt_created,
+                is_sold=self.random.random() < 0.2,
+            ))
+        posts = Post.objects.bulk_create(posts, batch_size=self.batch_size)
+        self.log(f'posts: {len(posts)}')
+        return posts
+
+    def create_comments(self, users, posts):
+        if not posts:
+            return []
+        targets = self.random.choices(posts, cum_weights=zipf_weights(len(posts)), k=self.counts['comments'])
+        authors = self.random.choices(users, cum_weights=zipf_weights(len(users)), k=self.counts['comments'])
+        comments = []
+        for post, author in zip(targets, authors):
+            dt_created = self.random_time(after=post.dt_created)
+            comments.append(Comment(
+                content=self.random.choice(COMMENTS),
+                author=author,
+                post=post,
+                dt_created=dt_created,
+                dt_updated=dt_created,
+            ))
+        comments = Comment.objects.bulk_create(comments, batch_size=self.batch_size)
+        self.log(f'comments: {len(comments)}')
+        return comments
+
+    def create_likes(self, users, posts, comments):
+        post_type = ContentType.objects.get_for_model(Post)
+        comment_type = ContentType.objects.get_for_model(Comment)
+        user_weights = zipf_weights(len(users))
+        post_weights = zipf_weights(len(posts))
+        comment_weights = zipf_weights(len(comments))
+        seen = set()
+        likes = []
+        # 중복 (유저, 대상) 조합은 건너뛰므로 시도 횟수에 상한을 둔다.
+        for _ in range(self.counts['likes'] * 3):
+            if len(likes) >= self.counts['likes']:
+                break
+            user = self.random.choices(users, cum_weights=user_weights)[0]
+            if comments and self.random.random() < 0.2:
+                target, content_type = self.random.choices(comments, cum_weights=comment_weights)[0], comment_type
+            elif posts:
+                target, content_type = self.random.choices(posts, cum_weights=post_weights)[0], post_type
+            else:
+                break
+            key = (user.id, content_type.id, target.id)
+            if key in seen:
+                continue
+            seen.add(key)
+            likes.append(Like(
+                user=user,
+                content_type=content_type,
+                object_id=target.id,
+                dt_created=self.random_time(after=target.dt_created),
+            ))
+        Like.objects.bulk_create(likes, batch_size=self.batch_size)
+        self.counts['likes'] = len(likes)
+        self.log(f'likes: {len(likes)}')
+
+    def create_follows(self, users):
+        Follow = User.following.through
+        weights = zipf_weights(len(users))
+        seen = set()
+        follows = []
+        for _ in range(self.counts['follows'] * 3):
+            if len(follows) >= self.counts['follows'] or len(users) < 2:
+                break
+            follower = self.random.choice(users)
+            followee = self.random.choices(users, cum_weights=weights)[0]
+            if follower.id == followee.id or (follower.id, followee.id) in seen:
+                continue
+            seen.add((follower.id, followee.id))
+            follows.append(Follow(from_user_id=follower.id, to_user_id=followee.id))
+        Follow.objects.bulk_create(follows, batch_size=self.batch_size)
+        self.counts['follows'] = len(follows)
+        self.log(f'follows: {len(follows)}')
@@ -0,0 +1,261 @@
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_init, pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from allauth.account.models import EmailAddress
+
+from .models import User, Post, ArchivedPost
+from .search import index_post
+from .images import schedule_variants
+from .storage import add_references, release_references
+from .timeline import fan_out_post, remove_post
+from .cards import card_key
+from .functions import forget_email_verified
+from .hot import hot_weight
+from .similar import mark_dirty
+from .regions import change_region_count, move_author_posts, region_code
+from .autocomplete import get_index
+
+FILE_FIELDS = {
+    Post: ('image1', 'image2', 'image3'),
+    ArchivedPost: ('image1', 'image2', 'image3'),
+    User: ('profile_pic',),
+}
+
+
+def loaded_file_names(instance):
+    # 지연 로딩(defer)된 필드는 건드리지 않아야 추가 쿼리가 생기지 않는다.
+    names = {}
+    for field in FILE_FIELDS[type(instance)]:
+        if field in instance.__dict__:
+            value = instance.__dict__[field]
+            names[field] = getattr(value, 'name', value) or ''
+    return names
+
+
+def indexed_text(instance):
+    values = instance.__dict__
+    return values.get('title'), values.get('item_details')
+
+
+def similar_state(instance):
+    values = instance.__dict__
+    return values.get('title'), values.get('item_details'), values.get('is_sold')
+
+
+def counted_region(instance):
+    # 판매 중인 글만 지역별 개수에 들어간다.
+    values = instance.__dict__
+    return values.get('region') if values.get('is_sold') is False else None
+
+
+def suggested_title(instance):
+    # 자동완성에는 판매 중인 글의 제목만 들어간다.
+    values = instance.__dict__
+    return values.get('title') if values.get('is_sold') is False else None
+
+
+def post_state(instance):
+    return {
+        'indexed_text': indexed_text(instance),
+        'similar_state': similar_state(instance),
+        'is_sold': instance.__dict__.get('is_sold'),
+        'counted_region': counted_region(instance),
+        'suggested_title': suggested_title(instance),
+        'file_names': loaded_file_names(instance),
+    }
+
+
+def archived_post_state(instance):
+    return {'file_names': loaded_file_names(instance)}
+
+
+def user_state(instance):
+    return {
+        'region': instance.__dict__.get('region'),
+        'file_names': loaded_file_names(instance),
+    }
+
+
+ORIGINAL_STATE = {
+    Post: post_state,
+    ArchivedPost: archived_post_state,
+    User: user_state,
+}
+
+
+# 인스턴스가 만들어질 때마다 불리므로, 저장 후 핸들러들이 비교할 값을 모델마다 한 번에 기억해 둔다.
+@receiver(post_init, sender=Post)
+@receiver(post_init, sender=ArchivedPost)
+@receiver(post_init, sender=User)
+def remember_original_state(sender, instance, **kwargs):
+    instance._original = ORIGINAL_STATE[sender](instance)
+
+
+@receiver(post_save, sender=Post)
+def update_search_index(sender, instance, created, raw=False, **kwargs):
+    # 좋아요, 거래완료처럼 제목과 내용이 그대로인 저장은 토큰을 다시 쓰지 않는다.
+    if raw or (not created and indexed_text(instance) == instance._original['indexed_text']):
+        return
+    index_post(instance)
+
+
+@receiver(post_save, sender=Post)
+def mark_similar_dirty(sender, instance, created, raw=False, **kwargs):
+    # 비슷한 글은 제목, 본문, 거래 상태로만 정해지므로 다른 저장은 적지 않는다.
+    if raw or (not created and similar_state(instance) == instance._original['similar_state']):
+        return
+    mark_dirty([instance.id])
+
+
+@receiver(post_delete, sender=Post)
+def mark_deleted_similar_dirty(sender, instance, **kwargs):
+    mark_dirty([instance.id])
+
+
+@receiver(post_save, sender=Post)
+def create_image_variants(sender, instance, created, raw=False, **kwargs):
+    # 이미지가 그대로인 저장(제목 수정, 거래완료 등)은 변환 작업을 넘기지 않는다.
+    if raw:
+        return
+    original = instance._original['file_names']
+    fields = [
+        field for field, name in loaded_file_names(instance).items()
+        if name and (created or field not in original or original[field] != name)
+    ]
+    if not fields:
+        return
+
+    def schedule():
+        # 썸네일이 생기기 전에 원본 주소로 캐시된 카드를 다 만든 뒤 다시 그리게 한다.
+        key = card_key(instance)
+
+        def invalidate(future):
+            if not future.cancelled() and not future.exception() and future.result():
+                cache.delete(key)
+
+        for future in schedule_variants(instance, fields):
+            future.add_done_callback(invalidate)
+    transaction.on_commit(schedule)
+
+
+@receiver(post_save, sender=Post)
+def update_timelines(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if instance.is_sold:
+        remove_post(instance)
+    elif created or instance._original['is_sold']:
+        # 새 글이거나 거래완료를 취소한 글은 팔로워 타임라인에 넣는다.
+        transaction.on_commit(lambda: fan_out_post(instance))
+
+
+@receiver(pre_save, sender=User)
+def normalize_region(sender, instance, raw=False, **kwargs):
+    if not raw:
+        instance.region = region_code(instance.address)
+
+
+@receiver(post_save, sender=User)
+def move_region(sender, instance, created, raw=False, **kwargs):
+    original = instance._original['region']
+    if created or raw or original is None or original == instance.region:
+        return
+    move_author_posts(instance, original, instance.region)
+
+
+@receiver(pre_save, sender=Post)
+def copy_author_region(sender, instance, raw=False, **kwargs):
+    if not raw and instance._state.adding:
+        instance.region = instance.author.region
+
+
+@receiver(pre_save, sender=Post)
+def start_hot_score(sender, instance, raw=False, **kwargs):
+    # 새 글은 작성 시점을 기준 시각으로 글 작성 가중치에서 시작한다.
+    if not raw and instance._state.adding:
+        instance.hot_score = hot_weight('post')
+        instance.hot_ts = time.time()
+
+
+@receiver(post_save, sender=Post)
+def update_region_counts(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    original, current = instance._original['counted_region'], counted_region(instance)
+    if original != current:
+        change_region_count(original, -1)
+        change_region_count(current, 1)
+
+
+@receiver(post_delete, sender=Post)
+def release_region_count(sender, instance, **kwargs):
+    change_region_count(instance._original['counted_region'], -1)
+
+
+@receiver(post_save, sender=Post)
+def update_autocomplete(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    # 새 글은 post_init 때 이미 제목이 들어 있으므로 원래 값이 없는 것으로 본다.
+    original = None if created else instance._original['suggested_title']
+    current = suggested_title(instance)
+    if original != current:
+        # 롤백된 변경이 인덱스에 남지 않도록 커밋된 뒤에 반영한다.
+        post_id = instance.id
+
+        def apply():
+            # 글 id로 묶으므로 제목이 바뀐 글은 새 제목으로 옮겨진다.
+            if current:
+                get_index().add(post_id, current)
+            else:
+                get_index().remove(post_id)
+        transaction.on_commit(apply)
+
+
+@receiver(post_delete, sender=Post)
+def remove_autocomplete(sender, instance, **kwargs):
+    # 지운 뒤에는 instance.id가 None이 되므로 미리 꺼내 둔다.
+    post_id = instance.id
+    if instance._original['suggested_title']:
+        transaction.on_commit(lambda: get_index().remove(post_id))
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=User)
+def update_blob_references(sender, instance, created, raw=False, **kwargs):
+    current = loaded_file_names(instance)
+    if created:
+        add_references(current.values())
+    else:
+        original = instance._original['file_names']
+        changed = [
+            field for field in current
+            if field in original and original[field] != current[field]
+        ]
+        add_references(current[field] for field in changed)
+        release_references([original[field] for field in changed])
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=ArchivedPost)
+@receiver(post_delete, sender=User)
+def release_blob_references(sender, instance, **kwargs):
+    release_references(list(instance._original['file_names'].values()))
+
+
+# 위의 post_save 핸들러들이 모두 저장 전 값을 보도록 맨 마지막에 연결해서 기억해 둔 값을 바꾼다.
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=User)
+def refresh_original_state(sender, instance, **kwargs):
+    instance._original = ORIGINAL_STATE[sender](instance)
+
+
+# 이메일 인증(allauth의 confirm_email)도 EmailAddress를 저장하므로 여기서 함께 처리된다.
+@receiver(post_save, sender=EmailAddress)
+@receiver(post_delete, sender=EmailAddress)
+def refresh_email_verified(sender, instance, **kwargs):
+    forget_email_verified(instance.user_id)
@@ -0,0 +1,308 @@
+import math
+import os
+import tempfile
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+from .models import Post, SimilarPost, DirtySimilarPost
+from .search import build_weights
+
+# 글을 제목(가중치 3)과 본문의 2글자 토큰으로 나눈 TF-IDF 벡터로 보고,
+# 코사인 유사도가 높은 글 top-k를 SimilarPost에 미리 저장해 둔다.
+# 벡터는 L2 정규화해 두므로 행렬 곱이 곧 코사인 유사도다.
+#
+# 글 하나에 나오는 토큰은 어휘 중 아주 일부라서 벡터는 CSR 형태로 들고 있고,
+# 유사도는 BLOCK_SIZE 행씩만 밀집 행렬로 펼쳐서 계산한다.
+
+BLOCK_SIZE = 4096
+
+
+def matrix_path():
+    return getattr(settings, 'SIMILAR_POSTS_MATRIX_PATH', settings.BASE_DIR / 'similar_posts.npz')
+
+
+def candidate_posts():
+    return Post.objects.filter(is_sold=False).only('id', 'title', 'item_details').order_by('id')
+
+
+class TermMatrix:
+    # 행 i의 값은 data[indptr[i]:indptr[i + 1]], 그 열 번호는 indices의 같은 구간이다.
+
+    def __init__(self, indptr, indices, data, width):
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.width = width
+
+    @classmethod
+    def from_rows(cls, rows, width):
+        lengths = [len(columns) for columns, values in rows]
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+        indices = np.concatenate([columns for columns, values in rows] or [np.zeros(0, dtype=np.int32)])
+        data = np.concatenate([values for columns, values in rows] or [np.zeros(0, dtype=np.float32)])
+        return cls(indptr, indices.astype(np.int32), data.astype(np.float32), width)
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+    def dense(self, start=0, stop=None):
+        stop = len(self) if stop is None else stop
+        block = np.zeros((stop - start, self.width), dtype=np.float32)
+        lo, hi = self.indptr[start], self.indptr[stop]
+        rows = np.repeat(np.arange(stop - start), np.diff(self.indptr[start:stop + 1]))
+        block[rows, self.indices[lo:hi]] = self.data[lo:hi]
+        return block
+
+    def blocks(self, size=None):
+        size = size or BLOCK_SIZE
+        for start in range(0, len(self), size):
+            yield start, self.dense(start, min(start + size, len(self)))
+
+    def row(self, position):
+        lo, hi = self.indptr[position], self.indptr[position + 1]
+        return self.indices[lo:hi], self.data[lo:hi]
+
+    def take(self, positions):
+        return TermMatrix.from_rows([self.row(position) for position in positions], self.width)
+
+    def vstack(self, other):
+        return TermMatrix(
+            np.concatenate([self.indptr, other.indptr[1:] + self.indptr[-1]]),
+            np.concatenate([self.indices, other.indices]),
+            np.concatenate([self.data, other.data]),
+            self.width,
+        )
+
+
+def fit_vocabulary(documents, max_features, min_df=2):
+    # 두 글 이상에 나오는 토큰 중 문서 빈도가 높은 max_features개만 쓴다.
+    df = {}
+    for weights in documents:
+        for term in weights:
+            df[term] = df.get(term, 0) + 1
+    terms = sorted((term for term, count in df.items() if count >= min_df), key=lambda term: (-df[term], term))
+    terms = terms[:max_features]
+    n = len(documents)
+    idf = np.array([math.log((1 + n) / (1 + df[term])) + 1 for term in terms], dtype=np.float32)
+    return terms, idf
+
+
+def vectorize(documents, vocabulary, idf):
+    index = {term: i for i, term in enumerate(vocabulary)}
+    rows = []
+    for weights in documents:
+        columns = np.array(sorted(index[term] for term in weights if term in index), dtype=np.int32)
+        values = np.array([1 + math.log(weights[vocabulary[column]]) for column in columns], dtype=np.float32)
+        values *= idf[columns]
+        norm = np.linalg.norm(values)
+        if norm > 0:
+            values /= norm
+        rows.append((columns, values))
+    return TermMatrix.from_rows(rows, len(vocabulary))
+
+
+def top_neighbours(queries, query_ids, matrix, matrix_ids, k, min_score):
+    # queries의 각 행에 대해 matrix에서 자기 자신을 뺀 상위 k개를 (id, 점수)로 돌려준다.
+    # matrix를 블록 단위로 펼치며 지금까지의 상위 k개와 합쳐 다시 자른다.
+    if k == 0:
+        return [[] for _ in query_ids]
+    best_scores = np.zeros((len(queries), 0), dtype=np.float32)
+    best_ids = np.zeros((len(queries), 0), dtype=np.int64)
+    for start, block in matrix.blocks():
+        ids = matrix_ids[start:start + len(block)]
+        scores = queries @ block.T
+        scores[query_ids[:, None] == ids[None, :]] = -1
+        scores = np.hstack([best_scores, scores])
+        candidates = np.hstack([best_ids, np.broadcast_to(ids, (len(queries), len(ids)))])
+        if scores.shape[1] > k:
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            scores = np.take_along_axis(scores, top, axis=1)
+            candidates = np.take_along_axis(candidates, top, axis=1)
+        best_scores, best_ids = scores, candidates
+
+    results = []
+    for scores, ids in zip(best_scores, best_ids):
+        order = np.argsort(-scores, kind='stable')
+        results.append([
+            (int(ids[column]), float(scores[column]))
+            for column in order if scores[column] >= min_score
+        ])
+    return results
+
+
+def make_rows(post_id, neighbours):
+    return [
+        SimilarPost(post_id=post_id, neighbour_id=neighbour_id, score=score, rank=rank)
+        for rank, (neighbour_id, score) in enumerate(neighbours)
+    ]
+
+
+def save_matrix(path, post_ids, matrix, vocabulary, idf):
+    # 쓰는 도중에 읽는 쪽이 깨진 파일을 보지 않도록 임시 파일에 쓰고 바꿔치기한다.
+    directory = os.path.dirname(os.fspath(path)) or '.'
+    with tempfile.NamedTemporaryFile(dir=directory, suffix='.npz', delete=False) as stream:
+        np.savez(
+            stream, post_ids=post_ids, indptr=matrix.indptr, indices=matrix.indices, data=matrix.data,
+            vocabulary=np.array(vocabulary), idf=idf,
+        )
+    os.replace(stream.name, path)
+
+
+def load_matrix(path):
+    # 예전의 밀집 행렬 파일이면 None을 돌려줘서 전체를 다시 만들게 한다.
+    with np.load(path) as data:
+        if 'indptr' not in data.files:
+            return None
+        vocabulary = list(data['vocabulary'])
+        matrix = TermMatrix(data['indptr'], data['indices'], data['data'], len(vocabulary))
+        return data['post_ids'], matrix, vocabulary, data['idf']
+
+
+def chunks(items, size=500):
+    # SQLite의 바인딩 변수 개수 제한을 넘지 않도록 IN 목록을 나눈다.
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def mark_dirty(post_ids):
+    DirtySimilarPost.objects.bulk_create(
+        [DirtySimilarPost(post_id=post_id) for post_id in post_ids],
+        ignore_conflicts=True,
+    )
+
+
+def write_rows(rows, replaced_post_ids=None, dirty_ids=()):
+    # 계산하는 동안 지워진 글을 가리키는 행은 버린다.
+    # 처리한 변경 기록도 같은 트랜잭션에서 지운다. 계산하는 동안 새로 생긴 기록은 남는다.
+    with transaction.atomic():
+        live = set(Post.objects.values_list('id', flat=True))
+        if replaced_post_ids is None:
+            SimilarPost.objects.all().delete()
+        else:
+            for ids in chunks(replaced_post_ids):
+                SimilarPost.objects.filter(post_id__in=ids).delete()
+        SimilarPost.objects.bulk_create(
+            [row for row in rows if row.post_id in live and row.neighbour_id in live],
+            batch_size=1000,
+        )
+        for ids in chunks(list(dirty_ids)):
+            DirtySimilarPost.objects.filter(post_id__in=ids).delete()
+
+
+def build_similar_posts(k=None, batch_size=512, max_features=None, log=None):
+    log = log or (lambda message: None)
+    if k is None:
+        k = getattr(settings, 'SIMILAR_POSTS_K', 10)
+    max_features = max_features or getattr(settings, 'SIMILAR_POSTS_MAX_FEATURES', 2048)
+    min_score = getattr(settings, 'SIMILAR_POSTS_MIN_SCORE', 0.1)
+
+    dirty_ids = list(DirtySimilarPost.objects.values_list('post_id', flat=True))
+    posts = list(candidate_posts())
+    documents = [build_weights(post) for post in posts]
+    vocabulary, idf = fit_vocabulary(documents, max_features)
+    matrix = vectorize(documents, vocabulary, idf)
+    post_ids = np.array([post.id for post in posts], dtype=np.int64)
+    log(f'글 {len(posts)}개, 토큰 {len(vocabulary)}개로 벡터를 만들었습니다.')
+
+    # 유사도 행렬 전체를 한 번에 만들지 않고 batch_size 행씩 계산한다.
+    rows = []
+    for start in range(0, len(posts), batch_size):
+        stop = min(start + batch_size, len(posts))
+        neighbours = top_neighbours(
+            matrix.dense(start, stop), post_ids[start:stop], matrix, post_ids, k, min_score,
+        )
+        for post_id, items in zip(post_ids[start:stop], neighbours):
+            rows.extend(make_rows(int(post_id), items))
+        log(f'{stop}/{len(posts)}')
+
+    save_matrix(matrix_path(), post_ids, matrix, vocabulary, idf)
+    write_rows(rows, dirty_ids=dirty_ids)
+    return {'posts': len(posts), 'neighbours': len(rows)}
+
+
+def update_similar_posts(k=None, batch_size=512, log=None):
+    # 마지막 빌드 이후에 올라왔거나 바뀐(수정, 거래완료/취소, 삭제) 글만 다시 계산한다.
+    # 어휘와 IDF는 마지막 전체 빌드의 것을 그대로 쓰므로, 새 토큰은 다음 전체 빌드 때 반영된다.
+    log = log or (lambda message: None)
+    if k is None:
+        k = getattr(settings, 'SIMILAR_POSTS_K', 10)
+    min_score = getattr(settings, 'SIMILAR_POSTS_MIN_SCORE', 0.1)
+    path = matrix_path()
+    loaded = load_matrix(path) if os.path.exists(path) else None
+    if loaded is None:
+        log('저장된 벡터가 없어 전체를 다시 만듭니다.')
+        return build_similar_posts(k=k, batch_size=batch_size, log=log)
+
+    post_ids, matrix, vocabulary, idf = loaded
+    dirty_ids = set(DirtySimilarPost.objects.values_list('post_id', flat=True))
+    last_id = int(post_ids.max()) if len(post_ids) else 0
+    # 대량으로 넣은 글은 시그널을 거치지 않으므로 id로도 찾는다.
+    posts = list(candidate_posts().filter(id__gt=last_id))
+    for ids in chunks(sorted(dirty_ids)):
+        posts.extend(candidate_posts().filter(id__in=ids, id__lte=last_id))
+    changed_ids = dirty_ids | {post.id for post in posts}
+    if not changed_ids:
+        return {'posts': 0, 'neighbours': 0}
+
+    # 바뀐 글의 예전 벡터는 빼고, 지금도 판매 중인 글은 새 벡터로 붙인다.
+    stale = np.isin(post_ids, list(changed_ids))
+    old_vectors = matrix.take(np.nonzero(stale)[0]).dense()
+    keep = np.nonzero(~stale)[0]
+    base_ids, base = post_ids[keep], matrix.take(keep)
+    new_ids = np.array([post.id for post in posts], dtype=np.int64)
+    new_matrix = vectorize([build_weights(post) for post in posts], vocabulary, idf)
+    new_vectors = new_matrix.dense()
+    all_ids = np.concatenate([base_ids, new_ids])
+    all_matrix = base.vstack(new_matrix)
+
+    # 예전 벡터와 비슷했던 글은 목록에 바뀐 글이 있었을 수 있으므로 이웃을 처음부터 다시 찾고,
+    # 새 벡터와만 비슷한 글은 기존 목록에 새 점수를 합쳐 다시 자른다.
+    recompute, additions = [], {}
+    for start, block in base.blocks():
+        was_similar = np.zeros(len(block), dtype=bool)
+        if len(old_vectors):
+            was_similar = (block @ old_vectors.T).max(axis=1) >= min_score
+        recompute.extend(start + np.nonzero(was_similar)[0])
+        if not len(new_vectors):
+            continue
+        scores = block @ new_vectors.T
+        for row in np.nonzero(~was_similar & (scores.max(axis=1) >= min_score))[0]:
+            additions[int(base_ids[start + row])] = [
+                (int(new_ids[column]), float(scores[row, column]))
+                for column in np.nonzero(scores[row] >= min_score)[0]
+            ]
+
+    rows = []
+    for ids, vectors in ((new_ids, new_matrix), (base_ids[recompute], base.take(recompute))):
+        for start in range(0, len(ids), batch_size):
+            stop = min(start + batch_size, len(ids))
+            neighbours = top_neighbours(vectors.dense(start, stop), ids[start:stop], all_matrix, all_ids, k, min_score)
+            for post_id, items in zip(ids[start:stop], neighbours):
+                rows.extend(make_rows(int(post_id), items))
+
+    changed = {}
+    current = {}
+    for ids in chunks(list(additions)):
+        for post_id, neighbour_id, score in SimilarPost.objects.filter(
+            post_id__in=ids
+        ).values_list('post_id', 'neighbour_id', 'score'):
+            current.setdefault(post_id, []).append((neighbour_id, score))
+    for post_id, items in additions.items():
+        existing = sorted(current.get(post_id, []), key=lambda item: -item[1])
+        merged = sorted(existing + items, key=lambda item: -item[1])[:k]
+        if merged != existing:
+            changed[post_id] = merged
+    for post_id, merged in changed.items():
+        rows.extend(make_rows(post_id, merged))
+
+    save_matrix(path, all_ids, all_matrix, vocabulary, idf)
+    replaced = list(changed_ids) + [int(base_ids[position]) for position in recompute] + list(changed)
+    write_rows(rows, replaced, dirty_ids)
+    log(
+        f'바뀐 글 {len(changed_ids)}개를 다시 계산하고, 기존 글 {len(recompute)}개의 목록을 새로 찾고 '
+        f'{len(changed)}개의 목록을 고쳤습니다.'
+    )
+    return {'posts': len(changed_ids), 'neighbours': len(rows)}
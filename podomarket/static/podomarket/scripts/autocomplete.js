@@ -0,0 +1,42 @@
+// data-autocomplete-url이 있는 검색창은 입력이 잠시 멈추면 제목 추천을 받아 datalist에 채운다.
+// 늦게 도착한 이전 요청의 응답은 버린다.
+var AUTOCOMPLETE_DELAY = 150;
+
+document.addEventListener('input', function (event) {
+  var input = event.target;
+  var url = input.dataset && input.dataset.autocompleteUrl;
+  if (!url || !input.list || !window.fetch) {
+    return;
+  }
+  clearTimeout(input.autocompleteTimer);
+  input.autocompleteTimer = setTimeout(function () {
+    var query = input.value.trim();
+    var list = input.list;
+    if (!query) {
+      list.innerHTML = '';
+      return;
+    }
+    var request = (input.autocompleteRequest || 0) + 1;
+    input.autocompleteRequest = request;
+
+    fetch(url + '?q=' + encodeURIComponent(query), {credentials: 'same-origin'})
+      .then(function (response) {
+        if (!response.ok) {
+          throw new Error(response.status);
+        }
+        return response.json();
+      })
+      .then(function (data) {
+        if (request !== input.autocompleteRequest) {
+          return;
+        }
+        list.innerHTML = '';
+        data.suggestions.forEach(function (title) {
+          var option = document.createElement('option');
+          option.value = title;
+          list.appendChild(option);
+        });
+      })
+      .catch(function () {});
+  }, AUTOCOMPLETE_DELAY);
+});
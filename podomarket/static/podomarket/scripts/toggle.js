@@ -0,0 +1,44 @@
+// data-api-url이 있는 좋아요/팔로우 폼은 페이지를 새로 고치지 않고 JSON API로 토글한다.
+// 스크립트가 없거나 요청이 실패하면 원래 폼 전송으로 동작한다.
+document.addEventListener('submit', function (event) {
+  var form = event.target;
+  var url = form.dataset.apiUrl;
+  if (!url || !window.fetch) {
+    return;
+  }
+  event.preventDefault();
+  if (form.dataset.pending) {
+    return;
+  }
+  form.dataset.pending = '1';
+
+  fetch(url, {
+    method: 'POST',
+    credentials: 'same-origin',
+    headers: {'X-CSRFToken': form.querySelector('[name=csrfmiddlewaretoken]').value},
+  })
+    .then(function (response) {
+      if (!response.ok) {
+        throw new Error(response.status);
+      }
+      return response.json();
+    })
+    .then(function (data) {
+      if ('liked' in data) {
+        var icon = form.querySelector('img');
+        icon.src = data.liked ? form.dataset.iconOn : form.dataset.iconOff;
+        icon.alt = data.liked ? 'filled like icon' : 'like icon';
+        form.querySelector('span').textContent = ' ' + data.like_count;
+      } else if ('following' in data) {
+        var button = form.querySelector('button');
+        button.textContent = data.following ? '언팔로우' : '팔로우';
+        button.classList.toggle('secondary', data.following);
+      }
+    })
+    .catch(function () {
+      form.submit();
+    })
+    .finally(function () {
+      delete form.dataset.pending;
+    });
+});
@@ -0,0 +1,121 @@
+import hashlib
+import os
+import posixpath
+import tempfile
+from collections import Counter
+from datetime import timedelta
+
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .images import VARIANTS, FORMATS, variant_name
+
+BLOB_DIR = 'blobs'
+
+# 업로드 후 아직 어떤 행에도 연결되지 않은 blob을 지우기 전에 기다리는 시간
+ORPHAN_GRACE = timedelta(hours=1)
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    # 업로드 파일 이름 대신 내용의 sha256으로 blobs/ab/cd/<hash>.<ext>에 저장한다.
+    # 같은 바이트는 한 번만 저장되고, 참조 수는 MediaBlob이 관리한다.
+
+    def get_available_name(self, name, max_length=None):
+        return name
+
+    def blob_name(self, hexdigest, extension):
+        return posixpath.join(BLOB_DIR, hexdigest[:2], hexdigest[2:4], hexdigest + extension)
+
+    def _save(self, name, content):
+        from .models import MediaBlob
+
+        tmp_dir = self.path(posixpath.join(BLOB_DIR, 'tmp'))
+        os.makedirs(tmp_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            # 파일을 쓰면서 동시에 해시를 계산해서 한 번만 읽는다.
+            with os.fdopen(fd, 'wb') as tmp_file:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    tmp_file.write(chunk)
+                    size += len(chunk)
+            extension = os.path.splitext(name)[1].lower()
+            name = self.blob_name(digest.hexdigest(), extension)
+            full_path = self.path(name)
+            if os.path.exists(full_path):
+                os.remove(tmp_path)
+            else:
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                os.replace(tmp_path, full_path)
+                if self.file_permissions_mode is not None:
+                    os.chmod(full_path, self.file_permissions_mode)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        blob, created = MediaBlob.objects.get_or_create(name=name, defaults={'size': size})
+        if not created:
+            # 참조가 막 풀린 blob을 누가 다시 올렸을 수 있으므로, 폼이 저장될 때까지 지우지 않도록
+            # 유예 시간을 지금부터 다시 잰다.
+            MediaBlob.objects.filter(id=blob.id).update(dt_created=timezone.now())
+        return name
+
+
+def change_references(names, delta):
+    # 한 글의 image1과 image2처럼 같은 이미지가 여러 번 나오면 그 횟수만큼 바꾼다.
+    from .models import MediaBlob
+
+    counts = Counter(name for name in names if name)
+    by_count = {}
+    for name, count in counts.items():
+        by_count.setdefault(count, []).append(name)
+    for count, group in by_count.items():
+        MediaBlob.objects.filter(name__in=group).update(ref_count=F('ref_count') + delta * count)
+    return list(counts)
+
+
+def add_references(names):
+    change_references(names, 1)
+
+
+def release_references(names):
+    names = change_references(names, -1)
+    if names:
+        # 같은 이미지가 방금 다시 올라와 아직 참조되기 전일 수 있으므로 유예 시간을 지킨다.
+        transaction.on_commit(lambda: collect_garbage(names=names, grace=ORPHAN_GRACE))
+
+
+def delete_blob_files(storage, name):
+    storage.delete(name)
+    for variant in VARIANTS:
+        for fmt in FORMATS:
+            storage.delete(variant_name(name, variant, fmt))
+
+
+def collect_garbage(names=None, grace=None):
+    # 참조가 없는 blob의 파일과 행을 지운다. grace를 주면 그보다 오래된 것만 지워서
+    # 아직 폼 저장 중인 업로드를 건드리지 않는다.
+    from django.core.files.storage import default_storage
+    from .models import MediaBlob
+
+    blobs = MediaBlob.objects.filter(ref_count__lte=0)
+    if names is not None:
+        blobs = blobs.filter(name__in=names)
+    if grace is not None:
+        blobs = blobs.filter(dt_created__lt=timezone.now() - grace)
+
+    deleted = 0
+    for blob in blobs.iterator():
+        with transaction.atomic():
+            # 그 사이 다시 참조되었거나 다시 올라왔으면 지우지 않는다.
+            candidate = MediaBlob.objects.filter(id=blob.id, ref_count__lte=0, dt_created=blob.dt_created)
+            if candidate.delete()[0]:
+                delete_blob_files(default_storage, blob.name)
+                deleted += 1
+    return deleted
+
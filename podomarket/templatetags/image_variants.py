@@ -0,0 +1,10 @@
+from django import template
+
+from podomarket import images
+
+register = template.Library()
+
+
+@register.simple_tag
+def variant_url(image, variant, fmt='jpeg', fallback=True):
+    return images.variant_url(image, variant, fmt, fallback)
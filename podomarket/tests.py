@@ -1,3 +1,1385 @@
-from django.test import TestCase
+import io
+import json
+import math
+import os
+import sqlite3
+import tempfile
+import time
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import connection, connections
+from django.db.models import F
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils import timezone
+
+from allauth.account.models import EmailAddress
+from PIL import Image
+
+from . import autocomplete, routers
+from .archive import archivable_posts, archive_posts, restore_batch
+from .cards import invalidate_post
+from .counters import change_comment_count, reconcile_counters, toggle_like
+from .db.sqlite3.base import DatabaseWrapper as SqliteDatabaseWrapper
+from .functions import email_verified_cache_key, is_email_verified
+from .hot import DEFAULT_WEIGHTS, hot_weight, rebase_hot_scores, rebuild_hot_scores
+from .images import FORMATS, VARIANTS, render_variants
+from .importer import MarketImporter, iter_json_array
+from .middleware import ReplicaRoutingMiddleware
+from .models import (
+    User, Post, Comment, Like, MediaBlob, RegionCount, SearchToken, SimilarPost, TimelineEntry,
+    ArchivedPost, ArchivedComment, ArchivedLike, DirtySimilarPost,
+)
+from .pagination import CursorPaginator, encode_cursor
+from .perflog import RingBufferJsonlWriter, percentile, read_records
+from .queryplan import capture_statements, explain, plan_issues
+from .regions import region_code
+from .replay import replay
+from .routers import PrimaryReplicaRouter, ReplicaState, end_request, start_request
+from .search import search_posts
+from .seeding import SEED_PASSWORD
+from .similar import build_similar_posts, update_similar_posts
+from .storage import ORPHAN_GRACE, collect_garbage
+from .timeline import TimelinePaginator, follow, rebuild_timelines, unfollow
+
+
+class QueryBudgetMixin:
+    # 뷰가 정해진 쿼리 수를 넘기면 실패시켜서 N+1 회귀를 CI에서 잡는다.
+
+    def get_query_count(self, url, **extra):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, **extra)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries), context.captured_queries
+
+    def assertQueryBudget(self, url, budget, **extra):
+        count, queries = self.get_query_count(url, **extra)
+        if count > budget:
+            executed = '\n'.join(
+                f"{i}. {query['sql']}" for i, query in enumerate(queries, start=1)
+            )
+            self.fail(f"{url} ran {count} queries, budget is {budget}:\n{executed}")
+        return count
+
+
+class PostDetailViewQueryBudgetTest(QueryBudgetMixin, TestCase):
+    # 버전 확인, 글, 댓글, 비슷한 상품 (+ 로그인 시 세션, 유저, 좋아요)
+    ANONYMOUS_BUDGET = 4
+    AUTHENTICATED_BUDGET = 7
+
+    def setUp(self):
+        self.author = User.objects.create_user(
+            'author', 'author@podomarket.com', 'Password1',
+            nickname='author', kakao_id='author', address='서울',
+        )
+        self.viewer = User.objects.create_user(
+            'viewer', 'viewer@podomarket.com', 'Password1',
+            nickname='viewer', kakao_id='viewer', address='부산',
+        )
+        self.post = Post.objects.create(
+            title='포도', item_price=1000, item_condition='상',
+            image1='item_pics/post.jpg', author=self.author,
+        )
+        self.url = reverse('post-detail', kwargs={'post_id': self.post.id})
+        # 운영 환경처럼 ContentType 캐시가 채워진 상태에서 측정한다.
+        ContentType.objects.get_for_models(Post, Comment)
+
+    def add_comments(self, count):
+        start = Comment.objects.count()
+        for i in range(start, start + count):
+            commenter = User.objects.create_user(
+                f'commenter{i}', f'commenter{i}@podomarket.com', 'Password1',
+                nickname=f'commenter{i}', kakao_id='kakao', address='대구',
+            )
+            comment = Comment.objects.create(
+                content='댓글', author=commenter, post=self.post,
+            )
+            Like.objects.create(user=self.viewer, liked_object=comment)
+
+    def test_anonymous_budget(self):
+        self.add_comments(3)
+        self.assertQueryBudget(self.url, self.ANONYMOUS_BUDGET)
+
+    def login_viewer(self):
+        self.client.force_login(self.viewer)
+        # 첫 요청은 세션에 프로필 확인 결과를 저장하므로 한 번 보내 둔다.
+        self.client.get(self.url)
+
+    def test_authenticated_budget(self):
+        self.add_comments(3)
+        self.login_viewer()
+        self.assertQueryBudget(self.url, self.AUTHENTICATED_BUDGET)
+
+    def test_query_count_does_not_grow_with_comments(self):
+        self.login_viewer()
+        self.add_comments(1)
+        few, _ = self.get_query_count(self.url)
+        self.add_comments(20)
+        many, _ = self.get_query_count(self.url)
+        self.assertEqual(few, many)
+
+
+class ToggleApiTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(
+            'author', 'author@podomarket.com', 'Password1',
+            nickname='author', kakao_id='author', address='서울',
+        )
+        self.viewer = User.objects.create_user(
+            'viewer', 'viewer@podomarket.com', 'Password1',
+            nickname='viewer', kakao_id='viewer', address='부산',
+        )
+        EmailAddress.objects.create(
+            user=self.viewer, email=self.viewer.email, verified=True, primary=True,
+        )
+        self.post = Post.objects.create(
+            title='포도', item_price=1000, item_condition='상',
+            image1='item_pics/post.jpg', author=self.author,
+        )
+        self.like_url = reverse('api-like', kwargs={
+            'content_type_id': ContentType.objects.get_for_model(Post).id,
+            'object_id': self.post.id,
+        })
+        self.follow_url = reverse('api-follow', kwargs={'user_id': self.author.id})
+
+    def test_like_toggle_returns_state_and_count(self):
+        self.client.force_login(self.viewer)
+        response = self.client.post(self.like_url)
+        self.assertEqual(response.json(), {'liked': True, 'like_count': 1})
+        response = self.client.post(self.like_url)
+        self.assertEqual(response.json(), {'liked': False, 'like_count': 0})
+        self.assertFalse(Like.objects.exists())
+
+    def test_like_missing_object_is_rolled_back(self):
+        self.client.force_login(self.viewer)
+        url = reverse('api-like', kwargs={
+            'content_type_id': ContentType.objects.get_for_model(Post).id,
+            'object_id': self.post.id + 100,
+        })
+        self.assertEqual(self.client.post(url).status_code, 404)
+        self.assertFalse(Like.objects.exists())
+
+    def test_follow_toggle_returns_state_and_count(self):
+        self.client.force_login(self.viewer)
+        response = self.client.post(self.follow_url)
+        self.assertEqual(response.json(), {'following': True, 'follower_count': 1})
+        response = self.client.post(self.follow_url)
+        self.assertEqual(response.json(), {'following': False, 'follower_count': 0})
+
+    def test_cannot_follow_self(self):
+        EmailAddress.objects.create(
+            user=self.author, email=self.author.email, verified=True, primary=True,
+        )
+        self.client.force_login(self.author)
+        self.assertEqual(self.client.post(self.follow_url).status_code, 400)
+        response = self.client.post(reverse('process-follow', kwargs={'user_id': self.author.id}))
+        self.assertRedirects(response, reverse('profile', kwargs={'user_id': self.author.id}))
+        self.assertFalse(self.author.following.exists())
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.follower_count, 0)
+
+    def test_requires_login_and_verification(self):
+        self.assertEqual(self.client.post(self.like_url).status_code, 401)
+        EmailAddress.objects.filter(user=self.viewer).update(verified=False)
+        self.client.force_login(self.viewer)
+        self.assertEqual(self.client.post(self.like_url).status_code, 403)
+
+
+class SearchFacetTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        author = User.objects.create_user(
+            'author', 'author@podomarket.com', 'Password1',
+            nickname='author', kakao_id='author', address='서울',
+        )
+        for price, condition in [(5000, '상'), (20000, '상'), (30000, '중'), (700000, '새제품')]:
+            Post.objects.create(
+                title='포도 상자', item_price=price, item_condition=condition,
+                image1='item_pics/post.jpg', author=author,
+            )
+
+    def test_filters_sort_and_facet_counts(self):
+        response = self.client.get(reverse('search'), {
+            'query': '포도', 'condition': '상', 'price_min': 10000, 'sort': 'price_asc',
+        })
+        self.assertEqual([post.item_price for post in response.context['search_results']], [20000])
+        # 상태별 개수에는 가격 필터만, 가격대별 개수에는 상태 필터만 적용된다.
+        conditions = {facet['value']: facet['count'] for facet in response.context['condition_facets']}
+        self.assertEqual(conditions, {'새제품': 1, '최상': 0, '상': 1, '중': 1, '하': 0})
+        self.assertEqual([facet['count'] for facet in response.context['price_facets']], [1, 1, 0, 0, 0])
+
+    def test_facet_counts_are_cached_per_normalized_query(self):
+        params = {'query': '포도', 'condition': ['중', '상'], 'sort': 'price_desc'}
+        self.client.get(reverse('search'), params)
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(reverse('search'), {**params, 'query': '  포도 ', 'condition': ['상', '중'], 'sort': 'recent'})
+        self.assertFalse(any('"condition_0"' in query['sql'] for query in context.captured_queries))
+
+
+class RegionTest(TestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user(
+            'seller', 'seller@podomarket.com', 'Password1',
+            nickname='seller', kakao_id='seller', address='서울특별시 강남구 역삼동 123',
+        )
+        self.post = Post.objects.create(
+            title='포도', item_price=1000, item_condition='상',
+            image1='item_pics/post.jpg', author=self.seller,
+        )
+
+    def counts(self):
+        return dict(RegionCount.objects.filter(post_count__gt=0).values_list('code', 'post_count'))
+
+    def test_address_is_normalized_into_region_code(self):
+        self.assertEqual(region_code('경기도 성남시 분당구 정자동 1'), '경기/성남시/분당구/정자동')
+        self.assertEqual(region_code('부산 해운대구'), '부산/해운대구')
+        self.assertEqual(region_code('강남 어딘가'), '')
+        self.assertEqual(self.seller.region, '서울/강남구/역삼동')
+        self.assertEqual(self.post.region, '서울/강남구/역삼동')
+
+    def test_counts_follow_posts_and_address_changes(self):
+        self.assertEqual(self.counts(), {'서울': 1, '서울/강남구': 1, '서울/강남구/역삼동': 1})
+        self.seller.address = '서울 마포구 합정동'
+        self.seller.save()
+        self.assertEqual(self.counts(), {'서울': 1, '서울/마포구': 1, '서울/마포구/합정동': 1})
+        post = Post.objects.get(id=self.post.id)
+        post.is_sold = True
+        post.save()
+        self.assertEqual(self.counts(), {})
+
+    def test_index_filters_by_region_prefix(self):
+        other = User.objects.create_user(
+            'other', 'other@podomarket.com', 'Password1',
+            nickname='other', kakao_id='other', address='서울 강남구청',
+        )
+        Post.objects.create(
+            title='사과', item_price=1000, item_condition='상',
+            image1='item_pics/post.jpg', author=other,
+        )
+        response = self.client.get(reverse('index'), {'region': '서울/강남구'})
+        self.assertEqual(list(response.context['posts']), [self.post])
+        self.assertEqual(response.context['region_children'], [
+            {'code': '서울/강남구/역삼동', 'name': '역삼동', 'count': 1},
+        ])
+
+
+class SimilarPostTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(
+            'author', 'author@podomarket.com', 'Password1',
+            nickname='author', kakao_id='author', address='서울',
+        )
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        settings = override_settings(SIMILAR_POSTS_MATRIX_PATH=os.path.join(self.tmpdir.name, 'similar.npz'))
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def create_post(self, title):
+        return Post.objects.create(
+            title=title, item_price=1000, item_condition='상',
+            image1='item_pics/post.jpg', author=self.author,
+        )
+
+    def neighbours(self, post):
+        return list(
+            SimilarPost.objects.filter(post=post).order_by('rank').values_list('neighbour__title', flat=True)
+        )
+
+    def test_build_and_incremental_update(self):
+        phone = self.create_post('아이폰 케이스')
+        self.create_post('아이폰 필름')
+        self.create_post('캠핑 의자')
+        self.create_post('캠핑 테이블')
+        build_similar_posts()
+        self.assertEqual(self.neighbours(phone), ['아이폰 필름'])
+
+        # 전체 빌드 없이 새 글의 이웃을 찾고, 기존 글의 목록에도 새 글을 넣는다.
+        new_phone = self.create_post('아이폰 충전기')
+        update_similar_posts()
+        self.assertCountEqual(self.neighbours(new_phone), ['아이폰 케이스', '아이폰 필름'])
+        self.assertCountEqual(self.neighbours(phone), ['아이폰 필름', '아이폰 충전기'])
+
+        response = self.client.get(reverse('post-detail', kwargs={'post_id': phone.id}))
+        self.assertEqual(len(response.context['similar_posts']), 2)
+
+    def test_blocks_give_the_same_neighbours(self):
+        posts = [self.create_post(title) for title in ('아이폰 케이스', '아이폰 필름', '아이폰 충전기', '캠핑 의자', '캠핑 테이블')]
+        build_similar_posts()
+        expected = [self.neighbours(post) for post in posts]
+        # 한 번에 한 행씩만 펼쳐도 결과가 같아야 한다.
+        with mock.patch('podomarket.similar.BLOCK_SIZE', 1):
+            build_similar_posts()
+        self.assertEqual([self.neighbours(post) for post in posts], expected)
+
+    def test_zero_k_stores_no_neighbours(self):
+        phone = self.create_post('아이폰 케이스')
+        self.create_post('아이폰 필름')
+        build_similar_posts()
+        self.assertEqual(self.neighbours(phone), ['아이폰 필름'])
+        build_similar_posts(k=0)
+        self.assertFalse(SimilarPost.objects.exists())
+        self.create_post('아이폰 충전기')
+        update_similar_posts(k=0)
+        self.assertFalse(SimilarPost.objects.exists())
+
+    def test_update_recomputes_changed_posts(self):
+        phone = self.create_post('아이폰 케이스')
+        film = self.create_post('아이폰 필름')
+        chair = self.create_post('캠핑 의자')
+        table = self.create_post('캠핑 테이블')
+        build_similar_posts()
+        self.assertFalse(DirtySimilarPost.objects.exists())
+
+        # 좋아요처럼 제목/본문/거래 상태가 그대로인 저장은 다시 계산할 글로 적지 않는다.
+        phone.item_price = 2000
+        phone.save()
+        self.assertFalse(DirtySimilarPost.objects.exists())
+
+        film.title = '캠핑 필름'
+        film.save()
+        update_similar_posts()
+        self.assertEqual(self.neighbours(phone), [])
+        self.assertCountEqual(self.neighbours(film), ['캠핑 의자', '캠핑 테이블'])
+        self.assertCountEqual(self.neighbours(chair), ['캠핑 테이블', '캠핑 필름'])
+
+        table.is_sold = True
+        table.save()
+        update_similar_posts()
+        self.assertEqual(self.neighbours(table), [])
+        self.assertEqual(self.neighbours(chair), ['캠핑 필름'])
+
+        table.is_sold = False
+        table.save()
+        update_similar_posts()
+        self.assertCountEqual(self.neighbours(chair), ['캠핑 테이블', '캠핑 필름'])
+
+        chair.delete()
+        update_similar_posts()
+        self.assertEqual(self.neighbours(table), ['캠핑 필름'])
+        self.assertFalse(DirtySimilarPost.objects.exists())
+
+
+class HotScoreTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(
+            'author', 'author@podomarket.com', 'Password1',
+            nickname='author', kakao_id='author', address='서울',
+        )
+        self.quiet, self.liked = [
+            Post.objects.create(
+                title=title, item_price=1000, item_condition='상',
+                image1='item_pics/post.jpg', author=self.author,
+            )
+            for title in ('조용한 글', '인기 글')
+        ]
+        self.post_type = ContentType.objects.get_for_model(Post).id
+
+    def test_likes_raise_score_and_popular_tab_orders_by_it(self):
+        toggle_like(self.author, self.post_type, self.liked.id)
+        response = self.client.get(reverse('popular'))
+        self.assertEqual(list(response.context['posts']), [self.liked, self.quiet])
+        toggle_like(self.author, self.post_type, self.liked.id)
+        self.liked.refresh_from_db()
+        self.assertAlmostEqual(self.liked.hot_score, hot_weight('post'), places=3)
+
+    def test_rebase_matches_full_rebuild(self):
+        toggle_like(self.author, self.post_type, self.liked.id)
+        now = time.time() + 3 * 24 * 3600
+        rebase_hot_scores(now=now)
+        rebased = dict(Post.objects.values_list('id', 'hot_score'))
+        rebuild_hot_scores(now=now)
+        rebuilt = dict(Post.objects.values_list('id', 'hot_score'))
+        for post_id, score in rebuilt.items():
+            self.assertAlmostEqual(rebased[post_id], score, places=3)
+        self.assertLess(rebuilt[self.quiet.id], hot_weight('post') / 4)
+
+    @override_settings(HOT_SCORE_WEIGHTS={'like': 5.0})
+    def test_settings_override_only_given_weights(self):
+        self.assertEqual(hot_weight('like'), 5.0)
+        self.assertEqual(hot_weight('post'), DEFAULT_WEIGHTS['post'])
+
+    def test_old_hot_ts_does_not_overflow(self):
+        # rebase가 오래 돌지 않은 거래완료 글에도 좋아요와 댓글을 달 수 있어야 한다.
+        five_years_ago = time.time() - 5 * 365 * 24 * 3600
+        Post.objects.filter(id=self.liked.id).update(is_sold=True, hot_ts=five_years_ago)
+        toggle_like(self.author, self.post_type, self.liked.id)
+        change_comment_count(self.liked.id, 1)
+        self.liked.refresh_from_db()
+        self.assertTrue(math.isfinite(self.liked.hot_score))
+
+        rebase_hot_scores()
+        self.liked.refresh_from_db()
+        self.assertGreater(self.liked.hot_ts, five_years_ago)
+        self.assertTrue(math.isfinite(self.liked.hot_score))
+
+
+class AutocompleteTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(
+            'author', 'author@podomarket.com', 'Password1',
+            nickname='author', kakao_id='author', address='서울',
+        )
+        for title in ('아이폰 케이스', '아이폰 충전기', '아이폰 충전기'):
+            self.create_post(title)
+        # 다른 테스트에서 만든 인덱스를 쓰지 않도록 새 인덱스로 바꿔 둔다.
+        patcher = mock.patch.object(autocomplete, '_index', autocomplete.AutocompleteIndex())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def create_post(self, title):
+        return Post.objects.create(
+            title=title, item_price=1000, item_condition='상',
+            image1='item_pics/post.jpg', author=self.author,
+        )
+
+    def suggest(self, query):
+        response = self.client.get(reverse('api-autocomplete'), {'q': query})
+        return response.json()['suggestions']
+
+    def test_suggests_by_prefix_and_word(self):
+        self.assertEqual(self.suggest('아이'), ['아이폰 충전기', '아이폰 케이스'])
+        self.assertEqual(self.suggest('충전'), ['아이폰 충전기'])
+        self.assertEqual(self.suggest(''), [])
+
+    def test_follows_post_changes(self):
+        self.suggest('아이')
+        with self.captureOnCommitCallbacks(execute=True):
+            post = self.create_post('갤럭시 버즈')
+        self.assertEqual(self.suggest('갤럭'), ['갤럭시 버즈'])
+        with self.captureOnCommitCallbacks(execute=True):
+            post.is_sold = True
+            post.save()
+        self.assertEqual(self.suggest('갤럭'), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.get(title='아이폰 케이스').delete()
+        self.assertEqual(self.suggest('아이'), ['아이폰 충전기'])
+
+    def test_reload_does_not_count_changes_twice(self):
+        self.suggest('아이')
+        index = autocomplete.get_index()
+        # 다시 읽는 도중에 올라온 글은 새로 읽은 목록에도, 모아 둔 변경에도 들어 있다.
+        self.assertTrue(index.start_reload())
+        with self.captureOnCommitCallbacks(execute=True):
+            post = self.create_post('갤럭시 버즈')
+        index.finish_reload()
+        with self.captureOnCommitCallbacks(execute=True):
+            post.delete()
+        self.assertEqual(self.suggest('갤럭'), [])
+
+    def test_buffered_keys_are_merged(self):
+        index = autocomplete.PrefixIndex(merge_size=2)
+        index.extend([(1, '아이폰 케이스')])
+        index.add(2, '아이폰 필름')
+        index.add(2, '아이폰 필름')
+        self.assertEqual(len(index.new_keys), 2)
+        self.assertEqual(index.suggest('아이'), ['아이폰 케이스', '아이폰 필름'])
+
+        index.remove(1)
+        index.add(3, '캠핑 의자')
+        self.assertEqual(index.new_keys, [])
+        self.assertEqual(index.keys, ['아이폰 필름', '의자', '캠핑 의자', '필름'])
+        self.assertEqual(index.suggest('아이'), ['아이폰 필름'])
+
+    def test_removed_titles_free_their_slots(self):
+        index = autocomplete.PrefixIndex(merge_size=2)
+        for i in range(20):
+            index.add(i, f'아이폰 {i}')
+            index.remove(i)
+        # 키를 버린 제목 번호를 다시 쓰므로 넣고 빼기를 반복해도 배열이 커지지 않는다.
+        self.assertLessEqual(len(index.titles), 6)
+        index.add(100, '아이폰 케이스')
+        index.merge()
+        self.assertEqual(index.suggest('아이'), ['아이폰 케이스'])
+        self.assertEqual(index.keys, ['아이폰 케이스', '케이스'])
+
+
+class ConditionalGetTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(
+            'author', 'author@podomarket.com', 'Password1',
+            nickname='author', kakao_id='author', address='서울',
+        )
+        self.post = Post.objects.create(
+            title='포도', item_price=1000, item_condition='상',
+            image1='item_pics/post.jpg', author=self.author,
+        )
+        self.url = reverse('post-detail', kwargs={'post_id': self.post.id})
+        self.post_type = ContentType.objects.get_for_model(Post).id
+
+    def get(self, url, etag=None):
+        if etag is None:
+            return self.client.get(url)
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_unchanged_detail_returns_304_without_rendering(self):
+        # 첫 응답이 CSRF 쿠키를 심으면 ETag가 한 번 바뀌므로 한 번 보내 둔다.
+        self.get(self.url)
+        response = self.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Cookie', response['Vary'])
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertTrue(response.has_header('Last-Modified'))
+
+        with CaptureQueriesContext(connection) as context:
+            cached = self.get(self.url, response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached.templates, [])
+        self.assertEqual(len(context.captured_queries), 1)
+
+        Comment.objects.create(content='댓글', author=self.author, post=self.post)
+        self.assertEqual(self.get(self.url, response['ETag']).status_code, 200)
+
+    def test_etag_follows_user_and_likes(self):
+        anonymous = self.get(self.url)['ETag']
+        self.client.force_login(self.author)
+        self.get(self.url)
+        etag = self.get(self.url)['ETag']
+        self.assertNotEqual(etag, anonymous)
+        self.assertIn('private', self.get(self.url)['Cache-Control'])
+        toggle_like(self.author, self.post_type, self.post.id)
+        self.assertEqual(self.get(self.url, etag).status_code, 200)
+
+    def test_list_probe(self):
+        url = reverse('index')
+        self.get(url)
+        etag = self.get(url)['ETag']
+        self.assertEqual(self.get(url, etag).status_code, 304)
+        self.post.is_sold = True
+        self.post.save()
+        self.assertEqual(self.get(url, etag).status_code, 200)
+
+    def test_wishlist_like_swap(self):
+        other = Post.objects.create(
+            title='사과', item_price=1000, item_condition='상',
+            image1='item_pics/post.jpg', author=self.author,
+        )
+        # 개수와 가장 최근 수정 시각이 같아도 좋아요한 글이 바뀌면 알아채야 한다.
+        Post.objects.update(dt_updated=self.post.dt_updated)
+        toggle_like(self.author, self.post_type, self.post.id)
+        self.client.force_login(self.author)
+        url = reverse('wishlist')
+        self.get(url)
+        etag = self.get(url)['ETag']
+        self.assertEqual(self.get(url, etag).status_code, 304)
+        toggle_like(self.author, self.post_type, self.post.id)
+        toggle_like(self.author, self.post_type, other.id)
+        self.assertEqual(self.get(url, etag).status_code, 200)
+
+    def test_author_edits_change_etag(self):
+        commenter = User.objects.create_user(
+            'commenter', 'commenter@podomarket.com', 'Password1',
+            nickname='commenter', kakao_id='commenter', address='부산',
+        )
+        Comment.objects.create(content='댓글', author=commenter, post=self.post)
+        index_url = reverse('index')
+        self.get(index_url)
+        index_etag = self.get(index_url)['ETag']
+
+        # 카드에 보이는 작성자 주소 (지역 코드는 그대로)
+        self.author.address = '서울특별시'
+        self.author.save()
+        self.assertEqual(self.get(index_url, index_etag).status_code, 200)
+
+        detail_etag = self.get(self.url)['ETag']
+        commenter.nickname = 'renamed'
+        commenter.save()
+        self.assertEqual(self.get(self.url, detail_etag).status_code, 200)
+
+
+class MediaBlobReferenceTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(
+            'author', 'author@podomarket.com', 'Password1',
+            nickname='author', kakao_id='author', address='서울',
+        )
+        for name in ('blobs/aa/aa/a.jpg', 'blobs/bb/bb/b.jpg'):
+            MediaBlob.objects.create(name=name, size=1)
+
+    def ref_counts(self):
+        return dict(MediaBlob.objects.values_list('name', 'ref_count'))
+
+    def test_same_image_in_two_fields_is_counted_twice(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            post = Post.objects.create(
+                title='포도', item_price=1000, item_condition='상',
+                image1='blobs/aa/aa/a.jpg', image2='blobs/aa/aa/a.jpg', author=self.author,
+            )
+        self.assertEqual(self.ref_counts(), {'blobs/aa/aa/a.jpg': 2, 'blobs/bb/bb/b.jpg': 0})
+
+        # image2만 바꾸면 image1이 아직 쓰는 blob은 지워지지 않아야 한다.
+        post = Post.objects.get(id=post.id)
+        post.image2 = 'blobs/bb/bb/b.jpg'
+        with self.captureOnCommitCallbacks(execute=True):
+            post.save()
+        self.assertEqual(self.ref_counts(), {'blobs/aa/aa/a.jpg': 1, 'blobs/bb/bb/b.jpg': 1})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.get(id=post.id).delete()
+        self.assertEqual(self.ref_counts(), {'blobs/aa/aa/a.jpg': 0, 'blobs/bb/bb/b.jpg': 0})
+        # 갓 올라온 blob은 유예 시간이 지난 뒤에 지운다.
+        MediaBlob.objects.update(dt_created=timezone.now() - ORPHAN_GRACE * 2)
+        self.assertEqual(collect_garbage(grace=ORPHAN_GRACE), 2)
+        self.assertEqual(self.ref_counts(), {})
+
+    def test_release_does_not_collect_blob_uploaded_again(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        with override_settings(MEDIA_ROOT=media.name):
+            name = default_storage.save('a.jpg', ContentFile(b'podo'))
+            with self.captureOnCommitCallbacks(execute=True):
+                post = Post.objects.create(
+                    title='포도', item_price=1000, item_condition='상', image1=name, author=self.author,
+                )
+            MediaBlob.objects.filter(name=name).update(dt_created=timezone.now() - ORPHAN_GRACE * 2)
+
+            # 글을 지우는 동안 다른 사용자가 같은 이미지를 올리면, 그 글이 저장되기 전까지
+            # blob의 참조 수는 0이지만 지워지면 안 된다.
+            with self.captureOnCommitCallbacks(execute=True):
+                post.delete()
+                self.assertEqual(default_storage.save('b.jpg', ContentFile(b'podo')), name)
+            self.assertEqual(self.ref_counts()[name], 0)
+            self.assertTrue(default_storage.exists(name))
+
+            with self.captureOnCommitCallbacks(execute=True):
+                Post.objects.create(
+                    title='포도', item_price=1000, item_condition='상', image1=name, author=self.author,
+                )
+            self.assertEqual(self.ref_counts()[name], 1)
+
+
+class TimelineTest(TestCase):
+    def setUp(self):
+        self.author, self.celebrity, self.viewer = [
+            User.objects.create_user(
+                name, f'{name}@podomarket.com', 'Password1',
+                nickname=name, kakao_id=name, address='서울',
+            )
+            for name in ('author', 'celebrity', 'viewer')
+        ]
+        User.objects.filter(id=self.celebrity.id).update(follower_count=10000)
+        self.celebrity.refresh_from_db()
+        follow(self.viewer, self.author)
+        follow(self.viewer, self.celebrity)
+
+    def create_post(self, author, title='포도'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Post.objects.create(
+                title=title, item_price=1000, item_condition='상',
+                image1='item_pics/post.jpg', author=author,
+            )
+
+    def entries(self):
+        return set(TimelineEntry.objects.filter(user=self.viewer).values_list('post_id', flat=True))
+
+    def test_fan_out_sold_and_unfollow(self):
+        post = self.create_post(self.author)
+        # 팔로워가 많은 작성자의 글은 복사하지 않는다.
+        self.create_post(self.celebrity)
+        self.assertEqual(self.entries(), {post.id})
+        post.is_sold = True
+        post.save()
+        self.assertEqual(self.entries(), set())
+        with self.captureOnCommitCallbacks(execute=True):
+            post.is_sold = False
+            post.save()
+        self.assertEqual(self.entries(), {post.id})
+        unfollow(self.viewer, self.author)
+        self.assertEqual(self.entries(), set())
+
+    def test_pages_merge_pulled_authors(self):
+        posts = [self.create_post(author) for author in (self.author, self.celebrity) * 3]
+        expected = sorted(posts, key=lambda post: (post.dt_created, post.id), reverse=True)
+        paginator = TimelinePaginator(self.viewer, 4)
+        first = paginator.page()
+        second = paginator.page(first.next_cursor)
+        self.assertEqual(list(first) + list(second), expected)
+        self.assertFalse(second.has_next())
+        self.assertEqual(list(paginator.page(second.previous_cursor)), expected[:4])
+
+    def test_view_reads_timeline_index(self):
+        self.create_post(self.author)
+        self.create_post(self.celebrity)
+        self.client.force_login(self.viewer)
+        url = reverse('following-post-list')
+        self.client.get(url)
+        status, statements = capture_statements(self.client, url, {})
+        self.assertEqual(status, 200)
+        timeline_queries = [(sql, params) for sql, params in statements if 'podomarket_timelineentry' in sql]
+        self.assertTrue(timeline_queries)
+        for sql, params in timeline_queries:
+            plan = explain(sql, params)
+            self.assertEqual(plan_issues(plan), [], plan)
+
+    def test_rebuild_timelines(self):
+        post = self.create_post(self.author)
+        TimelineEntry.objects.all().delete()
+        User.objects.filter(id=self.author.id).update(follower_count=5)
+        rebuild_timelines()
+        self.assertEqual(self.entries(), {post.id})
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.follower_count, 1)
+
+
+class PostCardCacheTest(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('index')
+
+    def create_post(self, i, title='포도'):
+        author = User.objects.create_user(
+            f'author{i}', f'author{i}@podomarket.com', 'Password1',
+            nickname=f'author{i}', kakao_id='kakao', address='서울',
+        )
+        return Post.objects.create(
+            title=title, item_price=1000, item_condition='상',
+            image1='item_pics/post.jpg', author=author,
+        )
+
+    def rendered_cards(self):
+        response = self.client.get(self.url)
+        return [template.name for template in response.templates].count('components/post_card.html')
+
+    def test_query_count_does_not_grow_with_cards(self):
+        self.create_post(0)
+        few, _ = self.get_query_count(self.url)
+        for i in range(1, 8):
+            self.create_post(i)
+        cache.clear()
+        many, _ = self.get_query_count(self.url)
+        self.assertEqual(few, many)
+
+    def test_cards_are_cached_and_invalidated(self):
+        post = self.create_post(0)
+        # 썸네일이 아직 없어도 카드를 캐시한다.
+        self.assertEqual(self.rendered_cards(), 1)
+        self.assertEqual(self.rendered_cards(), 0)
+
+        post.title = '사과'
+        post.save()
+        self.assertEqual(self.rendered_cards(), 1)
+        self.assertContains(self.client.get(self.url), '사과')
+
+        post.author.address = '서울특별시'
+        post.author.save()
+        self.assertContains(self.client.get(self.url), '서울특별시')
+        self.assertEqual(self.rendered_cards(), 0)
+
+        invalidate_post(post)
+        self.assertEqual(self.rendered_cards(), 1)
+
+
+class SearchIndexTest(TestCase):
+    def setUp(self):
+        author = User.objects.create_user(
+            'author', 'author@podomarket.com', 'Password1',
+            nickname='author', kakao_id='author', address='서울',
+        )
+        self.case, self.chair = [
+            Post.objects.create(
+                title=title, item_price=1000, item_condition='상', item_details=details,
+                image1='item_pics/post.jpg', author=author,
+            )
+            for title, details in (('아이폰 케이스', '투명'), ('캠핑 의자', '접이식 의자'))
+        ]
+
+    def search(self, query):
+        return list(search_posts(Post.objects.all(), query))
+
+    def test_matches_like_substring_search(self):
+        self.assertEqual(self.search('아이폰케이스'), [self.case])
+        self.assertEqual(self.search('케이스 아이폰'), [self.case])
+        self.assertEqual(self.search('폰'), [self.case])
+        self.assertEqual(self.search('폰 케이스'), [self.case])
+        self.assertEqual(self.search('의자'), [self.chair])
+        self.assertEqual(self.search('갤럭시'), [])
+
+    def test_reindexes_only_when_text_changes(self):
+        self.case.is_sold = True
+        with CaptureQueriesContext(connection) as context:
+            self.case.save()
+        self.assertFalse(any('podomarket_searchtoken' in query['sql'] for query in context.captured_queries))
+
+        self.case.title = '갤럭시 케이스'
+        self.case.save()
+        self.assertEqual(self.search('갤럭시'), [self.case])
+        self.assertEqual(self.search('아이폰'), [])
+
+
+class QueryPlanTest(TestCase):
+    # 작성자별 목록과 위시리스트는 인덱스 순서대로 읽어서 임시 정렬이 없어야 한다.
+
+    def setUp(self):
+        self.author = User.objects.create_user(
+            'author', 'author@podomarket.com', 'Password1',
+            nickname='author', kakao_id='author', address='서울',
+        )
+        post_type = ContentType.objects.get_for_model(Post).id
+        for i in range(10):
+            post = Post.objects.create(
+                title=f'포도 {i}', item_price=1000, item_condition='상',
+                image1='item_pics/post.jpg', author=self.author,
+            )
+            toggle_like(self.author, post_type, post.id)
+        self.client.force_login(self.author)
+
+    def assertNoTempBtree(self, url, params=None):
+        self.client.get(url, params or {})
+        status, statements = capture_statements(self.client, url, params or {})
+        self.assertEqual(status, 200)
+        for sql, sql_params in statements:
+            plan = explain(sql, sql_params)
+            self.assertFalse(
+                [issue for issue in plan_issues(plan) if issue.startswith('temp b-tree')],
+                f'{url}: {sql}\n' + '\n'.join(plan),
+            )
+
+    def test_author_lists(self):
+        self.assertNoTempBtree(reverse('profile', kwargs={'user_id': self.author.id}))
+        url = reverse('user-post-list', kwargs={'user_id': self.author.id})
+        self.assertNoTempBtree(url)
+        self.assertNoTempBtree(url, {'cursor': ''})
+
+    def test_wishlist(self):
+        url = reverse('wishlist')
+        self.assertNoTempBtree(url)
+        first = self.client.get(url, {'cursor': ''}).context['page_obj']
+        self.assertNoTempBtree(url, {'cursor': first.next_cursor})
+        # 최근에 찜한 글부터 보여준다.
+        second = self.client.get(url, {'cursor': first.next_cursor}).context['page_obj']
+        titles = [post.title for post in list(first) + list(second)]
+        self.assertEqual(titles, [f'포도 {i}' for i in reversed(range(10))])
+
+
+class ArchiveTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(
+            'author', 'author@podomarket.com', 'Password1',
+            nickname='author', kakao_id='author', address='서울',
+        )
+        MediaBlob.objects.create(name='blobs/aa/aa/a.jpg', size=1)
+        self.old = timezone.now() - timedelta(days=30)
+
+    def create_post(self, title='포도', is_sold=True):
+        with self.captureOnCommitCallbacks(execute=True):
+            post = Post.objects.create(
+                title=title, item_price=1000, item_condition='상',
+                image1='blobs/aa/aa/a.jpg', author=self.author, is_sold=is_sold,
+            )
+        Post.objects.filter(id=post.id).update(dt_updated=self.old)
+        return post
+
+    def ref_count(self):
+        return MediaBlob.objects.values_list('ref_count', flat=True).get(name='blobs/aa/aa/a.jpg')
+
+    def test_only_sold_posts_are_archivable(self):
+        sold = self.create_post(is_sold=True)
+        self.create_post(is_sold=False)
+        self.assertEqual(list(archivable_posts()), [sold])
+
+    def test_archive_and_restore_round_trip(self):
+        post = self.create_post()
+        comment = Comment.objects.create(content='댓글', author=self.author, post=post)
+        for content_type, object_id in ((Post, post.id), (Comment, comment.id)):
+            toggle_like(self.author, ContentType.objects.get_for_model(content_type).id, object_id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(archive_posts(), 1)
+        self.assertFalse(Post.objects.exists())
+        self.assertEqual((ArchivedComment.objects.count(), ArchivedLike.objects.count()), (1, 2))
+        self.assertEqual(self.ref_count(), 1)
+        response = self.client.get(reverse('post-detail', kwargs={'post_id': post.id}))
+        self.assertTrue(response.context['is_archived'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(restore_batch([post.id]), 1)
+        restored = Post.objects.get(id=post.id)
+        self.assertEqual((restored.dt_created, restored.like_count), (post.dt_created, 1))
+        self.assertEqual(Comment.objects.get(id=comment.id).like_count, 1)
+        self.assertEqual((Like.objects.count(), ArchivedLike.objects.count()), (2, 0))
+        self.assertFalse(ArchivedPost.objects.exists())
+        self.assertEqual(self.ref_count(), 1)
+        self.assertEqual(list(search_posts(Post.objects.all(), '포도')), [restored])
+
+    def test_user_post_list_pages_across_tables(self):
+        posts = [self.create_post(f'글 {i}', is_sold=i % 2 == 0) for i in range(12)]
+        archive_posts()
+        self.assertEqual(ArchivedPost.objects.count(), 6)
+
+        url = reverse('user-post-list', kwargs={'user_id': self.author.id})
+        titles, params = [], {}
+        while True:
+            page = self.client.get(url, params).context['page_obj']
+            titles.extend(post.title for post in page)
+            if not page.has_next():
+                break
+            params = {'cursor': page.next_cursor}
+        self.assertEqual(titles, [post.title for post in reversed(posts)])
+
+
+class EmailVerificationCacheTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            'user', 'user@podomarket.com', 'Password1',
+            nickname='user', kakao_id='user', address='서울',
+        )
+        self.email = EmailAddress.objects.create(
+            user=self.user, email=self.user.email, verified=True, primary=True,
+        )
+
+    def test_change_is_seen_without_clearing_the_cache(self):
+        # 캐시를 지우지 않으므로, 다른 프로세스의 캐시에 남은 예전 값도 다음 요청에선 쓰이지 않는다.
+        stale_user = User.objects.get(id=self.user.id)
+        self.assertTrue(is_email_verified(stale_user))
+        stale_key = email_verified_cache_key(stale_user)
+
+        self.email.verified = False
+        self.email.save()
+        self.assertTrue(cache.get(stale_key))
+        self.assertFalse(is_email_verified(User.objects.get(id=self.user.id)))
+
+        # 메모리에 있던 예전 유저를 저장해도 예전 키로 돌아가지 않는다.
+        stale_user.save()
+        self.assertFalse(is_email_verified(User.objects.get(id=self.user.id)))
+
+    def test_verification_required_view(self):
+        self.client.force_login(self.user)
+        url = reverse('post-create')
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+        self.email.verified = False
+        self.email.save()
+        self.assertRedirects(
+            self.client.get(url), reverse('account_email_confirmation_required'),
+            fetch_redirect_response=False,
+        )
+
+
+class ImageVariantTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(
+            'author', 'author@podomarket.com', 'Password1',
+            nickname='author', kakao_id='author', address='서울',
+        )
+
+    def test_render_skips_fresh_variants_without_decoding(self):
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, 'post.jpg')
+            Image.new('RGB', (1200, 800), 'purple').save(source)
+            targets = [
+                (variant, fmt, os.path.join(directory, 'variants', f'post_{variant}.{fmt}'))
+                for variant in VARIANTS for fmt in FORMATS
+            ]
+            self.assertEqual(render_variants(source, targets), len(targets))
+
+            with mock.patch('podomarket.images.Image.open') as image_open:
+                self.assertEqual(render_variants(source, targets), 0)
+            image_open.assert_not_called()
+
+            # 원본이 더 새로우면 다시 만든다.
+            later = os.path.getmtime(targets[0][2]) + 10
+            os.utime(source, (later, later))
+            self.assertEqual(render_variants(source, targets), len(targets))
+
+    def test_schedules_only_changed_images(self):
+        with mock.patch('podomarket.signals.schedule_variants', return_value=[]) as schedule:
+            with self.captureOnCommitCallbacks(execute=True):
+                post = Post.objects.create(
+                    title='포도', item_price=1000, item_condition='상',
+                    image1='item_pics/post.jpg', author=self.author,
+                )
+            schedule.assert_called_once_with(post, ['image1'])
+
+            schedule.reset_mock()
+            with self.captureOnCommitCallbacks(execute=True):
+                post.title = '샤인머스캣'
+                post.is_sold = True
+                post.save()
+            schedule.assert_not_called()
+
+            with self.captureOnCommitCallbacks(execute=True):
+                post.image2 = 'item_pics/post2.jpg'
+                post.save()
+            schedule.assert_called_once_with(post, ['image2'])
+
+
+class ImporterTest(TestCase):
+    RECORDS = [
+        {'model': 'podomarket.user', 'pk': 100, 'fields': {
+            'username': 'seller', 'email': 'seller@podomarket.com', 'nickname': 'seller',
+            'kakao_id': 'seller', 'address': '서울',
+        }},
+        {'model': 'podomarket.post', 'pk': 200, 'fields': {
+            'title': '포도', 'item_price': 1000, 'item_condition': '상',
+            'image1': 'item_pics/post.jpg', 'author': 100,
+        }},
+    ]
+
+    def test_counts_only_inserted_rows(self):
+        result = MarketImporter().run(self.RECORDS)
+        self.assertEqual(result['imported'], {'User': 1, 'Post': 1})
+        self.assertEqual(result['duplicates'], {'User': 0, 'Post': 0})
+
+        # 이미 있는 행은 ignore_conflicts로 건너뛰므로 저장한 행으로 세지 않는다.
+        result = MarketImporter().run(self.RECORDS)
+        self.assertEqual(result['imported'], {'User': 0, 'Post': 0})
+        self.assertEqual(result['duplicates'], {'User': 1, 'Post': 1})
+
+    def test_reads_elements_split_across_chunks(self):
+        records = [{'title': '아이폰 케이스' * 20, 'is_sold': True, 'price': 123456789}] * 5
+        stream = io.StringIO(json.dumps(records))
+        self.assertEqual(list(iter_json_array(stream, chunk_size=3)), records)
+
+    def test_malformed_element_reports_position(self):
+        text = '[{"a": 1}, {"a": tru}, ' + ', '.join(['{"a": 1}'] * 10000) + ']'
+        stream = io.StringIO(text)
+        with self.assertRaisesMessage(ValueError, '1번째 원소(문자 위치 17)'):
+            list(iter_json_array(stream, chunk_size=8))
+        # 잘못된 원소에서 멈추고 파일을 끝까지 읽지 않는다.
+        self.assertLess(stream.tell(), 200)
+
+
+class ReplayTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            'user', 'user@podomarket.com', 'Password1',
+            nickname='user', kakao_id='user', address='서울',
+        )
+        self.records = [{'path': '/', 'method': 'GET', 'user_id': self.user.id}]
+
+    def test_sessions_are_deleted_after_replay(self):
+        target = mock.Mock()
+        target.send.return_value = 200
+        report = replay(self.records, target, concurrency=1, speed=0)
+        self.assertEqual(report['requests'], 1)
+        session_key = target.send.call_args.args[2]
+        self.assertTrue(session_key)
+        self.assertFalse(Session.objects.filter(session_key=session_key).exists())
+
+    def test_sessions_are_deleted_when_replay_fails(self):
+        with mock.patch('podomarket.replay.trace_offsets', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                replay(self.records, mock.Mock(), concurrency=1, speed=0)
+        self.assertFalse(Session.objects.exists())
+
+
+class CursorPaginationTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(
+            'author', 'author@podomarket.com', 'Password1',
+            nickname='author', kakao_id='author', address='서울',
+        )
+        self.posts = [
+            Post.objects.create(
+                title=f'글 {i}', item_price=1000, item_condition='상',
+                image1='item_pics/post.jpg', author=self.author,
+            )
+            for i in range(10)
+        ]
+        # 같은 시각에 올라온 글은 id로 순서를 정한다.
+        moment = timezone.now()
+        Post.objects.filter(id__in=[post.id for post in self.posts[3:7]]).update(dt_created=moment)
+        self.expected = list(Post.objects.order_by('-dt_created', '-id').values_list('id', flat=True))
+
+    def ids(self, page):
+        return [post.id for post in page]
+
+    def test_pages_forward_and_back(self):
+        paginator = CursorPaginator(Post.objects.all(), 3)
+        pages = [paginator.page()]
+        self.assertFalse(pages[0].has_previous())
+        while pages[-1].has_next():
+            pages.append(paginator.page(pages[-1].next_cursor))
+        self.assertEqual([post_id for page in pages for post_id in self.ids(page)], self.expected)
+        self.assertEqual([len(page) for page in pages], [3, 3, 3, 1])
+
+        # 이전 페이지 커서로 돌아가면 같은 페이지가 나온다.
+        for previous, page in zip(reversed(pages[:-1]), reversed(pages[1:])):
+            self.assertEqual(self.ids(paginator.page(page.previous_cursor)), self.ids(previous))
+
+    def test_list_view_cursor(self):
+        url = reverse('index')
+        page = self.client.get(url, {'cursor': ''}).context['page_obj']
+        self.assertEqual(self.ids(page), self.expected[:8])
+        page = self.client.get(url, {'cursor': page.next_cursor}).context['page_obj']
+        self.assertEqual(self.ids(page), self.expected[8:])
+        self.assertFalse(page.has_next())
+
+    def test_invalid_cursor(self):
+        for token in ('garbage', encode_cursor('next', self.posts[0]) + 'x', 'WyJ1cCIsICIyMDIwIiwgMV0'):
+            self.assertEqual(self.client.get(reverse('index'), {'cursor': token}).status_code, 404)
+
+
+class CounterTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(
+            'author', 'author@podomarket.com', 'Password1',
+            nickname='author', kakao_id='author', address='서울',
+        )
+        EmailAddress.objects.create(
+            user=self.author, email=self.author.email, verified=True, primary=True,
+        )
+        self.post = Post.objects.create(
+            title='포도', item_price=1000, item_condition='상',
+            image1='item_pics/post.jpg', author=self.author,
+        )
+        self.post_type = ContentType.objects.get_for_model(Post).id
+        self.comment_type = ContentType.objects.get_for_model(Comment).id
+
+    def counts(self, model, object_id):
+        return model.objects.values_list('like_count', flat=True).get(id=object_id)
+
+    def test_comment_views_keep_comment_count(self):
+        self.client.force_login(self.author)
+        self.client.post(reverse('comment-create', kwargs={'post_id': self.post.id}), {'content': '댓글'})
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+
+        comment = Comment.objects.get()
+        self.client.post(reverse('comment-delete', kwargs={'comment_id': comment.id}))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 0)
+
+    def test_toggle_like_keeps_like_count(self):
+        comment = Comment.objects.create(content='댓글', author=self.author, post=self.post)
+        self.assertEqual(toggle_like(self.author, self.post_type, self.post.id), (True, 1))
+        self.assertEqual(toggle_like(self.author, self.comment_type, comment.id), (True, 1))
+        self.assertEqual(toggle_like(self.author, self.post_type, self.post.id), (False, 0))
+        self.assertEqual((self.counts(Post, self.post.id), self.counts(Comment, comment.id)), (0, 1))
+
+    def test_reconcile_fixes_only_drifted_rows(self):
+        comment = Comment.objects.create(content='댓글', author=self.author, post=self.post)
+        change_comment_count(self.post.id, 1)
+        toggle_like(self.author, self.post_type, self.post.id)
+        other = Post.objects.create(
+            title='사과', item_price=1000, item_condition='상',
+            image1='item_pics/post.jpg', author=self.author,
+        )
+        self.assertEqual(reconcile_counters(), {'post': 0, 'comment': 0})
+
+        Post.objects.filter(id=self.post.id).update(like_count=5, comment_count=0)
+        Comment.objects.filter(id=comment.id).update(like_count=2)
+        self.assertEqual(reconcile_counters(), {'post': 1, 'comment': 1})
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.like_count, self.post.comment_count), (1, 1))
+        self.assertEqual(self.counts(Comment, comment.id), 0)
+        self.assertEqual(self.counts(Post, other.id), 0)
+
+
+class PerformanceLogTest(TestCase):
+    def setUp(self):
+        patcher = mock.patch('podomarket.middleware.get_writer')
+        self.writer = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+
+    def records(self):
+        return [call.args[0] for call in self.writer.write.call_args_list]
+
+    def test_disabled_by_default(self):
+        self.client.get(reverse('index'))
+        self.assertEqual(self.records(), [])
+
+    @override_settings(PERF_LOG_SAMPLE_RATE=1)
+    def test_records_sampled_request(self):
+        self.client.get(reverse('index'))
+        [record] = self.records()
+        self.assertEqual((record['method'], record['url_name'], record['status']), ('GET', 'index', 200))
+        self.assertIsNone(record['user_id'])
+        self.assertGreater(record['sql_count'], 0)
+        self.assertGreaterEqual(record['template_ms'], 0)
+        self.assertGreater(record['response_bytes'], 0)
+
+    @override_settings(PERF_LOG_SAMPLE_RATE=0.5)
+    def test_samples_by_rate(self):
+        with mock.patch('podomarket.middleware.random.random', side_effect=[0.4, 0.6, 0.1]):
+            for _ in range(3):
+                self.client.get(reverse('index'))
+        self.assertEqual(len(self.records()), 2)
+
+    def test_ring_buffer_drops_oldest(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'perf.jsonl')
+            writer = RingBufferJsonlWriter(path, capacity=2)
+            with mock.patch.object(writer, 'start'):
+                for i in range(3):
+                    writer.write({'i': i})
+            writer.flush()
+            self.assertEqual(writer.dropped, 1)
+            self.assertEqual(list(read_records(path)), [{'i': 1}, {'i': 2}])
+        self.assertEqual(percentile([1, 2, 3, 4], 0.5), 2)
+        self.assertEqual(percentile([1, 2, 3, 4], 0.99), 4)
+
+
+class SeederTest(TestCase):
+    def seed(self):
+        call_command(
+            'seed_market', users=5, posts=20, comments=30, likes=40, follows=6, days=30, seed=1,
+            stdout=io.StringIO(),
+        )
+
+    def test_seeds_consistent_data(self):
+        self.seed()
+        self.assertEqual(
+            (User.objects.count(), Post.objects.count(), Comment.objects.count()), (5, 20, 30),
+        )
+        self.assertLessEqual(Like.objects.count(), 40)
+        self.assertEqual(User.following.through.objects.count(), 6)
+
+        # 시각은 지난 30일에 흩어져 있고, 댓글은 글보다 나중이다.
+        oldest = Post.objects.order_by('dt_created').first().dt_created
+        self.assertLess(oldest, timezone.now() - timedelta(days=1))
+        self.assertFalse(Comment.objects.filter(dt_created__lt=F('post__dt_created')).exists())
+        # bulk_create 뒤에 파생 데이터를 다시 만들므로 카운터가 맞다.
+        self.assertEqual(reconcile_counters(), {'post': 0, 'comment': 0})
+        self.assertTrue(SearchToken.objects.exists())
+
+        # 끝나면 auto_now가 되돌아온다.
+        self.assertTrue(Post._meta.get_field('dt_updated').auto_now)
+        self.assertTrue(self.client.login(username='seed0', password=SEED_PASSWORD))
+
+    def test_seeding_twice_adds_new_users(self):
+        self.seed()
+        self.seed()
+        self.assertEqual(User.objects.count(), 10)
+
+
+class SqliteBackendTest(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'db.sqlite3')
+
+    def wrapper(self, **options):
+        settings_dict = {**connection.settings_dict, 'NAME': self.path, 'OPTIONS': options}
+        wrapper = SqliteDatabaseWrapper(settings_dict, alias='backend-test')
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def pragma(self, wrapper, name):
+        with wrapper.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas(self):
+        wrapper = self.wrapper(pragmas={'cache_size': -1000, 'mmap_size': None})
+        self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'wal')
+        self.assertEqual(self.pragma(wrapper, 'synchronous'), 1)
+        self.assertEqual(self.pragma(wrapper, 'busy_timeout'), 5000)
+        self.assertEqual(self.pragma(wrapper, 'cache_size'), -1000)
+        self.assertEqual(self.pragma(wrapper, 'mmap_size'), 0)
+
+    def writer_is_blocked(self, wrapper):
+        # atomic()처럼 트랜잭션을 연 상태에서 다른 연결이 쓰기 잠금을 얻을 수 있는지 본다.
+        wrapper.ensure_connection()
+        wrapper.set_autocommit(False, force_begin_transaction_with_broken_autocommit=True)
+        other = sqlite3.connect(self.path, timeout=0, isolation_level=None)
+        try:
+            other.execute('BEGIN IMMEDIATE')
+            other.execute('ROLLBACK')
+            return False
+        except sqlite3.OperationalError:
+            return True
+        finally:
+            other.close()
+            wrapper.rollback()
+            wrapper.set_autocommit(True)
+
+    def test_transaction_mode(self):
+        self.assertFalse(self.writer_is_blocked(self.wrapper()))
+        self.assertTrue(self.writer_is_blocked(self.wrapper(transaction_mode='IMMEDIATE')))
+
+    def test_retries_locked_statements_outside_transactions(self):
+        wrapper = self.wrapper(lock_retries=2, lock_retry_delay=0)
+        wrapper.ensure_connection()
+        cursor = wrapper.create_cursor()
+        locked = sqlite3.OperationalError('database is locked')
+
+        method = mock.Mock(side_effect=[locked, locked, 'ok'])
+        self.assertEqual(cursor.retry(method, 'SELECT 1'), 'ok')
+        self.assertEqual(method.call_count, 3)
+
+        method = mock.Mock(side_effect=[locked] * 3)
+        with self.assertRaises(sqlite3.OperationalError):
+            cursor.retry(method, 'SELECT 1')
+        self.assertEqual(method.call_count, 3)
+
+        # 트랜잭션 안의 문장은 다시 실행하지 않는다.
+        wrapper.connection.execute('BEGIN')
+        method = mock.Mock(side_effect=[locked, 'ok'])
+        with self.assertRaises(sqlite3.OperationalError):
+            cursor.retry(method, 'SELECT 1')
+        self.assertEqual(method.call_count, 1)
+        wrapper.connection.execute('ROLLBACK')
+
+
+@override_settings(REPLICA_DATABASES=['replica'], REPLICA_MAX_LAG=30, REPLICA_LAG_CHECK_INTERVAL=5)
+class ReplicaRoutingTest(TestCase):
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+        patcher = mock.patch.dict(routers._lag_cache, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # TestCase는 테스트 전체를 트랜잭션으로 감싸므로, 라우터가 보는 atomic 상태만 바꿔 둔다.
+        patcher = mock.patch.object(connections['default'], 'in_atomic_block', False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def read_db(self, model=Post, use_replica=True):
+        state, token = start_request()
+        state.use_replica = use_replica
+        try:
+            return self.router.db_for_read(model)
+        finally:
+            end_request(token)
+
+    def test_reads_marked_requests_from_healthy_replica(self):
+        with mock.patch('podomarket.routers.measure_lag', return_value=1):
+            self.assertEqual(self.read_db(), 'replica')
+            self.assertIsNone(self.read_db(use_replica=False))
+            # 세션, 인증 같은 다른 앱의 테이블은 프라이머리에서 읽는다.
+            self.assertIsNone(self.read_db(Session))
+        self.assertIsNone(self.router.db_for_read(Post))
+
+    def test_falls_back_to_primary_when_replica_lags(self):
+        for lag in (31, None):
+            routers._lag_cache.clear()
+            with mock.patch('podomarket.routers.measure_lag', return_value=lag):
+                self.assertIsNone(self.read_db())
+
+    def test_lag_is_cached_for_check_interval(self):
+        with mock.patch('podomarket.routers.measure_lag', return_value=1) as measure, \
+                mock.patch('podomarket.routers.time.monotonic', side_effect=[100, 104, 106]):
+            for _ in range(3):
+                self.read_db()
+        self.assertEqual(measure.call_count, 2)
+
+    def test_write_pins_browser_to_primary(self):
+        def write_view(request):
+            self.router.db_for_write(Post)
+            return HttpResponse()
+
+        middleware = ReplicaRoutingMiddleware(write_view)
+        factory = RequestFactory()
+        response = middleware(factory.post('/'))
+        self.assertEqual(response.cookies['replica_pin']['max-age'], middleware.sticky_seconds)
+
+        def marked(request):
+            request._replica_state = ReplicaState()
+            request.resolver_match = resolve(reverse('index'))
+            middleware.process_view(request, None, (), {})
+            return request._replica_state.use_replica
+
+        self.assertTrue(marked(factory.get('/')))
+        self.assertFalse(marked(factory.post('/')))
+        pinned = factory.get('/')
+        pinned.COOKIES['replica_pin'] = '1'
+        self.assertFalse(marked(pinned))
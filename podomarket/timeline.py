@@ -0,0 +1,153 @@
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import User, Post, TimelineEntry
+from .pagination import CursorPaginator, keyset_rows
+
+BATCH_SIZE = 1000
+
+
+def fanout_limit():
+    return getattr(settings, 'TIMELINE_FANOUT_FOLLOWER_LIMIT', 1000)
+
+
+def is_fanout_on_read(author):
+    # 팔로워가 너무 많은 작성자는 글을 쓸 때 복사하지 않고 읽을 때 합친다.
+    return author.follower_count > fanout_limit()
+
+
+def make_entries(post, user_ids):
+    return [
+        TimelineEntry(
+            user_id=user_id,
+            post_id=post.id,
+            author_id=post.author_id,
+            dt_created=post.dt_created,
+        )
+        for user_id in user_ids
+    ]
+
+
+def fan_out_post(post):
+    if post.is_sold or is_fanout_on_read(post.author):
+        return
+    follower_ids = post.author.followers.values_list('id', flat=True)
+    batch = []
+    for user_id in follower_ids.iterator(chunk_size=BATCH_SIZE):
+        batch.append(user_id)
+        if len(batch) >= BATCH_SIZE:
+            TimelineEntry.objects.bulk_create(make_entries(post, batch), ignore_conflicts=True)
+            batch = []
+    TimelineEntry.objects.bulk_create(make_entries(post, batch), ignore_conflicts=True)
+
+
+def remove_post(post):
+    TimelineEntry.objects.filter(post=post).delete()
+
+
+def backfill(user, author):
+    if is_fanout_on_read(author):
+        return
+    posts = Post.objects.filter(author=author, is_sold=False).only('id', 'author_id', 'dt_created')
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(user=user, post_id=post.id, author_id=post.author_id, dt_created=post.dt_created)
+            for post in posts
+        ],
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def prune(user, author):
+    TimelineEntry.objects.filter(user=user, author=author).delete()
+
+
+def follow(user, author):
+    # 이미 팔로우 중이면 아무것도 바꾸지 않고 False를 돌려준다.
+    Follow = User.following.through
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                Follow.objects.create(from_user_id=user.id, to_user_id=author.id)
+        except IntegrityError:
+            return False
+        User.objects.filter(id=author.id).update(follower_count=F('follower_count') + 1)
+        author.refresh_from_db(fields=['follower_count'])
+        backfill(user, author)
+    return True
+
+
+def unfollow(user, author):
+    # 팔로우 중이 아니었으면 아무것도 바꾸지 않고 False를 돌려준다.
+    Follow = User.following.through
+    with transaction.atomic():
+        deleted, _ = Follow.objects.filter(from_user_id=user.id, to_user_id=author.id).delete()
+        if not deleted:
+            return False
+        User.objects.filter(id=author.id).update(follower_count=F('follower_count') - 1)
+        prune(user, author)
+    return True
+
+
+def toggle_follow(user, author):
+    # 언팔로우를 먼저 시도하고 지워진 행이 없을 때만 팔로우한다.
+    # follow가 False면 동시에 들어온 다른 요청이 먼저 팔로우한 것이므로 결과는 같다.
+    with transaction.atomic():
+        following = not unfollow(user, author)
+        if following:
+            follow(user, author)
+        follower_count = User.objects.values_list('follower_count', flat=True).get(id=author.id)
+    return following, follower_count
+
+
+def pulled_author_ids(user):
+    return list(
+        user.following.filter(
+            follower_count__gt=fanout_limit()
+        ).values_list('id', flat=True)
+    )
+
+
+class TimelinePaginator(CursorPaginator):
+    """팔로잉 타임라인을 TimelineEntry 인덱스 순서대로 한 페이지씩 읽는다.
+
+    읽을 때 합치는 작성자의 글은 페이지마다 같은 커서로 따로 읽어 합친다.
+    """
+
+    def __init__(self, user, per_page):
+        super().__init__(TimelineEntry.objects.filter(user=user), per_page)
+        self.pulled_author_ids = pulled_author_ids(user)
+
+    def fetch(self, direction, dt_created, pk, limit):
+        keys = keyset_rows(
+            self.queryset.values_list('dt_created', 'post_id'),
+            direction, dt_created, pk, limit, id_field='post_id',
+        )
+        if self.pulled_author_ids:
+            pulled = Post.objects.filter(author_id__in=self.pulled_author_ids, is_sold=False)
+            # 팔로워가 기준을 넘기 전에 복사된 항목이 남아 있을 수 있으므로 겹치는 글은 한 번만 쓴다.
+            keys = sorted(
+                set(keys) | set(keyset_rows(pulled.values_list('dt_created', 'id'), direction, dt_created, pk, limit)),
+                reverse=direction == 'next',
+            )[:limit]
+        posts = Post.objects.select_related('author').in_bulk([post_id for _, post_id in keys])
+        return [posts[post_id] for _, post_id in keys if post_id in posts]
+
+
+def rebuild_timelines():
+    with transaction.atomic():
+        TimelineEntry.objects.all().delete()
+        Follow = User.following.through
+        for author in User.objects.filter(followers__isnull=False).distinct().iterator():
+            User.objects.filter(id=author.id).update(
+                follower_count=Follow.objects.filter(to_user=author).count()
+            )
+            author.refresh_from_db(fields=['follower_count'])
+            if is_fanout_on_read(author):
+                continue
+            for post in Post.objects.filter(author=author, is_sold=False).iterator():
+                post.author = author
+                fan_out_post(post)
+        User.objects.filter(followers__isnull=True).update(follower_count=0)
@@ -8,6 +8,11 @@ urlpatterns = [
         views.IndexView.as_view(),
         name='index'
     ),
+    path(
+        'popular/',
+        views.PopularPostListView.as_view(),
+        name='popular'
+    ),
     path(
         'wishlist/', 
         views.WishlistView.as_view(), 
@@ -96,6 +101,23 @@ urlpatterns = [
         views.ProcessFollowView.as_view(), 
         name='process-follow',
     ),
+
+    # api
+    path(
+        'api/like/<int:content_type_id>/<int:object_id>/',
+        views.LikeToggleApiView.as_view(),
+        name='api-like',
+    ),
+    path(
+        'api/users/<int:user_id>/follow/',
+        views.FollowToggleApiView.as_view(),
+        name='api-follow',
+    ),
+    path(
+        'api/autocomplete/',
+        views.AutocompleteApiView.as_view(),
+        name='api-autocomplete',
+    ),
 ]
 
 
@@ -1,5 +1,6 @@
 from django.shortcuts import get_object_or_404, render, redirect
 from django.urls import reverse
+from django.utils.http import urlencode
 from django.views.generic import (
     View,
     ListView, 
@@ -8,11 +9,13 @@ from django.views.generic import (
     UpdateView,
     DeleteView,
 )
-from django.db.models import Q
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Max, Q, Sum
 from braces.views import LoginRequiredMixin, UserPassesTestMixin
 from allauth.account.views import PasswordChangeView
 from allauth.account.models import EmailAddress
-from .models import Post, User, Comment, Like
+from .models import Post, User, Comment, ArchivedPost, TimelineEntry
 from .forms import (
     PostCreateForm, 
     PostUpdateForm, 
@@ -20,77 +23,194 @@ from .forms import (
     CommentForm,
 )
 from django.contrib.contenttypes.models import ContentType
-from django.http import HttpResponse
-from .functions import confirmation_required_redirect
-from .mixins import LoginAndOwnershipRequiredMixin, LoginAndVerificationRequiredMixin
+from django.http import Http404, HttpResponse, JsonResponse
+from .functions import confirmation_required_redirect, remember_profile_complete
+from .mixins import (
+    LoginAndOwnershipRequiredMixin,
+    LoginAndVerificationRequiredMixin,
+    JsonLoginAndVerificationRequiredMixin,
+    CursorPaginationMixin,
+    ConditionalGetMixin,
+)
+from .facets import facet_context, facet_counts, filter_params, filtered_posts, matching_posts, parse_filters
+from .conditional import list_version, page_version, post_likes, post_version, profile_version
+from .regions import parse_region, region_context, region_q
+from .recommendations import similar_posts
+from .archive import archived_post_context, posts_by_author
+from .counters import COUNTED_MODELS, change_comment_count, toggle_like
+from .autocomplete import get_index
+from .timeline import TimelinePaginator, toggle_follow
 
 
 def index(request):
     return render(request, 'podomarket/index.html')
 
-class IndexView(ListView):
+class IndexView(ConditionalGetMixin, CursorPaginationMixin, ListView):
     model = Post
     template_name = 'podomarket/index.html'
     context_object_name = 'posts'
     paginate_by = 8
 
+    def get_region(self):
+        return parse_region(self.request.GET.get('region'))
+
     def get_queryset(self):
-        return Post.objects.filter(is_sold=False)
+        # 카드에 작성자 주소가 보이므로 작성자를 함께 읽는다.
+        queryset = Post.objects.filter(is_sold=False).select_related('author')
+        region = self.get_region()
+        if region:
+            queryset = queryset.filter(region_q(region))
+        return queryset
+
+    def get_version(self):
+        return list_version(self.request, self.get_queryset(), self.get_region())
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        region = self.get_region()
+        context.update(region_context(region, self.request.user))
+        if region:
+            context['filter_params'] = urlencode({'region': region})
+        return context
+
+class PopularPostListView(IndexView):
+    # hot_score는 계속 바뀌므로 커서 대신 페이지 번호로 나눈다.
+
+    def is_cursor_mode(self):
+        return False
+
+    def get_queryset(self):
+        return super().get_queryset().order_by('-hot_score', '-id')
+
+    def get_version(self):
+        # 좋아요나 댓글로 점수만 바뀌어도 순서가 달라진다.
+        return list_version(self.request, self.get_queryset(), self.get_region(), hot_score=Sum('hot_score'))
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['is_popular'] = True
+        return context
 
-class WishlistView(LoginRequiredMixin, ListView):
+class WishlistView(LoginRequiredMixin, ConditionalGetMixin, CursorPaginationMixin, ListView):
     model = Post
     context_object_name = 'liked_posts'
     template_name = 'podomarket/wishlist.html'
     paginate_by = 8
 
+    # 최근에 찜한 글부터 보여준다. 좋아요 행의 (user, content_type, -dt_created, -id) 인덱스 순서 그대로 읽는다.
+    cursor_fields = ('liked_at', 'like_id')
+
     def get_queryset(self):
-        return Post.objects.filter(likes__user=self.request.user)
+        return Post.objects.filter(likes__user=self.request.user).annotate(
+            liked_at=F('likes__dt_created'), like_id=F('likes__id'),
+        ).select_related('author').order_by('-liked_at', '-like_id')
 
-class FollowingPostListView(LoginRequiredMixin, ListView):
+    def get_version(self):
+        # 좋아요 id는 다시 쓰이지 않으므로 하나를 취소하고 다른 글에 누르면 가장 큰 id가 바뀐다.
+        return list_version(self.request, self.get_queryset(), latest_like=Max('likes__id'))
+
+class FollowingPostListView(LoginRequiredMixin, ConditionalGetMixin, CursorPaginationMixin, ListView):
     model = Post
     context_object_name = 'following_posts'
     template_name = 'podomarket/following_post_list.html'
     paginate_by = 8
 
     def get_queryset(self):
-        return Post.objects.filter(is_sold=False).filter(author__followers=self.request.user)
+        return TimelineEntry.objects.filter(user=self.request.user)
+
+    def is_cursor_mode(self):
+        # 타임라인은 전체 개수를 세지 않고 항상 커서로 나눈다.
+        return True
+
+    def paginate_queryset(self, queryset, page_size):
+        # 버전을 만들 때 읽은 페이지를 화면에서도 그대로 쓴다.
+        if not hasattr(self, '_page'):
+            paginator = TimelinePaginator(self.request.user, page_size)
+            self._page = (paginator, paginator.page(self.request.GET.get(self.cursor_query_param)))
+        paginator, page = self._page
+        return (paginator, page, page.object_list, page.has_other_pages())
 
-class SearchView(ListView):
+    def get_version(self):
+        _, page, _, _ = self.paginate_queryset(self.get_queryset(), self.paginate_by)
+        return page_version(self.request, page)
+
+class SearchView(ConditionalGetMixin, CursorPaginationMixin, ListView):
     model = Post
     context_object_name = 'search_results'
     template_name = 'podomarket/search_results.html'
     paginate_by = 8
 
+    def get_filters(self):
+        if not hasattr(self, '_filters'):
+            self._filters = parse_filters(self.request.GET)
+        return self._filters
+
+    def is_cursor_mode(self):
+        # 커서는 최신순 정렬 기준이므로 다른 정렬에서는 페이지 번호를 쓴다.
+        return self.get_filters()['sort'] == 'recent' and super().is_cursor_mode()
+
     def get_queryset(self):
-        query = self.request.GET.get('query', '')
-        return Post.objects.filter(
-            is_sold=False
-        ).filter(
-            Q(title__contains=query) 
-            | Q(item_details__contains=query)
-        )
+        return filtered_posts(self.get_filters()).select_related('author')
+
+    def get_version(self):
+        # facet 개수는 필터를 걸기 전 후보 전체에서 세므로 후보 전체의 버전을 본다.
+        filters = self.get_filters()
+        return list_version(self.request, matching_posts(filters), filters['region'], facet_counts(filters))
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['query'] = self.request.GET.get('query', '')
+        filters = self.get_filters()
+        context.update(facet_context(filters))
+        context.update(region_context(filters['region'], self.request.user, filter_params(filters, region=None)))
         return context
 
-class PostDetailView(DetailView):
+class PostDetailView(ConditionalGetMixin, DetailView):
     model = Post
     template_name = 'podomarket/post_detail.html'
     pk_url_kwarg = 'post_id'
+    context_object_name = 'post'
+
+    def get_queryset(self):
+        return Post.objects.select_related('author')
+
+    def get_likes(self):
+        # 버전을 만들 때 읽은 좋아요를 화면에서도 그대로 쓴다.
+        if not hasattr(self, '_likes'):
+            self._likes = post_likes(self.request.user, self.kwargs.get('post_id'))
+        return self._likes
+
+    def get_version(self):
+        likes = self.get_likes() if self.request.user.is_authenticated else None
+        return post_version(self.request, self.kwargs.get('post_id'), likes)
+
+    def get_object(self, queryset=None):
+        try:
+            return super().get_object(queryset)
+        except Http404:
+            # 보관된 글도 같은 주소로 보여준다.
+            return get_object_or_404(
+                ArchivedPost.objects.select_related('author'), id=self.kwargs.get('post_id')
+            )
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
+        post = self.object
         context['form'] = CommentForm()
-        context['post_ctype_id'] = ContentType.objects.get(model='post').id
-        context['comment_ctype_id'] = ContentType.objects.get(model='comment').id
+        # get_for_model은 ContentType 캐시를 사용하므로 매 요청마다 쿼리하지 않는다.
+        context['post_ctype_id'] = ContentType.objects.get_for_model(Post).id
+        context['comment_ctype_id'] = ContentType.objects.get_for_model(Comment).id
 
         user = self.request.user
+        if isinstance(post, ArchivedPost):
+            context['is_archived'] = True
+            context.update(archived_post_context(post, user))
+            return context
+
+        context['comments'] = post.comments.select_related('author')
+        context['similar_posts'] = similar_posts(post.id)
         if user.is_authenticated:
-            post = self.object
-            context['likes_post'] = Like.objects.filter(user=user, post=post).exists()
-            context['liked_comments'] = Comment.objects.filter(post=post).filter(likes__user=user)
+            context['likes_post'], context['liked_comment_ids'] = self.get_likes()
         return context
 
 class CommentCreateView(LoginAndVerificationRequiredMixin, CreateView):
@@ -102,7 +222,10 @@ class CommentCreateView(LoginAndVerificationRequiredMixin, CreateView):
     def form_valid(self, form):
         form.instance.author = self.request.user
         form.instance.post = Post.objects.get(id=self.kwargs.get('post_id'))
-        return super().form_valid(form)
+        with transaction.atomic():
+            response = super().form_valid(form)
+            change_comment_count(form.instance.post.id, 1)
+        return response
 
     def get_success_url(self):
         return reverse('post-detail', kwargs={'post_id': self.kwargs.get('post_id')})
@@ -120,6 +243,13 @@ class CommentDeleteView(LoginAndOwnershipRequiredMixin, DeleteView):
     model = Comment
     template_name = 'podomarket/comment_confirm_delete.html'
     pk_url_kwarg = 'comment_id'
+
+    def form_valid(self, form):
+        post_id = self.object.post_id
+        with transaction.atomic():
+            response = super().form_valid(form)
+            change_comment_count(post_id, -1, self.object.dt_created)
+        return response
     
     def get_success_url(self):
         return reverse('post-detail', kwargs={'post_id': self.object.post.id})
@@ -129,22 +259,40 @@ class ProcessLikeView(LoginAndVerificationRequiredMixin, View):
     http_method_names = ['post']
 
     def post(self, request, *args, **kwargs):
-        # get_or_create는 조건을 만족하는 오브젝트가 있으면
-        # 가져오고 없으면 생성한다.
-        # 첫번째값like는 가져오거나 생성한 오브젝트
-        # 두번째 값은 오브젝트 생성여부 
-        # 새로 생성 했으면 True 아니면 False
-        like, created = Like.objects.get_or_create(
-            user=self.request.user,
-            content_type_id=self.kwargs.get('content_type_id'),
-            object_id=self.kwargs.get('object_id'),
+        # 좋아요가 있으면 지우고 없으면 만든다. 동시에 눌러도 한 번만 반영된다.
+        toggle_like_or_404(
+            self.request.user,
+            self.kwargs.get('content_type_id'),
+            self.kwargs.get('object_id'),
         )
-        if not created:
-            like.delete()
         # self.request.META['HTTP_REFERER']는 항상 이 뷰로 
         # 리퀘스트를 보낸 페이지의 주소를 담고 있다.
         return redirect(self.request.META['HTTP_REFERER'])
 
+class LikeToggleApiView(JsonLoginAndVerificationRequiredMixin, View):
+    # 페이지를 다시 그리지 않고 하트 상태와 개수만 돌려준다.
+    http_method_names = ['post']
+
+    def post(self, request, *args, **kwargs):
+        liked, like_count = toggle_like_or_404(
+            self.request.user,
+            self.kwargs.get('content_type_id'),
+            self.kwargs.get('object_id'),
+        )
+        return JsonResponse({'liked': liked, 'like_count': like_count})
+
+def toggle_like_or_404(user, content_type_id, object_id):
+    try:
+        model = ContentType.objects.get_for_id(content_type_id).model_class()
+    except ContentType.DoesNotExist:
+        raise Http404
+    if model not in COUNTED_MODELS:
+        raise Http404
+    try:
+        return toggle_like(user, content_type_id, object_id)
+    except model.DoesNotExist:
+        raise Http404
+
 
 class PostCreateView(LoginAndVerificationRequiredMixin, CreateView):
     model = Post
@@ -182,19 +330,22 @@ class PostDeleteView(LoginAndOwnershipRequiredMixin, DeleteView):
         return reverse('index')
 
 
-class ProfileView(DetailView):
+class ProfileView(ConditionalGetMixin, DetailView):
     model = User
     template_name = 'podomarket/profile.html'
     pk_url_kwarg = 'user_id'
     context_object_name = "profile_user"
 
+    def get_version(self):
+        return profile_version(self.request, self.kwargs.get('user_id'))
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         user = self.request.user
         profile_user_id = self.kwargs.get('user_id')
         if user.is_authenticated:
             context['is_following'] = user.following.filter(id=profile_user_id).exists()
-        context['user_posts'] = Post.objects.filter(author__id=profile_user_id)[:8]
+        context['user_posts'] = posts_by_author(profile_user_id)[:8]
         return context
 
 class ProcessFollowView(LoginAndVerificationRequiredMixin, View):
@@ -202,14 +353,39 @@ class ProcessFollowView(LoginAndVerificationRequiredMixin, View):
 
     def post(self, request, *args, **kwargs):
         user = self.request.user
-        profile_user_id = self.kwargs.get('user_id')
-        if user.following.filter(id=profile_user_id).exists():
-            user.following.remove(profile_user_id)
-        else:
-            user.following.add(profile_user_id)
-        return redirect('profile', user_id=profile_user_id)
+        profile_user = get_object_or_404(User, id=self.kwargs.get('user_id'))
+        # 자기 자신은 팔로우할 수 없다. API와 같은 규칙을 폼 제출에도 적용한다.
+        if profile_user != user:
+            toggle_follow(user, profile_user)
+        return redirect('profile', user_id=profile_user.id)
 
-class UserPostListView(ListView):
+class FollowToggleApiView(JsonLoginAndVerificationRequiredMixin, View):
+    http_method_names = ['post']
+
+    def post(self, request, *args, **kwargs):
+        profile_user = get_object_or_404(User, id=self.kwargs.get('user_id'))
+        if profile_user == self.request.user:
+            return JsonResponse({'error': 'cannot_follow_self'}, status=400)
+        following, follower_count = toggle_follow(self.request.user, profile_user)
+        return JsonResponse({'following': following, 'follower_count': follower_count})
+
+class AutocompleteApiView(View):
+    # 검색창 자동완성. DB를 읽지 않고 메모리의 제목 인덱스에서 바로 답한다.
+    http_method_names = ['get']
+
+    def get(self, request, *args, **kwargs):
+        query = request.GET.get('q', '')[:60]
+        limit = getattr(settings, 'AUTOCOMPLETE_MAX_RESULTS', 10)
+        try:
+            limit = min(max(int(request.GET.get('limit', limit)), 1), limit)
+        except ValueError:
+            pass
+        response = JsonResponse({'query': query, 'suggestions': get_index().suggest(query, limit)})
+        # 같은 입력이 반복되는 경우가 많아 브라우저가 잠깐 재사용하게 한다.
+        response['Cache-Control'] = 'max-age=60'
+        return response
+
+class UserPostListView(ConditionalGetMixin, CursorPaginationMixin, ListView):
     model = Post
     template_name = 'podomarket/user_post_list.html'
     context_object_name = "user_posts"
@@ -217,7 +393,15 @@ class UserPostListView(ListView):
 
     def get_queryset(self):
         user_id = self.kwargs.get("user_id")
-        return Post.objects.filter(author_id=user_id)
+        # 보관된 글도 함께 보여준다.
+        return posts_by_author(user_id)
+
+    def is_cursor_mode(self):
+        # 두 테이블을 합친 목록은 OFFSET으로 나눌 수 없으므로 항상 커서로 나눈다.
+        return True
+
+    def get_version(self):
+        return profile_version(self.request, self.kwargs.get('user_id'))
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -232,6 +416,11 @@ class ProfileSetView(LoginRequiredMixin, UpdateView):
     def get_object(self, queryset=None):
         return self.request.user
 
+    def form_valid(self, form):
+        response = super().form_valid(form)
+        remember_profile_complete(self.request, self.object)
+        return response
+
     def get_success_url(self):
         return reverse('index')
 
@@ -243,6 +432,11 @@ class ProfileUpdateView(LoginRequiredMixin, UpdateView):
     def get_object(self, queryset=None):
         return self.request.user
 
+    def form_valid(self, form):
+        response = super().form_valid(form)
+        remember_profile_complete(self.request, self.object)
+        return response
+
     def get_success_url(self):
         return reverse('profile', kwargs={'user_id': self.request.user.id})
 
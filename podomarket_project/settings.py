@@ -50,6 +50,7 @@ INSTALLED_APPS = [
 SITE_ID = 1
 
 MIDDLEWARE = [
+    'podomarket.middleware.PerformanceLogMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -58,6 +59,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'podomarket.middleware.ProfileSetupMiddleware',
+    'podomarket.middleware.ReplicaRoutingMiddleware',
 ]
 
 ROOT_URLCONF = 'podomarket_project.urls'
@@ -86,11 +88,44 @@ WSGI_APPLICATION = 'podomarket_project.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        # WAL과 PRAGMA를 커넥션 생성 시 적용하는 sqlite3 백엔드 (podomarket/db/sqlite3/base.py)
+        'ENGINE': 'podomarket.db.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # 요청마다 커넥션을 다시 열지 않고 재사용한다. 0이면 매 요청 끝에 닫는다.
+        'CONN_MAX_AGE': int(os.environ.get('PODOMARKET_CONN_MAX_AGE', 60)),
+        'OPTIONS': {
+            'timeout': 5,
+            'transaction_mode': 'IMMEDIATE',
+            'lock_retries': 5,
+            'lock_retry_delay': 0.05,
+        },
     }
 }
 
+# Read replicas
+# PODOMARKET_REPLICA=1이면 db_replica.sqlite3를 읽기 복제본으로 쓴다.
+# 로컬에서는 copy_replica 명령이 프라이머리를 주기적으로 복사해서 복제를 흉내낸다.
+
+if os.environ.get('PODOMARKET_REPLICA') == '1':
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': BASE_DIR / 'db_replica.sqlite3',
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['podomarket.routers.PrimaryReplicaRouter']
+REPLICA_DATABASES = [alias for alias in DATABASES if alias != 'default']
+# 복제본에서 읽어도 되는 화면 (url name)
+REPLICA_READ_VIEWS = [
+    'index', 'wishlist', 'search', 'following-post-list',
+    'post-detail', 'profile', 'user-post-list',
+]
+# 마지막 복사 후 이 시간(초)이 지난 복제본은 쓰지 않고 프라이머리에서 읽는다.
+REPLICA_MAX_LAG = 30
+REPLICA_LAG_CHECK_INTERVAL = 5
+# 쓰기 요청 후 이 시간(초) 동안은 그 브라우저의 읽기를 프라이머리로 보낸다.
+REPLICA_STICKY_SECONDS = 10
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.0/ref/settings/#auth-password-validators
@@ -120,12 +155,67 @@ USE_TZ = True
 STATIC_URL = '/static/'
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 MEDIA_URL = '/uploads/'
+DEFAULT_FILE_STORAGE = 'podomarket.storage.ContentAddressedStorage'
+
+# 업로드 이미지의 썸네일/WebP 버전을 만드는 프로세스 수
+IMAGE_VARIANT_WORKERS = 2
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.0/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Cache
+# 파일 기반 캐시를 쓰려면 BACKEND를 'django.core.cache.backends.filebased.FileBasedCache'로,
+# LOCATION을 캐시 디렉터리 경로로 바꾸면 된다.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'podomarket',
+    }
+}
+
+POST_CARD_CACHE_TIMEOUT = 60 * 60
+
+# 검색 facet 개수는 글이 바뀌어도 지우지 않고 이 시간(초)이 지나면 다시 센다.
+SEARCH_FACET_CACHE_TIMEOUT = 60
+
+# Performance log
+# PERF_LOG_SAMPLE_RATE 비율만큼의 요청을 PERF_LOG_PATH에 JSONL로 기록한다. 0이면 끈다.
+
+PERF_LOG_SAMPLE_RATE = 0
+PERF_LOG_PATH = BASE_DIR / 'perf_log.jsonl'
+PERF_LOG_BUFFER_SIZE = 10000
+PERF_LOG_FLUSH_INTERVAL = 1.0
+
+# 팔로워가 이 수를 넘는 작성자의 글은 타임라인에 복사하지 않고 읽을 때 합친다.
+TIMELINE_FANOUT_FOLLOWER_LIMIT = 1000
+
+# 인기 점수 (hot.py). 반감기마다 점수가 절반으로 줄어든다.
+# rebase_hot_scores 명령을 반감기보다 훨씬 짧은 주기(예: 10분)로 돌린다.
+HOT_SCORE_HALF_LIFE_HOURS = 24
+# 이벤트별 가중치의 기본값은 hot.DEFAULT_WEIGHTS에 있고, 바꿀 항목만 적는다. (예: {'comment': 3.0})
+# HOT_SCORE_WEIGHTS = {}
+
+# 비슷한 상품 추천 (build_similar_posts 명령)
+# 글마다 SIMILAR_POSTS_K개의 이웃을 저장하고, 상세 페이지에는 판매 중인 글만 SIMILAR_POSTS_SHOWN개 보여준다.
+SIMILAR_POSTS_K = 10
+SIMILAR_POSTS_SHOWN = 4
+SIMILAR_POSTS_MIN_SCORE = 0.1
+SIMILAR_POSTS_MAX_FEATURES = 2048
+SIMILAR_POSTS_MATRIX_PATH = BASE_DIR / 'similar_posts.npz'
+
+# 검색창 자동완성 (autocomplete.py). 프로세스마다 메모리에 제목 인덱스를 들고 있고,
+# 다른 프로세스에서 바뀐 글은 AUTOCOMPLETE_RELOAD_SECONDS마다 다시 읽어 반영한다.
+AUTOCOMPLETE_RELOAD_SECONDS = 600
+# 한 번의 요청에서 살펴볼 최대 키 수. 짧은 접두어에서도 응답 시간이 일정하게 유지된다.
+AUTOCOMPLETE_SCAN_LIMIT = 2000
+AUTOCOMPLETE_MAX_RESULTS = 10
+
+# archive_posts 명령은 거래완료 후 이 기간(일)이 지난 글을 보관 테이블로 옮긴다.
+ARCHIVE_SOLD_AFTER_DAYS = 7
+
 # Auth Settings
 
 AUTH_USER_MODEL = 'podomarket.User'